@@ -0,0 +1,323 @@
+# alerts.py — 가격 알림 (티커별 임계값 정렬 인덱스, 시세 갱신마다 평가, 저널 + 스냅샷 파일 영속)
+# 인덱스: 티커 → 상향(가격 ≥ 임계값이면 발동) / 하향(가격 ≤ 임계값) 각각 (임계값, id) 정렬 리스트
+# 평가: 티커당 bisect 한 번 → 발동 구간(상향은 앞쪽, 하향은 뒤쪽)만 잘라냄 = 전체 알림 스캔 없이 O(log n + 발동 수)
+# 발동한 알림은 세션별 수신함(event_id 증가)으로 이동 → 폴링(after=마지막 event_id)/스트림으로 전달
+# 영속: 등록/취소/발동은 저널(<path>.log, JSON Lines)에 한 줄씩 추가(변경 건수만큼) → compact()가 주기적으로 스냅샷(<path>)에 합치고 저널 비움
+# 사용: from alerts import AlertBook → book.add("sid", "USDKRW=X", "달러/원", "above", 1400) / book.evaluate({티커: 시세})
+#       AlertHub(book, render=...) → 세션별 SSE 구독 (sse.SseHub: 구독자 상한/큐/resync 공통)
+
+import os
+import json
+import time
+import logging
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sse import SseHub, RESYNC, PING, frame
+
+log = logging.getLogger("chatbot")
+
+KST = ZoneInfo("Asia/Seoul")
+DIRECTIONS = ("above", "below")
+_INF = float("inf")
+
+class AlertError(ValueError):
+    pass
+
+class AlertBook:
+    def __init__(self, path: Optional[str] = None, max_per_session: int = 50, max_total: int = 100000, outbox: int = 100):
+        self.path = Path(path) if path else None
+        self.log_path = self.path.with_suffix(self.path.suffix + ".log") if self.path else None
+        self.max_per_session, self.max_total, self.outbox_size = max_per_session, max_total, outbox
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()                            # 저널 쓰기/압축 순서 보장 (평가 락과 분리)
+        self._pending: List[dict] = []                              # 아직 저널에 안 쓴 레코드 (_lock 안에서 추가)
+        self.journal_lines = 0                                      # 마지막 압축 이후 저널 줄 수
+        self._alerts: Dict[int, Dict[str, Any]] = {}                # id → 알림
+        self._up: Dict[str, List[Tuple[float, int]]] = {}           # 티커 → [(임계값, id)] 오름차순 (상향)
+        self._down: Dict[str, List[Tuple[float, int]]] = {}         # 티커 → [(임계값, id)] 오름차순 (하향)
+        self._by_session: Dict[str, set] = {}
+        self._outbox: Dict[str, deque] = {}                         # 세션 → 발동 이벤트 (최근 outbox건)
+        self._seq = self._event_seq = 0
+        self._listeners: List = []                                  # fn(events) — 발동 건이 있는 평가마다
+        self.ticks = self.fired_total = self.checked_total = 0
+        self.last_tick_s = self.max_tick_s = self.total_tick_s = 0.0   # 평가만 (저널 쓰기 제외)
+        self.last_flush_s = self.last_compact_s = 0.0
+        self.last_checked = 0
+        self._load()
+
+    # ===== 영속 =====
+    def _load(self):
+        # 스냅샷 → 저널 재생 (압축 도중 죽어 이미 반영된 줄이 남아 있어도 재생은 멱등)
+        if self.path and self.path.exists():
+            try:
+                data = json.loads(self.path.read_text(encoding="utf-8"))
+                self._seq, self._event_seq = int(data.get("seq", 0)), int(data.get("event_seq", 0))
+                for a in data.get("alerts", []):
+                    self._index(a)
+                for sid, events in (data.get("outbox") or {}).items():
+                    self._outbox[sid] = deque(events, maxlen=self.outbox_size)
+            except Exception:
+                log.exception(f"가격 알림 파일 손상: {self.path} (빈 상태로 시작)")
+        if self.log_path and self.log_path.exists():
+            with open(self.log_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._replay(json.loads(line))
+                        self.journal_lines += 1
+                    except Exception:
+                        log.warning(f"가격 알림 저널 줄 무시: {line[:80]!r}")   # 쓰다 끊긴 마지막 줄 등
+        if self._alerts or self._event_seq:
+            log.info(f"가격 알림 로드: {len(self._alerts)}건 (저널 {self.journal_lines}줄, {self.path})")
+
+    def _replay(self, rec: Dict[str, Any]):
+        op = rec["op"]
+        if op == "add":
+            a = rec["alert"]
+            if a["id"] > self._seq:
+                self._seq = a["id"]
+                self._index(a)
+        elif op == "cancel":
+            a = self._alerts.pop(rec["id"], None)
+            if a is not None:
+                self._unindex(a)
+        elif op == "fire":
+            e = rec["event"]
+            a = self._alerts.pop(e["id"], None)
+            if a is not None:
+                self._unindex(a)
+            if e["event_id"] > self._event_seq:
+                self._event_seq = e["event_id"]
+                self._outbox.setdefault(e["session_id"], deque(maxlen=self.outbox_size)).append(e)
+
+    def _journal(self, op: str, **rec):
+        # _lock 안에서 호출 — 레코드만 쌓고 직렬화/파일 쓰기는 락 밖 _flush() (알림/이벤트 dict는 생성 후 불변)
+        if self.path:
+            self._pending.append({"op": op, **rec})
+
+    def _flush(self):
+        # 쌓인 저널 줄을 파일 끝에 추가 (교체는 _io_lock 안에서 → 쓰는 순서 = 변경 순서)
+        if not self.path:
+            return
+        with self._io_lock:
+            with self._lock:
+                recs, self._pending = self._pending, []
+            if not recs:
+                return
+            t0 = time.perf_counter()
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in recs))
+                self.journal_lines += len(recs)
+            except Exception:
+                log.exception(f"가격 알림 저널 쓰기 실패: {self.log_path}")
+            self.last_flush_s = time.perf_counter() - t0
+
+    def compact(self, min_lines: int = 1) -> bool:
+        # 현재 상태를 스냅샷으로 저장(tmp → rename) 후 저널 비움 — 스케줄러에서 주기 호출 (O(전체 알림))
+        if not self.path:
+            return False
+        with self._io_lock:
+            with self._lock:
+                if self.journal_lines + len(self._pending) < min_lines:
+                    return False
+                state = {
+                    "seq": self._seq, "event_seq": self._event_seq,
+                    "alerts": list(self._alerts.values()),
+                    "outbox": {sid: list(q) for sid, q in self._outbox.items() if q},
+                }
+                self._pending = []   # 위 상태에 이미 반영됨
+            t0 = time.perf_counter()
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+                os.replace(tmp, self.path)
+                open(self.log_path, "w").close()
+                self.journal_lines = 0
+            except Exception:
+                log.exception(f"가격 알림 저장 실패: {self.path}")
+                return False
+            finally:
+                self.last_compact_s = time.perf_counter() - t0
+            return True
+
+    # ===== 인덱스 =====
+    def _side(self, a: Dict[str, Any]) -> List[Tuple[float, int]]:
+        book = self._up if a["direction"] == "above" else self._down
+        return book.setdefault(a["ticker"], [])
+
+    def _index(self, a: Dict[str, Any]):
+        self._alerts[a["id"]] = a
+        insort(self._side(a), (a["threshold"], a["id"]))
+        self._by_session.setdefault(a["session_id"], set()).add(a["id"])
+
+    def _unindex(self, a: Dict[str, Any]):
+        side = self._side(a)
+        i = bisect_left(side, (a["threshold"], a["id"]))
+        if i < len(side) and side[i][1] == a["id"]:
+            del side[i]
+        if not side:
+            (self._up if a["direction"] == "above" else self._down).pop(a["ticker"], None)
+        ids = self._by_session.get(a["session_id"])
+        if ids is not None:
+            ids.discard(a["id"])
+            if not ids:
+                del self._by_session[a["session_id"]]
+
+    # ===== 등록/해제/조회 =====
+    def add(self, session_id: str, ticker: str, name: str, direction: str, threshold: float,
+            price_at: Optional[float] = None) -> Dict[str, Any]:
+        if direction not in DIRECTIONS:
+            raise AlertError(f"direction은 {', '.join(DIRECTIONS)} 중 하나")
+        if not threshold or threshold <= 0 or threshold != threshold:
+            raise AlertError("임계값은 0보다 커야 합니다.")
+        with self._lock:
+            if len(self._by_session.get(session_id, ())) >= self.max_per_session:
+                raise AlertError(f"세션당 알림은 최대 {self.max_per_session}개입니다.")
+            if len(self._alerts) >= self.max_total:
+                raise AlertError("등록된 알림이 너무 많습니다. 잠시 후 다시 시도해 주세요.")
+            self._seq += 1
+            a = {"id": self._seq, "session_id": session_id, "ticker": ticker, "name": name, "direction": direction,
+                 "threshold": float(threshold), "price_at": price_at, "created_at": datetime.now(KST).isoformat()}
+            self._index(a)
+            self._journal("add", alert=a)
+        self._flush()
+        return dict(a)
+
+    def cancel(self, session_id: str, alert_id: int) -> bool:
+        with self._lock:
+            a = self._alerts.get(alert_id)
+            if a is None or a["session_id"] != session_id:
+                return False
+            self._unindex(a)
+            del self._alerts[alert_id]
+            self._journal("cancel", id=alert_id)
+        self._flush()
+        return True
+
+    def list(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(self._alerts[i]) for i in sorted(self._by_session.get(session_id, ()))]
+
+    def tickers(self) -> List[str]:
+        with self._lock:
+            return sorted(set(self._up) | set(self._down))
+
+    def events(self, session_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        # after 이후 발동 이벤트 (수신함 보관 범위 안에서)
+        with self._lock:
+            return [e for e in self._outbox.get(session_id, ()) if e["event_id"] > after]
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    # ===== 평가 =====
+    def evaluate(self, quotes: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # {티커: 시세} (스냅샷 갱신분) → 발동 이벤트 목록 — 알림이 걸린 티커만, 티커당 bisect 2회
+        t0 = time.perf_counter()
+        events: List[Dict[str, Any]] = []
+        with self._lock:
+            hit: List[Tuple[int, float]] = []
+            tickers = quotes.keys() & (self._up.keys() | self._down.keys())
+            for t in tickers:
+                price = (quotes[t] or {}).get("price")
+                if price is None:
+                    continue
+                up = self._up.get(t)
+                if up:
+                    i = bisect_right(up, (price, _INF))      # 임계값 ≤ 가격 → 앞쪽 i개 발동
+                    if i:
+                        hit += [(aid, price) for _, aid in up[:i]]
+                        del up[:i]
+                down = self._down.get(t)
+                if down:
+                    i = bisect_left(down, (price, -_INF))    # 임계값 ≥ 가격 → 뒤쪽 발동
+                    if i < len(down):
+                        hit += [(aid, price) for _, aid in down[i:]]
+                        del down[i:]
+            now = datetime.now(KST).isoformat()
+            for aid, price in hit:
+                a = self._alerts.pop(aid)
+                self._unindex(a)
+                self._event_seq += 1
+                e = {**a, "event_id": self._event_seq, "price": price, "fired_at": now,
+                     "ts_kst": (quotes[a["ticker"]] or {}).get("ts_kst")}
+                self._outbox.setdefault(a["session_id"], deque(maxlen=self.outbox_size)).append(e)
+                self._journal("fire", event=e)
+                events.append(e)
+            dt = time.perf_counter() - t0
+            self.ticks += 1
+            self.last_checked = len(tickers)
+            self.checked_total += len(tickers)
+            self.fired_total += len(hit)
+            self.last_tick_s, self.total_tick_s = dt, self.total_tick_s + dt
+            self.max_tick_s = max(self.max_tick_s, dt)
+        if events:
+            self._flush()   # 발동 건수만큼만 추가 기록
+            for fn in self._listeners:
+                try:
+                    fn(events)
+                except Exception:
+                    log.exception("가격 알림 리스너 오류")
+        return events
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": len(self._alerts),
+                "tickers": len(set(self._up) | set(self._down)),
+                "sessions": len(self._by_session),
+                "ticks": self.ticks,
+                "fired_total": self.fired_total,
+                "last_checked_tickers": self.last_checked,
+                "last_tick_us": round(self.last_tick_s * 1e6, 1),
+                "mean_tick_us": round(self.total_tick_s / self.ticks * 1e6, 1) if self.ticks else 0.0,
+                "max_tick_us": round(self.max_tick_s * 1e6, 1),
+                "journal_lines": self.journal_lines + len(self._pending),
+                "last_flush_ms": round(self.last_flush_s * 1000, 3),
+                "last_compact_ms": round(self.last_compact_s * 1000, 3),
+                "pending_events": sum(len(q) for q in self._outbox.values()),
+            }
+
+# ===== 알림 스트림 =====
+# 발동 이벤트(평가 스레드) → 이벤트 루프 → 해당 세션 구독자 큐 (가득 차면 resync: 수신함에서 다시 읽음 — 연결은 끊지 않음)
+class AlertHub(SseHub):
+    def __init__(self, book: AlertBook, render: Callable[[Dict[str, Any]], Dict[str, Any]] = lambda e: e, **kw):
+        super().__init__(**kw)
+        self.book = book
+        self.render = render                              # 수신함 이벤트 → 응답 형태
+        self.delivered = 0
+        book.add_listener(self.publish)
+
+    def _fanout(self, events: List[Dict[str, Any]]):
+        for e in events:
+            for sub in list(self.subs.get(e["session_id"], ())):
+                self.offer(sub, e)
+
+    async def stream(self, session_id: str, after: int = 0):
+        # 연결 시 수신함의 after 이후 이벤트 → 이후 발동분 (event_id로 중복 제거)
+        with self.subscribe(session_id) as sub:
+            last = after
+            pending = self.book.events(session_id, after)
+            while True:
+                for e in pending:
+                    if e["event_id"] > last:
+                        last = e["event_id"]
+                        self.delivered += 1
+                        yield frame("alert", self.render(e))
+                item = await self.next(sub)
+                if item is None:
+                    yield PING
+                    pending = []
+                else:
+                    pending = self.book.events(session_id, last) if item is RESYNC else [item]
+
+    def stats(self) -> dict:
+        return {"clients": self.clients(), "sessions": len(self.subs), "delivered": self.delivered, "overflows": self.overflows}
@@ -0,0 +1,87 @@
+# bench_concurrency.py — /chat 동시성 벤치마크 (OpenAI 스텁, 네트워크 없음)
+# 실행: cd fastapi/chatbot && python bench/bench_concurrency.py --n 50 --latency 2.0
+# 비교: async(AsyncOpenAI 흉내, await sleep) vs blocking(동기 OpenAI 흉내, time.sleep)
+# 지표: 전체 소요시간, 처리량(req/s), 이벤트 루프 지연(최대) — blocking이면 /health도 같이 멈춘다
+
+import os, sys, time, json, asyncio, argparse
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")  # 클라이언트 생성용 더미 키 (실제 호출 없음)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import chatbot  # noqa: E402
+
+# ===== OpenAI 스텁 =====
+# chat.completions.create만 흉내 (도구 호출 없이 바로 답변)
+def _completion(content: str):
+    msg = SimpleNamespace(content=content, tool_calls=None)
+    return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+class _AsyncCompletions:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def create(self, **kw):
+        await asyncio.sleep(self.latency)
+        return _completion("stub answer")
+
+class _BlockingCompletions(_AsyncCompletions):
+    async def create(self, **kw):
+        # 동기 클라이언트를 async 핸들러에서 직접 부른 것과 동일하게 루프 점유
+        time.sleep(self.latency)
+        return _completion("stub answer")
+
+def _stub_client(completions) -> SimpleNamespace:
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+# ===== 측정 =====
+# 루프 지연: 10ms sleep이 얼마나 늦게 깨어나는지(= 다른 요청/health 대기시간)
+async def _loop_lag(stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.01)
+        samples.append(time.perf_counter() - t0 - 0.01)
+
+async def _run(mode: str, n: int, latency: float) -> dict:
+    comp = _AsyncCompletions(latency) if mode == "async" else _BlockingCompletions(latency)
+    chatbot.aclient = _stub_client(comp)
+    chatbot.ROUTER_ENABLED = False  # 라우터 경로(실제 시세 조회)를 타지 않도록
+
+    stop, lags = asyncio.Event(), []
+    probe = asyncio.create_task(_loop_lag(stop, lags))
+    t0 = time.perf_counter()
+    await asyncio.gather(*[
+        chatbot.chat({"message": "코스피 어때?", "session_id": f"bench-{mode}-{i}"})
+        for i in range(n)
+    ])
+    wall = time.perf_counter() - t0
+    stop.set()
+    await probe
+
+    return {
+        "mode": mode,
+        "n": n,
+        "latency_s": latency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(n / wall, 2),
+        "max_loop_lag_ms": round(max(lags or [0.0]) * 1000, 1),
+    }
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=50, help="동시 요청 수")
+    ap.add_argument("--latency", type=float, default=2.0, help="스텁 completion 지연(초)")
+    ap.add_argument("--modes", default="async,blocking")
+    ap.add_argument("--json", action="store_true", help="결과를 JSON으로 출력")
+    args = ap.parse_args()
+
+    results = [asyncio.run(_run(m, args.n, args.latency)) for m in args.modes.split(",")]
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'mode':<10}{'n':>6}{'wall(s)':>10}{'req/s':>10}{'max lag(ms)':>14}")
+    for r in results:
+        print(f"{r['mode']:<10}{r['n']:>6}{r['wall_s']:>10}{r['throughput_rps']:>10}{r['max_loop_lag_ms']:>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# bench_summary.py — 대화 길이별 프롬프트 토큰/지연 벤치마크 (롤링 요약 전/후, OpenAI 스텁)
+# 실행: cd fastapi/chatbot && python bench/bench_summary.py --turns 5,20,50
+# before: 요약 없이 최근 2*MAX_TURNS 메시지 원문 재전송(기존 동작)
+# after : 롤링 요약 + HISTORY_TOKEN_BUDGET 창
+# 지연 모델: completion 지연 = base + 입력 토큰 × per_1k / 1000 (스텁 sleep)
+
+import os, sys, time, json, asyncio, argparse
+from pathlib import Path
+from types import SimpleNamespace
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")  # 클라이언트 생성용 더미 키 (실제 호출 없음)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import chatbot  # noqa: E402
+
+# ===== 합성 대화 =====
+# 실제 답변 길이와 비슷한 한국어 Q/A
+QUESTION = "요즘 미국 금리랑 환율 흐름이 국내 증시에 어떤 영향을 주는지 궁금해요 {i}"
+ANSWER = ("결론부터 말씀드리면 미국 금리가 높게 유지되면 달러 강세로 원달러 환율이 오르고 외국인 자금이 "
+          "빠져나가면서 코스피에는 부담이 됩니다. 최근 연준은 금리를 동결했고 시장은 연내 인하 가능성을 "
+          "반영하고 있습니다. 환율이 안정되면 수출주 중심으로 반등 여지가 있습니다. ({i}번째 답변)")
+SUMMARY = ("사용자는 미국 금리, 원달러 환율, 코스피의 관계에 관심이 많다. 연준 동결과 연내 인하 기대, "
+           "달러 강세 시 외국인 자금 유출과 수출주 반등 가능성을 안내했다.")
+
+# ===== OpenAI 스텁 =====
+class _Completions:
+    def __init__(self, base: float, per_1k: float):
+        self.base, self.per_1k = base, per_1k
+        self.last_prompt_tokens = 0
+
+    async def create(self, model: str, messages: list, **kw):
+        if model == chatbot.SUMMARY_MODEL:
+            content = SUMMARY
+        else:
+            self.last_prompt_tokens = sum(chatbot.estimate_tokens(m["content"] or "") for m in messages)
+            await asyncio.sleep(self.base + self.last_prompt_tokens * self.per_1k / 1000)
+            content = ANSWER.format(i="bench")
+        msg = SimpleNamespace(content=content, tool_calls=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+async def _run(mode: str, turns: int, comp: _Completions) -> dict:
+    chatbot.aclient = SimpleNamespace(chat=SimpleNamespace(completions=comp))
+    chatbot.ROUTER_ENABLED = False
+    if mode == "before":
+        chatbot.HISTORY_TOKEN_BUDGET = 10 ** 9
+        chatbot.SUMMARY_MIN_OVERFLOW = 10 ** 9
+    else:
+        chatbot.HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+        chatbot.SUMMARY_MIN_OVERFLOW = 4
+
+    # 대화 누적 (after 모드는 백그라운드 요약이 따라잡은 정상 상태를 가정해 매 턴 요약 반영)
+    sid = f"bench-{mode}-{turns}"
+    for i in range(turns):
+        chatbot.add_turn(sid, "user", QUESTION.format(i=i))
+        chatbot.add_turn(sid, "assistant", ANSWER.format(i=i))
+        await chatbot.summarize_session(sid)
+
+    t0 = time.perf_counter()
+    await chatbot.chat({"message": QUESTION.format(i=turns), "session_id": sid})
+    wall = time.perf_counter() - t0
+    return {"mode": mode, "turns": turns, "prompt_tokens": comp.last_prompt_tokens, "latency_s": round(wall, 3)}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", default="5,20,50")
+    ap.add_argument("--base", type=float, default=0.5, help="completion 고정 지연(초)")
+    ap.add_argument("--per-1k", type=float, default=0.25, help="입력 1k 토큰당 추가 지연(초)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    comp = _Completions(args.base, args.per_1k)
+    results = []
+    for n in (int(x) for x in args.turns.split(",")):
+        for mode in ("before", "after"):
+            results.append(asyncio.run(_run(mode, n, comp)))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'turns':>6}{'mode':>8}{'prompt tok':>12}{'latency(s)':>12}")
+    for r in results:
+        print(f"{r['turns']:>6}{r['mode']:>8}{r['prompt_tokens']:>12}{r['latency_s']:>12}")
+
+if __name__ == "__main__":
+    main()
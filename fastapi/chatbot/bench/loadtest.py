@@ -0,0 +1,236 @@
+# loadtest.py — 오프라인 엔드투엔드 로드테스트 (스텁 업스트림, 자격증명 불필요)
+# 실행: cd fastapi/chatbot && python bench/loadtest.py --scenarios chat,chat_tool,markets --n 200 --concurrency 20
+# 비교: python bench/loadtest.py --out bench/results/after.json --compare bench/results/before.json
+# 구성: stubs.StubServer(OpenAI/FRED/ECOS/CLOVA HTTP) + stubs.install(yfinance/Mongo/TTS/ffmpeg)
+#       → chatbot.app을 httpx ASGITransport로 프로세스 내 구동(스케줄러/크롤러는 띄우지 않음)
+# 지표: 시나리오별 p50/p95/p99/평균/최대 지연, 처리량, 오류 수, /chat 단계별(debug timings) p50/p95, 스트림 TTFB
+
+import os, sys, json, time, asyncio, argparse, platform, subprocess, tempfile, logging
+from pathlib import Path
+from datetime import datetime, timezone
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+sys.path.insert(0, str(HERE.parent))
+import stubs  # noqa: E402
+
+# ===== 시나리오 =====
+# method, path, 요청 생성 함수(i → kwargs); 메시지에 번호를 붙여 동일 질문 병합(singleflight)을 피함
+def _chat(message: str, stream: bool = False, router: bool = False):
+    def make(i: int, opts: dict) -> dict:
+        body = {"message": f"{message} ({i})", "session_id": f"lt-{i}", "debug": True, "router": router}
+        if opts["no_cache"]:
+            body["no_cache"] = True
+        return {"json": body}
+    return ("POST", "/chat/stream" if stream else "/chat", make)
+
+def _stt(i: int, opts: dict) -> dict:
+    audio = b"RIFF" + b"\x00" * 32000   # 약 1초 분량 더미 오디오
+    return {"files": {"audio_file": ("bench.wav", audio, "audio/wav")}, "params": {"lang": "ko-KR"}}
+
+SCENARIOS = {
+    "chat":        _chat("오늘 하루 시장 분위기 어때요?"),                # 도구 없이 1회 completion
+    "chat_tool":   _chat("최근 물가와 금리 흐름 알려줘"),                  # 병렬 도구 2개 + 2차 completion
+    "chat_router": _chat("코스피 지금 얼마야", router=True),               # 로컬 라우터 경로
+    "chat_stream": _chat("최근 물가 흐름 알려줘", stream=True),            # SSE, TTFB 측정
+    "markets":     ("GET", "/api/markets", lambda i, o: {"params": {"indices": 1, "fx": 1}}),
+    "stt":         ("POST", "/api/stt", _stt),
+    "tts":         ("POST", "/api/tts", lambda i, o: {"json": {"text": f"오늘의 경제 브리핑입니다 {i}", "fmt": "MP3"}}),
+}
+
+# ===== 통계 =====
+def percentile(sorted_vals: list, p: float) -> float:
+    # nearest-rank 백분위 (정렬된 입력)
+    if not sorted_vals:
+        return 0.0
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+def summarize(values_s: list) -> dict:
+    v = sorted(x * 1000.0 for x in values_s)
+    if not v:
+        return {}
+    return {
+        "p50": round(percentile(v, 50), 2),
+        "p95": round(percentile(v, 95), 2),
+        "p99": round(percentile(v, 99), 2),
+        "mean": round(sum(v) / len(v), 2),
+        "max": round(v[-1], 2),
+    }
+
+# ===== 실행 =====
+def _parse_done(text: str) -> dict:
+    # SSE 본문에서 done 이벤트 데이터 추출
+    for block in text.split("\n\n"):
+        if block.startswith("event: done"):
+            for line in block.splitlines():
+                if line.startswith("data: "):
+                    return json.loads(line[6:])
+    return {}
+
+async def _one(client, method: str, path: str, kwargs: dict, stream: bool) -> dict:
+    t0 = time.perf_counter()
+    ttfb = None
+    if stream:
+        chunks = []
+        async with client.stream(method, path, **kwargs) as res:
+            async for chunk in res.aiter_text():
+                if ttfb is None and "event: token" in chunk:
+                    ttfb = time.perf_counter() - t0
+                chunks.append(chunk)
+        status, body = res.status_code, _parse_done("".join(chunks))
+    else:
+        res = await client.request(method, path, **kwargs)
+        status = res.status_code
+        body = res.json() if res.headers.get("content-type", "").startswith("application/json") else {}
+    ok = status == 200 and not (isinstance(body, dict) and body.get("error"))
+    return {"ok": ok, "latency": time.perf_counter() - t0, "ttfb": ttfb,
+            "timings": body.get("timings") if isinstance(body, dict) else None}
+
+async def run_scenario(client, name: str, n: int, concurrency: int, warmup: int, opts: dict) -> dict:
+    method, path, make = SCENARIOS[name]
+    stream = path.endswith("/stream")
+    seq = iter(range(-warmup, n))
+    samples = []
+
+    async def worker():
+        for i in seq:
+            r = await _one(client, method, path, make(i, opts), stream)
+            if i >= 0:
+                samples.append(r)
+
+    # 워밍업은 측정 제외 (seq를 공유하므로 앞쪽 warmup건이 먼저 소진됨)
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - t0
+
+    out = {
+        "requests": len(samples),
+        "errors": sum(1 for s in samples if not s["ok"]),
+        "concurrency": concurrency,
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "latency_ms": summarize([s["latency"] for s in samples]),
+    }
+    ttfbs = [s["ttfb"] for s in samples if s["ttfb"] is not None]
+    if ttfbs:
+        out["ttfb_ms"] = summarize(ttfbs)
+    timings = [s["timings"] for s in samples if s["timings"]]
+    if timings:
+        stages, paths = {}, {}
+        for t in timings:
+            paths[t.get("path", "?")] = paths.get(t.get("path", "?"), 0) + 1
+            for k, v in t.items():
+                if k not in ("path", "total") and isinstance(v, (int, float)):
+                    stages.setdefault(k, []).append(v)
+        out["paths"] = paths
+        out["stages_ms"] = {k: {m: summarize(v)[m] for m in ("p50", "p95")} for k, v in sorted(stages.items())}
+    return out
+
+def _git_rev() -> dict:
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=HERE.parent, capture_output=True, text=True).stdout.strip())
+        return {"commit": sha, "dirty": dirty}
+    except Exception:
+        return {"commit": "", "dirty": None}
+
+async def main_async(args) -> dict:
+    latency = stubs.Latency(_parse_kv(args.latency), jitter=args.jitter, seed=args.seed)
+    server = stubs.StubServer(latency).start()
+    os.environ.update(server.env())
+    fd, cred = tempfile.mkstemp(suffix=".json")   # /api/tts 키 경로 존재 검사 통과용
+    os.close(fd)
+    os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = cred
+
+    import httpx
+    import chatbot
+    logging.getLogger().setLevel(logging.WARNING)   # 요청별 INFO 로그(HTTP Request 등) 억제
+    stubs.install(chatbot, latency)
+
+    opts = {"no_cache": args.no_cache}
+    results = {}
+    transport = httpx.ASGITransport(app=chatbot.app)
+    print(f"{'scenario':<12}{'n':>6}{'err':>6}{'req/s':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}", file=sys.stderr)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        for name in args.scenarios.split(","):
+            if name not in SCENARIOS:
+                raise SystemExit(f"unknown scenario: {name} (choices: {', '.join(SCENARIOS)})")
+            if args.no_cache:
+                chatbot.TOOL_CACHE.purge()
+            results[name] = await run_scenario(client, name, args.n, args.concurrency, args.warmup, opts)
+            print(_line(name, results[name]), file=sys.stderr)
+    server.stop()
+    os.remove(cred)
+
+    return {
+        "meta": {
+            **_git_rev(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "n": args.n, "concurrency": args.concurrency, "warmup": args.warmup,
+            "no_cache": args.no_cache, "latency": latency.values, "jitter": args.jitter,
+        },
+        "scenarios": results,
+        "upstream_calls": dict(server.counts),
+    }
+
+def _parse_kv(s: str) -> dict:
+    out = {}
+    for part in filter(None, (s or "").split(",")):
+        k, v = part.split("=", 1)
+        out[k.strip()] = float(v)
+    return out
+
+def _line(name: str, r: dict) -> str:
+    lat = r["latency_ms"]
+    return (f"{name:<12}{r['requests']:>6}{r['errors']:>6}{r['throughput_rps']:>9}"
+            f"{lat.get('p50', 0):>10}{lat.get('p95', 0):>10}{lat.get('p99', 0):>10}")
+
+# ===== 회귀 비교 =====
+# 공통 시나리오의 p50/p95/p99 변화율 출력, --fail-over 초과 시 종료코드 1
+def compare(cur: dict, base: dict, fail_over: float) -> int:
+    worst = 0.0
+    print(f"{'scenario':<12}{'metric':>7}{'base':>10}{'cur':>10}{'delta':>9}")
+    for name, r in cur["scenarios"].items():
+        b = base.get("scenarios", {}).get(name)
+        if not b:
+            continue
+        for m in ("p50", "p95", "p99"):
+            bv, cv = b["latency_ms"].get(m, 0), r["latency_ms"].get(m, 0)
+            delta = (cv - bv) / bv if bv else 0.0
+            worst = max(worst, delta) if m == "p95" else worst
+            print(f"{name:<12}{m:>7}{bv:>10}{cv:>10}{delta:>+9.1%}")
+    if fail_over and worst > fail_over:
+        print(f"p95 regression {worst:+.1%} > {fail_over:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS))
+    ap.add_argument("--n", type=int, default=100, help="시나리오별 측정 요청 수")
+    ap.add_argument("--concurrency", type=int, default=10)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--latency", default="", help="업스트림 지연 덮어쓰기(초), 예: openai=1.2,ecos=0.3")
+    ap.add_argument("--jitter", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=7)
+    ap.add_argument("--no-cache", action="store_true", help="도구 캐시 우회(콜드 경로 측정)")
+    ap.add_argument("--timeout", type=float, default=120.0)
+    ap.add_argument("--out", default="", help="결과 JSON 경로 (기본: bench/results/loadtest-<commit>.json)")
+    ap.add_argument("--compare", default="", help="비교할 기준 결과 JSON")
+    ap.add_argument("--fail-over", type=float, default=0.0, help="p95 회귀 허용치(예: 0.2 = 20%%)")
+    args = ap.parse_args()
+
+    result = asyncio.run(main_async(args))
+    out = Path(args.out or HERE / "results" / f"loadtest-{result['meta']['commit'] or 'local'}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"saved: {out}", file=sys.stderr)
+
+    if args.compare:
+        base = json.loads(Path(args.compare).read_text())
+        sys.exit(compare(result, base, args.fail_over))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+# stubs.py — 로드테스트용 로컬 업스트림 스탠드인 (네트워크/자격증명 없음)
+# HTTP 스텁 서버 하나로 OpenAI(chat.completions/responses), FRED, ECOS, CLOVA STT를 흉내
+# 프로세스 내 스텁: yfinance(히스토리 DataFrame), MongoDB(mongomock), Google TTS, ffmpeg
+# 지연: 엔드포인트별 고정값 + 지터(±jitter 비율) → 실제 분포의 꼬리(p99)를 흉내
+
+import os, sys, json, time, random, stat, tempfile, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+# ===== 지연 설정 =====
+# 초 단위 기본값 (실측 대략치), loadtest.py --latency openai=1.2,ecos=0.3 으로 덮어쓰기
+DEFAULT_LATENCY = {
+    "openai": 0.8,      # chat.completions 1회
+    "openai_tok": 0.01, # 스트리밍 토큰 간격
+    "responses": 1.5,   # file_search
+    "fred": 0.25,
+    "ecos": 0.35,
+    "yfinance": 0.3,
+    "clova": 0.6,
+    "gtts": 0.4,
+    "mongo": 0.02,
+}
+
+class Latency:
+    def __init__(self, overrides: dict = None, jitter: float = 0.2, seed: int = 7):
+        self.values = {**DEFAULT_LATENCY, **(overrides or {})}
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, name: str):
+        base = self.values.get(name, 0.0)
+        if base <= 0:
+            return
+        with self._lock:
+            f = 1.0 + self._rng.uniform(-self.jitter, self.jitter)
+        time.sleep(base * f)
+
+# ===== OpenAI 응답 스크립트 =====
+# 도구 목록이 있고 마지막 메시지가 user면 키워드로 tool_calls 결정, tool 결과 뒤에는 최종 답변
+TOOL_RULES = [
+    ("뉴스", "get_latest_news", {"n": 5}),
+    ("물가", "get_indicator", {"indicator_type": "CPI"}),
+    ("금리", "get_indicator", {"indicator_type": "US_FED_TARGET"}),
+    ("코스피", "get_market", {"market_type": "KOSPI"}),
+    ("환율", "get_market", {"market_type": "USD_KRW"}),
+    ("문서", "search_docs", {"query": "보고서 요약"}),
+]
+ANSWER = "결론부터 말씀드리면 최근 지표는 안정적인 흐름입니다. 세부 수치는 위 자료를 참고하세요."
+
+def _pick_tool_calls(body: dict) -> list:
+    msgs = body.get("messages") or []
+    if not body.get("tools") or not msgs or msgs[-1].get("role") != "user":
+        return []
+    text = msgs[-1].get("content") or ""
+    calls = []
+    for kw, name, args in TOOL_RULES:
+        if kw in text:
+            calls.append({
+                "id": f"call_{len(calls)}_{name}",
+                "type": "function",
+                "function": {"name": name, "arguments": json.dumps(args, ensure_ascii=False)},
+            })
+    return calls
+
+def _completion(body: dict, calls: list) -> dict:
+    msg = {"role": "assistant", "content": None if calls else ANSWER}
+    if calls:
+        msg["tool_calls"] = calls
+    return {
+        "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": msg, "finish_reason": "tool_calls" if calls else "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+def _chunk(body: dict, delta: dict, finish=None) -> bytes:
+    data = {
+        "id": "chatcmpl-stub", "object": "chat.completion.chunk", "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+    }
+    return f"data: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+def _response(body: dict) -> dict:
+    # Responses API(file_search) 최소 형태 → SDK의 output_text가 읽을 수 있게 message/output_text 구성
+    return {
+        "id": "resp-stub", "object": "response", "created_at": int(time.time()), "status": "completed",
+        "model": body.get("model", "stub"),
+        "output": [{
+            "type": "message", "id": "msg-stub", "role": "assistant", "status": "completed",
+            "content": [{"type": "output_text", "text": "문서 기준 요약: 스텁 응답입니다.", "annotations": []}],
+        }],
+        "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+    }
+
+# ===== FRED / ECOS 페이로드 =====
+def _fred_payload() -> dict:
+    start = datetime(2024, 1, 1)
+    obs = [{"date": (start + timedelta(days=30 * i)).strftime("%Y-%m-%d"), "value": f"{5.33 - 0.05 * i:.2f}"} for i in range(18)]
+    return {"observations": obs}
+
+def _ecos_payload(kind: str) -> dict:
+    if kind == "KeyStatisticList":
+        rows = [
+            {"KEYSTAT_NAME": "한국은행 기준금리", "DATA_VALUE": "2.5", "UNIT_NAME": "%", "TIME": "20250828"},
+            {"KEYSTAT_NAME": "콜금리(익일물)", "DATA_VALUE": "2.52", "UNIT_NAME": "%", "TIME": "20250828"},
+        ]
+    else:
+        now = datetime.now()
+        rows = [{"TIME": (now - timedelta(days=30 * (12 - i))).strftime("%Y%m"), "DATA_VALUE": f"{113.0 + 0.2 * i:.2f}"} for i in range(12)]
+    return {kind: {"list_total_count": len(rows), "row": rows}}
+
+# ===== HTTP 스텁 서버 =====
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency: Latency = None
+    counts: dict = None
+
+    def log_message(self, *a):
+        pass
+
+    def _count(self, name: str):
+        with self.server.lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def _json(self, obj: dict, status: int = 200):
+        raw = json.dumps(obj, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _body(self) -> bytes:
+        n = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(n) if n else b""
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path.startswith("/fred"):
+            self._count("fred"); self.latency.sleep("fred")
+            return self._json(_fred_payload())
+        if path.startswith("/ecos/"):
+            kind = path.split("/")[2]
+            self._count("ecos"); self.latency.sleep("ecos")
+            return self._json(_ecos_payload(kind))
+        self._json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        raw = self._body()
+        if path.endswith("/chat/completions"):
+            return self._chat(json.loads(raw or b"{}"))
+        if path.endswith("/responses"):
+            self._count("responses"); self.latency.sleep("responses")
+            return self._json(_response(json.loads(raw or b"{}")))
+        if path.startswith("/clova"):
+            self._count("clova"); self.latency.sleep("clova")
+            raw_text = f"스텁 음성 인식 결과 {len(raw)}바이트".encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(raw_text)))
+            self.end_headers()
+            return self.wfile.write(raw_text)
+        self._json({"error": "not found"}, 404)
+
+    def _chat(self, body: dict):
+        self._count("openai")
+        calls = _pick_tool_calls(body)
+        self.latency.sleep("openai")
+        if not body.get("stream"):
+            return self._json(_completion(body, calls))
+
+        # 스트리밍: tool_calls는 이름/인자 두 조각, 답변은 어절 단위 토큰
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        if calls:
+            for i, c in enumerate(calls):
+                self.wfile.write(_chunk(body, {"tool_calls": [{"index": i, "id": c["id"], "type": "function",
+                                                                "function": {"name": c["function"]["name"], "arguments": ""}}]}))
+                self.wfile.write(_chunk(body, {"tool_calls": [{"index": i, "function": {"arguments": c["function"]["arguments"]}}]}))
+            self.wfile.write(_chunk(body, {}, "tool_calls"))
+        else:
+            self.wfile.write(_chunk(body, {"role": "assistant", "content": ""}))
+            for word in ANSWER.split(" "):
+                self.latency.sleep("openai_tok")
+                self.wfile.write(_chunk(body, {"content": word + " "}))
+                self.wfile.flush()
+            self.wfile.write(_chunk(body, {}, "stop"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class StubServer:
+    """OpenAI/FRED/ECOS/CLOVA 스텁 HTTP 서버 (백그라운드 스레드)"""
+
+    def __init__(self, latency: Latency, host: str = "127.0.0.1", port: int = 0):
+        self.counts: dict = {}
+        handler = type("Handler", (_Handler,), {"latency": latency, "counts": self.counts})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def env(self) -> dict:
+        # chatbot import 전에 설정할 환경변수 (엔드포인트/더미 키)
+        return {
+            "OPENAI_BASE_URL": f"{self.base}/v1",
+            "OPENAI_API_KEY": "sk-bench",
+            "FRED_BASE": f"{self.base}/fred/series/observations",
+            "ECOS_BASE": f"{self.base}/ecos",
+            "CSR_URL": f"{self.base}/clova/stt",
+            "VECTOR_STORE_ID": os.getenv("VECTOR_STORE_ID") or "vs_bench",
+        }
+
+# ===== 프로세스 내 스텁 =====
+# yfinance: 1분봉 하루치 / 일봉 5일치 DataFrame (UTC 인덱스)
+_PERIOD_BARS = {"1d": 1, "5d": 5, "1mo": 22, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260}
+
+def _history_frame(ticker: str, interval: str, period: str = "") -> pd.DataFrame:
+    # 1분봉: 하루 390개 / 일봉: 기간별 거래일 수 (기본 5일)
+    days = _PERIOD_BARS.get(period or "", 1 if interval == "1m" else 5)
+    n = 390 * days if interval == "1m" else days
+    freq = "1min" if interval == "1m" else "1D"
+    end = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    idx = pd.date_range(end=end, periods=n, freq=freq, tz="UTC")
+    base = 100.0 + (sum(map(ord, ticker)) % 900)
+    close = [base * (1 + 0.0005 * ((i * 37) % 11 - 5)) for i in range(n)]
+    return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": [1000] * n}, index=idx)
+
+def _since(df: pd.DataFrame, start) -> pd.DataFrame:
+    # start(증분 조회) 이후 봉만
+    return df if start is None else df[df.index >= pd.Timestamp(start)]
+
+class FakeTicker:
+    def __init__(self, ticker: str, latency: Latency):
+        self.ticker, self.latency = ticker, latency
+
+    def history(self, period: str = "1d", interval: str = "1m", start=None, **kw) -> pd.DataFrame:
+        self.latency.sleep("yfinance")
+        return _since(_history_frame(self.ticker, interval, period), start)
+
+class FakeYF:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def Ticker(self, ticker: str) -> FakeTicker:
+        return FakeTicker(ticker, self.latency)
+
+    def download(self, tickers, period: str = "1d", interval: str = "1m", start=None, **kw) -> pd.DataFrame:
+        # 일괄 조회: 요청 1회 지연 + (Price, Ticker) 2단 컬럼
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        self.latency.sleep("yfinance")
+        frames = {t: _since(_history_frame(t, interval, period), start) for t in tickers}
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1).sort_index(axis=1)
+
+# Google TTS: synthesize_speech만 흉내 (오디오 바이트 고정)
+class FakeTTSClient:
+    latency: Latency = None
+
+    def __init__(self, *a, **kw):
+        pass
+
+    def synthesize_speech(self, **kw):
+        self.latency.sleep("gtts")
+        return SimpleNamespace(audio_content=b"ID3" + b"\x00" * 4096)
+
+def fake_ffmpeg() -> str:
+    # 실제 ffmpeg가 없으면 입력을 그대로 출력 경로로 복사하는 스크립트 (마지막 인자가 출력)
+    fd, path = tempfile.mkstemp(prefix="fake-ffmpeg-", suffix=".py")
+    with os.fdopen(fd, "w") as f:
+        f.write(f"#!{sys.executable}\nimport sys, shutil\nshutil.copyfile(sys.argv[3], sys.argv[-1])\n")
+    os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    return path
+
+def install(chatbot, latency: Latency, seed_news: int = 50):
+    """chatbot 모듈의 프로세스 내 의존성을 스텁으로 교체 (import 이후 호출)"""
+    import mongomock
+
+    chatbot.yf = FakeYF(latency)
+
+    mc = mongomock.MongoClient()
+    coll = mc[chatbot.DB_NAME][chatbot.COLL_NAME]
+    now = datetime.now(timezone.utc)
+    coll.insert_many([{
+        "title": f"스텁 경제 뉴스 {i}", "url": f"https://example.com/news/{i}", "press": "스텁일보",
+        "published_at": now - timedelta(minutes=i), "collected_at": now - timedelta(minutes=i),
+    } for i in range(seed_news)])
+
+    def _client(*a, **kw):
+        latency.sleep("mongo")
+        return mc
+    chatbot.MongoClient = _client
+
+    FakeTTSClient.latency = latency
+    chatbot.texttospeech.TextToSpeechClient = FakeTTSClient
+    chatbot.service_account.Credentials.from_service_account_file = staticmethod(lambda *a, **kw: None)
+
+    if not os.path.exists(chatbot.FFMPEG):
+        chatbot.FFMPEG = fake_ffmpeg()
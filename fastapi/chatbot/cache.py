@@ -0,0 +1,61 @@
+# cache.py — 스레드 안전 TTL + LRU 캐시 (항목별 만료시각, 적중/미스/만료/축출 카운터)
+# get은 없거나 만료면 MISS(또는 default) 반환 → None도 값으로 캐시 가능
+# 사용: from cache import TTLCache, MISS → c = TTLCache(512); c.set(key, value, ttl=60); c.get(key) is MISS
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any
+
+MISS = object()
+
+class TTLCache:
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()  # key → (만료 monotonic, 값)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.expired = self.evictions = 0
+
+    def get(self, key, default=MISS):
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            if item[0] <= now:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key, value, ttl: float):
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def purge(self, match=None) -> int:
+        # match(key) → True인 항목만 삭제, None이면 전체
+        with self._lock:
+            keys = [k for k in self._data if match is None or match(k)]
+            for k in keys:
+                del self._data[k]
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses,
+                "expired": self.expired, "evictions": self.evictions,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -6,17 +6,19 @@
 
 # ===== 기본 임포트 =====
 # 표준/서드파티 라이브러리 로드 (FastAPI, OpenAI, MongoDB, APScheduler, GCP TTS, yfinance, pandas 등)
-import os, logging, subprocess, io, requests, tempfile, re, shutil, json
-from typing import Dict, Any, List, Optional
+import os, logging, subprocess, io, requests, tempfile, re, shutil, json, asyncio, time, threading, functools, contextlib, contextvars, zlib, hmac
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Iterable, List, Optional
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 
-from fastapi import FastAPI, UploadFile, File, Query, Body
+from fastapi import FastAPI, UploadFile, File, Query, Body, Request, Header, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from pymongo import MongoClient, DESCENDING
 from apscheduler.schedulers.background import BackgroundScheduler
 from google.cloud import texttospeech
@@ -24,6 +26,23 @@ from google.oauth2 import service_account
 
 import yfinance as yf
 import pandas as pd
+import numpy as np
+
+from metrics import REGISTRY
+from market_calendar import CALENDAR, MARKETS, market_for
+from ticker_index import TICKERS, is_krx_code, normalize as normalize_name
+from cache import TTLCache, MISS
+from sessions import SessionStore
+from singleflight import SingleFlight, AsyncSingleFlight
+from market_snapshot import MarketSnapshot
+from market_stream import MarketHub
+from sse import frame as _sse
+from ts_store import TimeSeriesStore
+import downsample
+import technicals
+import fx
+import movers
+from alerts import AlertBook, AlertHub, AlertError
 
 # ===== 로깅 =====
 # 전역 로거 설정 (레벨/포맷)
@@ -31,13 +50,64 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 log = logging.getLogger("chatbot")
 
 # ===== 고정 상수 =====
-# KST 타임존 상수
+# KST 타임존 상수, 도구 스레드 안 HTTP 호출 타임아웃(도구 타임아웃보다 길면 타임아웃 뒤에도 스레드를 그만큼 점유)
 KST = ZoneInfo("Asia/Seoul")
+HTTP_TIMEOUT_SECS = float(os.getenv("HTTP_TIMEOUT_SECS", "15"))
+DATA_DIR = Path(os.getenv("DATA_DIR", "var"))   # 실행 중 생기는 파일(시계열 저장소/알림) 위치 — 작업 디렉터리 기준, 소스 트리 밖으로 지정 가능
 
 # ===== OpenAI =====
-# OPENAI_API_KEY 환경변수 사용, 고정 UA 부여
+# OPENAI_API_KEY 환경변수 사용, 고정 UA 부여 (OPENAI_BASE_URL 지정 시 SDK가 해당 엔드포인트 사용)
+# client: 동기 호출용, aclient: 챗 경로(이벤트 루프 비차단)용
 API_KEY = os.getenv("OPENAI_API_KEY", "")
-client = OpenAI(api_key=API_KEY, default_headers={"User-Agent": "dgict-bot/1.0"})
+client = OpenAI(api_key=API_KEY, default_headers={"User-Agent": "dgict-bot/1.0"}, timeout=HTTP_TIMEOUT_SECS)
+aclient = AsyncOpenAI(api_key=API_KEY, default_headers={"User-Agent": "dgict-bot/1.0"})
+
+# ===== 계측 =====
+# 요청 단계별(router/completion_1/tools/completion_2/session_write) + 도구별 + 업스트림별 지연 히스토그램
+# 요청 단위 타이밍은 contextvar dict에 누적 (도구 스레드 풀도 컨텍스트를 복사해 실행하므로 도구 스레드까지 전달됨)
+STAGE_SECONDS = REGISTRY.histogram("chat_stage_seconds", "Chat request stage latency", ("stage",))
+TOOL_SECONDS = REGISTRY.histogram("chat_tool_seconds", "Tool execution latency", ("tool",))
+UPSTREAM_SECONDS = REGISTRY.histogram("upstream_seconds", "Upstream call latency", ("upstream",))
+UPSTREAM_ERRORS = REGISTRY.counter("upstream_errors_total", "Upstream call failures", ("upstream",))
+CHAT_SECONDS = REGISTRY.histogram("chat_request_seconds", "End-to-end chat latency by answer path", ("path",))
+STREAM_TTFB_SECONDS = REGISTRY.histogram("chat_stream_first_token_seconds", "Time to first streamed token")
+HTTP_SECONDS = REGISTRY.histogram("http_request_seconds", "HTTP handler latency", ("route", "method", "status"))
+_REQ_TIMINGS: contextvars.ContextVar = contextvars.ContextVar("req_timings", default=None)
+_REQ_SESSION: contextvars.ContextVar = contextvars.ContextVar("req_session", default="default")   # 세션별 도구(가격 알림)용
+
+def _add_timing(name: str, seconds: float):
+    timings = _REQ_TIMINGS.get()
+    if timings is not None:
+        timings[name] = round(timings.get(name, 0.0) + seconds, 4)
+
+def _record_stage(name: str, dt: float):
+    STAGE_SECONDS.observe(dt, stage=name)
+    _add_timing(name, dt)
+
+def _record_upstream(name: str, dt: float):
+    UPSTREAM_SECONDS.observe(dt, upstream=name)
+    _add_timing(f"upstream:{name}", dt)
+
+@contextlib.contextmanager
+def stage(name: str):
+    # 블록 안에서 yield하는 스트리밍 경로에는 쓰지 않음 (클라이언트 대기 시간까지 포함됨) → _record_stage로 직접 기록
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_stage(name, time.perf_counter() - t0)
+
+@contextlib.contextmanager
+def upstream(name: str):
+    # openai / ecos / fred / yfinance / mongo / clova / gtts
+    t0 = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream=name)
+        raise
+    finally:
+        _record_upstream(name, time.perf_counter() - t0)
 
 # =============================================================
 # CHATBOT (RAG + 뉴스 + 지표 + 시세 + Function Calling + 세션/라우트)
@@ -57,12 +127,20 @@ SYSTEM_INSTRUCTIONS = """
 - 최신 뉴스/핫이슈: get_latest_news
 - 경제지표(CPI, PPI, GDP, 기준금리/무역수지/경상수지, 미국 금리): get_indicator
 - 주가지수/환율: get_market
+- 그 밖의 통화쌍 환율(파운드/원, 유로/엔 등): get_market(market_type=FX, pair)
+- 여러 종목 시세/비교: get_market(QUOTE, tickers 목록으로 한 번에 호출)
+- 이동평균/RSI/변동성/낙폭/52주 범위(기술적 지표): get_technicals
+- 오늘 많이 오른/내린 종목, 거래량 급증, 상승·하락 종목 수: get_top_movers
+- "OO이 N 넘으면/아래로 떨어지면 알려줘" 가격 알림 등록·목록·취소: price_alert
 - 웹서비스 기능/사용법/도움말: search_docs
 - 그 외 일반 질문은 도구 없이 답하라. (GPT-5모델)
 """
 
 # ===== Function Calling 스키마 =====
 # 모델이 호출할 수 있는 함수 정의 (뉴스/지표/시세/RAG)
+QUOTE_MAX_TICKERS = int(os.getenv("QUOTE_MAX_TICKERS", "10"))   # QUOTE 한 번에 비교할 최대 종목 수
+MOVERS_DEPTH_MAX = 30                                            # get_top_movers count 상한 (보관 순위 깊이)
+
 TOOLS = [
     {
         "type": "function",
@@ -115,12 +193,23 @@ TOOLS = [
                 "USD_KRW",
                 "JPY_KRW",
                 "EUR_USD",
+                "FX",
                 "QUOTE"
               ]
             },
+            "pair": {
+              "type": "string",
+              "description": "market_type=FX일 때 통화쌍 (예: GBP_KRW, EUR_JPY, CHF_KRW, 파운드/원) — 달러 기준 환율로 계산"
+            },
             "ticker": {
               "type": "string",
-              "description": "개별 종목 심볼 (예: NVDA, AAPL, 005930.KS, 086520.KQ)"
+              "description": "개별 종목 심볼 또는 종목명 (예: NVDA, AAPL, 005930.KS, 086520.KQ, 삼성전자, 엔비디아)"
+            },
+            "tickers": {
+              "type": "array",
+              "items": {"type": "string"},
+              "maxItems": QUOTE_MAX_TICKERS,
+              "description": "여러 종목을 비교할 때 종목 심볼/종목명 목록 (한 번에 일괄 조회, 예: [\"삼성전자\", \"SK하이닉스\", \"NVDA\"])"
             }
           },
           "required": ["market_type"]
@@ -128,6 +217,55 @@ TOOLS = [
       }
     },
 
+    {
+        "type": "function",
+        "function": {
+            "name": "get_technicals",
+            "description": "지수/환율/종목의 기술적 지표(이동평균 5·20·60·120·200일, RSI(14), 실현 변동성 20·60일, 고점 대비 낙폭, 52주 범위, 기간 수익률)를 일봉 기준으로 조회한다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "ticker": {"type": "string", "description": "지수/환율 키, 종목명 또는 티커 (예: KOSPI, 나스닥, USD_KRW, 삼성전자, NVDA)"}
+                },
+                "required": ["ticker"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_top_movers",
+            "description": "코스피/코스닥/미국 대형주 유니버스(지수 구성 종목 중 시가총액 상위 일부) 안에서 상승률·하락률·거래량 급증 상위와 상승/하락 종목 수를 조회한다. 지수 전체 집계가 아니다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "universe": {"type": "string", "enum": ["KOSPI_LARGE", "KOSDAQ_LARGE", "US_LARGE"], "default": "KOSPI_LARGE"},
+                    "kind": {"type": "string", "enum": ["all", "gainers", "losers", "volume", "breadth"], "default": "all"},
+                    "count": {"type": "integer", "minimum": 1, "maximum": MOVERS_DEPTH_MAX, "default": 5}
+                },
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "price_alert",
+            "description": "가격 알림을 등록/조회/취소한다. 지수·환율·통화쌍·종목이 지정 가격 이상(above) 또는 이하(below)가 되면 사용자 세션으로 알림이 전달된다.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": ["create", "list", "cancel"], "default": "create"},
+                    "ticker": {"type": "string", "description": "대상 (예: USD/KRW, GBP_KRW, KOSPI, 삼성전자, NVDA)"},
+                    "price": {"type": "number", "description": "알림 기준 가격"},
+                    "direction": {"type": "string", "enum": ["above", "below", "auto"], "default": "auto",
+                                  "description": "above: 이상이 되면, below: 이하가 되면, auto: 현재가 기준으로 판단"},
+                    "alert_id": {"type": "integer", "description": "action=cancel일 때 취소할 알림 번호"}
+                },
+                "required": ["action"]
+            }
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -182,7 +320,8 @@ def fetch_latest_topn_from_mongo(n: int = 5):
         {"$limit": int(n)},
         {"$project": {"_id": 0, "title": 1, "url": 1, "published_at": 1}},
     ]
-    rows = list(coll.aggregate(pipeline))
+    with upstream("mongo"):
+        rows = list(coll.aggregate(pipeline))
     for r in rows:
         pa = r.get("published_at")
         if isinstance(pa, datetime):
@@ -208,13 +347,26 @@ def format_topn_md(rows):
             out.append(f"{i}. {title} · {date}")
     return "\n".join(out)
 
+# ===== 요청 병합(Singleflight) =====
+# 같은 키로 동시에 들어온 업스트림 호출은 leader 하나만 실행 (singleflight.py) — 결과 보관은 TTL 캐시 담당
+FLIGHT = SingleFlight()
+
+def coalesced(fn):
+    # 데코레이터: (함수명, 인자) 단위로 동시 호출 병합
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (fn.__name__, args, tuple(sorted(kwargs.items())))
+        return FLIGHT.do(key, fn, *args, **kwargs)
+    return wrapper
+
 # ===== FRED =====
 # API 키/엔드포인트 상수
 FRED_KEY = os.getenv("FRED_API_KEY", "")
-FRED_BASE = "https://api.stlouisfed.org/fred/series/observations"
+FRED_BASE = os.getenv("FRED_BASE", "https://api.stlouisfed.org/fred/series/observations")
 
 # ===== FRED 조회 유틸 =====
 # 관측치 조회(빈값 필터), FEDFUNDS/목표범위 처리
+@coalesced
 def _fred_observations(series_id: str, start: str = "2024-01-01") -> list:
     params = {
         "series_id": series_id,
@@ -222,8 +374,9 @@ def _fred_observations(series_id: str, start: str = "2024-01-01") -> list:
         "file_type": "json",
         "observation_start": start
     }
-    r = requests.get(FRED_BASE, params=params, timeout=20)
-    r.raise_for_status()
+    with upstream("fred"):
+        r = requests.get(FRED_BASE, params=params, timeout=HTTP_TIMEOUT_SECS)
+        r.raise_for_status()   # HTTP 오류도 upstream_errors_total에 집계되도록 블록 안에서 확인
     obs = r.json().get("observations", []) or []
     return [o for o in obs if o.get("value") not in ("", ".")]
 
@@ -254,24 +407,27 @@ def get_us_fed_funds_latest(use_target_range: bool = False) -> dict:
 # ===== ECOS =====
 # BOK ECOS 엔드포인트/키 상수
 ECOS_API_KEY = os.getenv("ECOS_API_KEY", "")
-ECOS_BASE = "https://ecos.bok.or.kr/api"
+ECOS_BASE = os.getenv("ECOS_BASE", "https://ecos.bok.or.kr/api")
 
 # ===== ECOS 조회 유틸 =====
 # 100대 지표 목록, 코드별 월별 시계열 조회
 def fetch_all_key_statistics() -> dict:
     try:
         url = f"{ECOS_BASE}/KeyStatisticList/{ECOS_API_KEY}/json/kr/1/200/"
-        r = requests.get(url, timeout=30)
-        if r.status_code != 200:
-            return {"error": f"API {r.status_code}"}
+        with upstream("ecos"):
+            r = requests.get(url, timeout=HTTP_TIMEOUT_SECS)
+            r.raise_for_status()   # HTTP 오류도 upstream_errors_total에 집계되도록 블록 안에서 확인
         rows = (r.json().get("KeyStatisticList") or {}).get("row", [])
         if not rows:
             return {"error": "데이터 없음"}
         return {"ok": True, "indicators": rows}
+    except requests.HTTPError as e:
+        return {"error": f"API {e.response.status_code}"}
     except Exception as e:
         log.exception("ECOS 100대 지표 조회 오류")
         return {"error": str(e)}
 
+@coalesced
 def fetch_ecos_stat_by_code(stat_code: str, start_ym: str = None, end_ym: str = None) -> dict:
     try:
         if not end_ym:
@@ -280,13 +436,15 @@ def fetch_ecos_stat_by_code(stat_code: str, start_ym: str = None, end_ym: str =
             start_dt = datetime.now(KST) - timedelta(days=365)
             start_ym = start_dt.strftime("%Y%m")
         url = f"{ECOS_BASE}/StatisticSearch/{ECOS_API_KEY}/json/kr/1/100/{stat_code}/M/{start_ym}/{end_ym}/"
-        r = requests.get(url, timeout=30)
-        if r.status_code != 200:
-            return {"error": f"API {r.status_code}"}
+        with upstream("ecos"):
+            r = requests.get(url, timeout=HTTP_TIMEOUT_SECS)
+            r.raise_for_status()
         rows = (r.json().get("StatisticSearch") or {}).get("row", [])
         if not rows:
             return {"error": "데이터 없음"}
         return {"ok": True, "data": rows}
+    except requests.HTTPError as e:
+        return {"error": f"API {e.response.status_code}"}
     except Exception as e:
         log.exception("ECOS 코드 조회 오류")
         return {"error": str(e)}
@@ -417,56 +575,199 @@ FX_MAP: Dict[str, Dict[str, str]] = {
     "USD_CNY": {"ticker": "USDCNY=X", "name": "달러/위안"},
 }
 
+# ===== 환율 크로스 =====
+# FX_MAP 통화쌍은 달러 기준 다리(USDKRW=X, EURUSD=X …)만 조회하고 나머지(엔/원, 유로/원 …)는 계산
+# FX_SNAPSHOT_EXTRA: 스냅샷에 미리 받아 둘 추가 통화 (예: CAD,CHF → 그 통화가 낀 임의 쌍도 조회 없이 응답)
+FX_SNAPSHOT_EXTRA = tuple(c for c in (x.strip().upper() for x in os.getenv("FX_SNAPSHOT_EXTRA", "").split(",")) if c in fx.CURRENCIES)
+FX = fx.FxEngine([fx.parse_pair(k) for k in FX_MAP], extra=FX_SNAPSHOT_EXTRA)
+
 def _round_or_none(v, nd=2):
     # float 변환 + 반올림, 실패 시 None
     try: return round(float(v), nd)
     except Exception: return None
 
+def _price_digits(ticker: str, price: Optional[float]) -> int:
+    # 10 미만으로 호가되는 환율(EURUSD 1.0843 → 2자리면 크로스 계산에 0.3% 오차)만 소수 4자리
+    # 원화 환율(USDKRW 1,380.25 / JPYKRW 9.31)과 주가·지수는 2자리 유지
+    t = ticker.upper()
+    if t.endswith("=X") and not t.endswith("KRW=X") and price is not None and abs(price) < 10:
+        return 4
+    return 2
+
 def _normalize_ticker(t: str) -> str:
     # Yahoo 클래스주 표기 보정 (BRK.B → BRK-B)
     if "." in t and t.upper().split(".")[-1] in ("A","B","C","D","E","F"):
         return t.replace(".", "-")
     return t
 
+@coalesced
 def fetch_quote_yf(ticker: str) -> Dict[str, Any]:
-    # yfinance 히스토리 조회 → 현재가/전일비/등락률/기준시각(KST) 계산
+    # 단건 시세 (거래 캘린더 TTL 캐시: 장중 짧게, 휴장 중엔 다음 개장까지)
+    # 1분봉/일봉 모두 비어 온 티커(상폐·오타 등)는 YF_NEGATIVE_TTL 동안 재조회하지 않음
     tkr = _normalize_ticker(ticker)
+    hit = QUOTE_CACHE.get(tkr)
+    if hit is not MISS:
+        if hit.get("price") is None:
+            QUOTE_STATS.record("negative_hit", 0.0)
+        return hit
+    q = _fetch_quote_yf_live(tkr)
+    if q.get("price") is not None:
+        QUOTE_CACHE.set(tkr, q, CALENDAR.quote_ttl(tkr))
+    return q
+
+# ===== 단건 시세 헤지 조회 =====
+# 1분봉 요청 후 hedge 지연(최근 1분봉 지연 p90, 고정값 지정 가능)까지 응답이 없으면 5일/일봉을 병렬로 추가 요청
+# 1분봉이 먼저 오고 2행 이상 → 그대로 사용(일봉 결과는 버림), 일봉이 먼저 오고 2행 이상이면 일봉의 현재가/기준시각만 사용
+# (변동/등락률은 항상 1분봉 직전 봉 대비 — 헤지 승리 시 None, 늦게 온 1분봉이 캐시를 온전한 시세로 갱신)
+# 진 쪽 요청은 풀에서 아직 시작 전일 때만 취소됨 — 이미 실행 중이면 야후 요청은 끝까지 가고 결과만 버림(hedges_unused)
+# 1분봉이 비었거나 1행이면 일봉을 즉시(아직 안 띄웠으면) 요청해서 보완
+YF_HEDGE_DELAY = os.getenv("YF_HEDGE_DELAY", "auto")            # 초 또는 auto
+YF_HEDGE_MIN, YF_HEDGE_MAX = 0.15, 2.0
+YF_NEGATIVE_TTL = float(os.getenv("YF_NEGATIVE_TTL", "300"))
+_YF_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("YF_POOL_SIZE", "16")), thread_name_prefix="yf-hedge")
+QUOTE_PATH_SECONDS = REGISTRY.histogram("quote_path_seconds", "Single-quote latency by winning path", ("path",))
+
+class QuoteStats:
+    # 경로별 승리 횟수/지연 + hedge 발사/미사용 횟수, 1분봉 지연 창(auto hedge 지연 산출)
+    PATHS = ("intraday", "hedge_daily", "fallback", "intraday_partial", "empty", "negative_hit")
+
+    def __init__(self, window: int = 200):
+        self._lock = threading.Lock()
+        self.wins = {p: 0 for p in self.PATHS}
+        self.total_s = {p: 0.0 for p in self.PATHS}
+        self.hedges = self.hedges_unused = 0
+        self._intraday_lat: deque = deque(maxlen=window)
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self.wins[path] += 1
+            self.total_s[path] += seconds
+        QUOTE_PATH_SECONDS.observe(seconds, path=path)
+
+    def hedge(self, used: Optional[bool] = None):
+        # None: hedge 발사 / False: 1분봉이 이겨 hedge 결과 미사용
+        with self._lock:
+            if used is None:
+                self.hedges += 1
+            elif not used:
+                self.hedges_unused += 1
+
+    def intraday_latency(self, seconds: float):
+        with self._lock:
+            self._intraday_lat.append(seconds)
+
+    def hedge_delay(self) -> float:
+        if YF_HEDGE_DELAY != "auto":
+            return float(YF_HEDGE_DELAY)
+        with self._lock:
+            lat = sorted(self._intraday_lat)
+        if len(lat) < 20:
+            return 0.5
+        return min(YF_HEDGE_MAX, max(YF_HEDGE_MIN, lat[int(len(lat) * 0.9)]))
+
+    def stats(self) -> dict:
+        delay = self.hedge_delay()
+        with self._lock:
+            n = sum(self.wins.values())
+            return {
+                "calls": n,
+                "wins": dict(self.wins),
+                "win_ratio": {p: round(c / n, 4) for p, c in self.wins.items()} if n else {},
+                "avg_ms": {p: round(self.total_s[p] / c * 1000, 1) for p, c in self.wins.items() if c},
+                "hedges": self.hedges,
+                "hedges_unused": self.hedges_unused,
+                "hedge_delay_s": round(delay, 3),
+            }
+
+QUOTE_STATS = QuoteStats()
+
+# ===== 로컬 시계열 저장소 =====
+# 티커별 OHLCV 봉을 디스크 memmap 컬럼으로 보관 (ts_store) → 재시작 후에도 유지, 조회는 마지막 봉 이후만 증분 요청
+# 처음이거나 요청 기간이 저장 범위보다 길면 기간 전체 조회(백필), 1분봉 공백이 TS_INTRADAY_MAX_GAP 넘으면 다시 전체
+TS_STORE_DIR = os.getenv("TS_STORE_DIR", str(DATA_DIR / "ts"))
+TS_STORE = TimeSeriesStore(TS_STORE_DIR, max_rows={"1m": int(os.getenv("TS_MAX_ROWS_1M", "20000"))})
+TS_INTRADAY_MAX_GAP = 7 * 86400      # 야후 1분봉 요청 1회 최대 범위
+TS_BATCH_LOOKBACK = 86400            # 일괄 증분 묶음 단위 (휴장 중인 티커 하나 때문에 전체를 길게 받지 않도록)
+TS_TAIL_ROWS = 2                     # 시세 계산용 끝부분 행 수
+_PERIOD_SECONDS = {"1d": 86400, "5d": 5 * 86400, "1mo": 31 * 86400, "3mo": 92 * 86400, "6mo": 183 * 86400,
+                   "1y": 366 * 86400, "2y": 731 * 86400, "5y": 1827 * 86400, "10y": 3653 * 86400}
+
+def _history(tkr: str, interval: str, period: Optional[str] = None, start: Optional[int] = None) -> Optional[pd.DataFrame]:
+    # 조회 실패(예외)는 None, 데이터 없음은 빈 DataFrame → 음성 캐시는 "정상 응답인데 비어 있음"에만
+    # start(epoch 초)가 있으면 그 시각 이후만, 없으면 period 전체
+    kw = {"start": datetime.fromtimestamp(start, timezone.utc)} if start is not None else {"period": period}
+    try:
+        with upstream("yfinance"):
+            hist = yf.Ticker(tkr).history(interval=interval, auto_adjust=False, **kw)
+    except Exception:
+        return None
+    if hist is not None and "Close" in hist.columns:
+        return hist.dropna(subset=["Close"])
+    return pd.DataFrame()
+
+def _epoch(index: pd.DatetimeIndex) -> np.ndarray:
+    # DatetimeIndex → UTC epoch 초 (tz 없으면 UTC로 간주)
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    return ((index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)).to_numpy(dtype=np.int64)   # 인덱스 해상도(ns/us) 무관
+
+def _store_frame_bars(tkr: str, interval: str, df: pd.DataFrame, covered_from: Optional[int] = None, replace: bool = False):
+    # OHLCV DataFrame(Close 결측 제거됨) → 저장소 추가
+    cols = {c.lower(): df[c].to_numpy(dtype=float) for c in ("Open", "High", "Low", "Close", "Volume") if c in df.columns}
+    TS_STORE.append(tkr, interval, _epoch(df.index), covered_from=covered_from, replace=replace, **cols)
+
+def _store_frame(tkr: str, interval: str, rows: int) -> pd.DataFrame:
+    # 저장소 끝부분 → _quote_from_frame 입력 형태(Close + UTC 인덱스)
+    bars = TS_STORE.tail(tkr, interval, rows)
+    return pd.DataFrame({"Close": bars["close"]}, index=pd.to_datetime(bars["ts"], unit="s", utc=True))
+
+def _sync_plan(tkr: str, interval: str, period: str, now: float):
+    # (period, start, covered_from, replace): 증분이면 start만, 전체 조회면 period + 보장 구간
+    need_from = int(now - _PERIOD_SECONDS[period])
+    last = TS_STORE.last_ts(tkr, interval)
+    covered = TS_STORE.covered_from(tkr, interval)
+    if last is None or covered is None:
+        return period, None, need_from, False
+    if covered > need_from:
+        return period, None, need_from, True              # 더 긴 기간 요청 → 백필
+    if interval == "1m" and now - last > TS_INTRADAY_MAX_GAP:
+        return period, None, None, False                  # 공백이 길면 최근 구간만 (사이 공백은 남음)
+    return None, last, None, False
+
+def _sync_history(tkr: str, interval: str, period: str, tail: int = TS_TAIL_ROWS) -> Optional[pd.DataFrame]:
+    # 저장소 증분 동기화 후 끝부분 tail행 반환 (조회 실패 None / 데이터 없음 빈 DataFrame)
+    period_, start, covered_from, replace = _sync_plan(tkr, interval, period, time.time())
+    df = _history(tkr, interval, period=period_, start=start)
+    if df is None:
+        return None
+    if len(df):
+        _store_frame_bars(tkr, interval, df, covered_from, replace)
+    return _store_frame(tkr, interval, tail)
+
+def _rows(df: Optional[pd.DataFrame]) -> int:
+    return 0 if df is None else len(df)
+
+def _timed_intraday(tkr: str) -> Optional[pd.DataFrame]:
+    t0 = time.perf_counter()
+    df = _sync_history(tkr, "1m", "1d")
+    QUOTE_STATS.intraday_latency(time.perf_counter() - t0)
+    return df
+
+def _submit(fn, *args):
+    # 요청 컨텍스트(타이밍 contextvar) 복사해서 풀에 제출 — 제출마다 별도 복사본
+    return _YF_POOL.submit(contextvars.copy_context().run, fn, *args)
+
+def _quote_from_frame(tkr: str, df: Optional[pd.DataFrame], with_change: bool = True) -> Dict[str, Any]:
+    # 현재가/전일비/등락률/기준시각(KST) 계산 — with_change=False면 현재가/기준시각만 (변동 필드 None)
     price = prev_close = change = change_pct = None
     last_ts_kst = None
-
-    def _try_hist(period, interval):
-        try:
-            hist = yf.Ticker(tkr).history(period=period, interval=interval, auto_adjust=False)
-            if hist is not None and "Close" in hist.columns:
-                return hist.dropna(subset=["Close"])
-        except Exception:
-            return pd.DataFrame()
-        return pd.DataFrame()
-
-    # 1분봉 우선, 부족 시 5일/일봉 보완
-    df1 = _try_hist("1d", "1m")
-    # fallback 5일/일봉
-    if df1.empty or len(df1) < 2:
-        dfd = _try_hist("5d", "1d")
-    else:
-        dfd = pd.DataFrame()
-
-    # 가격/전일가/시각 산출
-    if not df1.empty:
-        price = float(df1["Close"].iloc[-1])
-        if len(df1) >= 2:
-            prev_close = float(df1["Close"].iloc[-2])
+    if _rows(df):
+        price = float(df["Close"].iloc[-1])
+        if len(df) >= 2 and with_change:
+            prev_close = float(df["Close"].iloc[-2])
         # 기준 시각(KST)
         try:
-            last_ts_kst = df1.index.tz_convert("Asia/Seoul")[-1].isoformat()
-        except Exception:
-            last_ts_kst = None
-    elif not dfd.empty:
-        price = float(dfd["Close"].iloc[-1])
-        if len(dfd) >= 2:
-            prev_close = float(dfd["Close"].iloc[-2])
-        try:
-            last_ts_kst = dfd.index.tz_convert("Asia/Seoul")[-1].isoformat()
+            last_ts_kst = df.index.tz_convert("Asia/Seoul")[-1].isoformat()
         except Exception:
             last_ts_kst = None
 
@@ -474,36 +775,252 @@ def fetch_quote_yf(ticker: str) -> Dict[str, Any]:
         change = price - prev_close
         change_pct = (change / prev_close) * 100.0
 
+    nd = _price_digits(tkr, price)
     return {
         "ticker": tkr,
-        "price": _round_or_none(price, 2),
-        "prevClose": _round_or_none(prev_close, 2),
-        "change": _round_or_none(change, 2),
+        "price": _round_or_none(price, nd),
+        "prevClose": _round_or_none(prev_close, nd),
+        "change": _round_or_none(change, nd),
         "changePct": _round_or_none(change_pct, 2),
         "ts_kst": last_ts_kst or datetime.now(KST).isoformat()
     }
 
-def get_market_indices() -> str:
-    # 주요 지수 요약 문자열 생성
-    results = []
-    for key, info in INDEX_MAP.items():
-        q = fetch_quote_yf(info["ticker"])
-        name, price, pct = info["name"], q.get("price"), q.get("changePct")
-        if price is not None:
-            if pct is not None:
-                sign = "+" if pct >= 0 else ""
-                results.append(f"• **{name}**: {price:,.2f} ({sign}{pct:.2f}%)")
-            else:
-                results.append(f"• **{name}**: {price:,.2f}")
+def _late_intraday(tkr: str, f):
+    # 헤지에 진 1분봉 결과 → 단건 캐시 갱신 (예외/부족하면 무시)
+    if f.cancelled() or f.exception() is not None or _rows(f.result()) < 2:
+        return
+    QUOTE_CACHE.set(tkr, _quote_from_frame(tkr, f.result()), CALENDAR.quote_ttl(tkr))
+
+def _fetch_quote_yf_live(ticker: str) -> Dict[str, Any]:
+    # yfinance 히스토리 조회 (1분봉 우선, 일봉 헤지/보완)
+    tkr = _normalize_ticker(ticker)
+    t0 = time.perf_counter()
+    f1 = _submit(_timed_intraday, tkr)
+    fd = None
+    done, _ = wait([f1], timeout=QUOTE_STATS.hedge_delay())
+    if not done:
+        fd = _submit(_sync_history, tkr, "1d", "5d")
+        QUOTE_STATS.hedge()
+        done, _ = wait([f1, fd], return_when=FIRST_COMPLETED)
+        if fd in done and f1 not in done and _rows(fd.result()) >= 2:
+            # 일봉은 현재가/기준시각만 — 변동은 1분봉 기준(직전 봉 대비)과 뜻이 달라 섞지 않음
+            # 1분봉이 뒤늦게 오면 온전한 시세로 캐시를 덮어써 다음 조회부터 변동까지 제공
+            if not f1.cancel():   # 시작 전일 때만 취소됨 (실행 중이면 완료 시 캐시 갱신)
+                f1.add_done_callback(lambda f: _late_intraday(tkr, f))
+            QUOTE_STATS.record("hedge_daily", time.perf_counter() - t0)
+            return _quote_from_frame(tkr, fd.result(), with_change=False)
+
+    df1 = f1.result()
+    if _rows(df1) >= 2:
+        if fd is not None:
+            QUOTE_STATS.hedge(used=False)
+            fd.cancel()
+        QUOTE_STATS.record("intraday", time.perf_counter() - t0)
+        return _quote_from_frame(tkr, df1)
+
+    # 1분봉 부족 → 일봉 (헤지로 이미 떠 있으면 그 결과)
+    dfd = (fd or _submit(_sync_history, tkr, "1d", "5d")).result()
+    if _rows(df1):
+        path, df = "intraday_partial", df1   # 기존 규칙: 1분봉이 1행이라도 있으면 1분봉 사용
+    elif _rows(dfd):
+        path, df = "fallback", dfd
+    else:
+        path, df = "empty", None
+    QUOTE_STATS.record(path, time.perf_counter() - t0)
+    q = _quote_from_frame(tkr, df)
+    if path == "empty" and df1 is not None and dfd is not None:
+        QUOTE_CACHE.set(tkr, q, YF_NEGATIVE_TTL)   # 두 요청 모두 정상 응답인데 비어 있음 → 음성 캐시
+    return q
+
+# ===== yfinance 일괄 시세 =====
+# 여러 티커를 yf.download 한 번(1분봉 증분) + 1분봉이 한 번도 없던 티커만 한 번 더(5일/일봉)로 저장소에 채움
+# 시세는 저장소 끝부분(티커별 마지막/직전 봉)에서 계산 → fetch_quote_yf와 같은 dict
+def _download_bars(tickers: tuple, interval: str, period: Optional[str] = None, start: Optional[int] = None) -> Optional[pd.DataFrame]:
+    # (Price, Ticker) 2단 컬럼 OHLCV, 조회 실패(예외)는 None, 데이터 없음은 빈 DataFrame
+    kw = {"start": datetime.fromtimestamp(start, timezone.utc)} if start is not None else {"period": period}
+    try:
+        with upstream("yfinance"):
+            df = yf.download(
+                list(tickers), interval=interval, group_by="column",
+                auto_adjust=False, ignore_tz=False, threads=True, progress=False, **kw,
+            )
+    except Exception:
+        log.exception("yfinance 일괄 조회 실패")
+        return None
+    if df is None or df.empty:
+        return pd.DataFrame()
+    if not isinstance(df.columns, pd.MultiIndex):
+        df.columns = pd.MultiIndex.from_product([df.columns, [tickers[0]]])
+    return df if "Close" in df.columns.get_level_values(0) else pd.DataFrame()
+
+def _store_batch(df: Optional[pd.DataFrame], tickers, interval: str, covered_from: Optional[int] = None, replace=frozenset()):
+    # 티커별 열을 잘라 종가 결측 행(다른 거래소 시간대/거래 없는 분봉)을 빼고 저장소에 추가
+    if df is None or df.empty:
+        return
+    ts = _epoch(df.index)
+    have = set(df.columns.get_level_values(1))
+    for t in tickers:
+        if t not in have:
+            continue
+        sub = df.xs(t, axis=1, level=1)
+        ok = ~np.isnan(sub["Close"].to_numpy(dtype=float))
+        if ok.any():
+            cols = {c.lower(): sub[c].to_numpy(dtype=float)[ok] for c in ("Open", "High", "Low", "Close", "Volume") if c in sub.columns}
+            TS_STORE.append(t, interval, ts[ok], covered_from=covered_from, replace=t in replace, **cols)
+
+_SYNCED_AT: Dict[tuple, float] = {}   # (티커, 주기) → 마지막 일괄 조회 성공 시각 (봉이 없었어도 — 휴장 구간은 확인된 것으로)
+
+def _sync_batch(tickers: tuple, interval: str, period: str):
+    # 저장소가 비었거나 백필이 필요한 티커는 period 전체
+    # 증분: 마지막 확인 시각(마지막 봉/조회 성공 중 늦은 쪽)이 TS_BATCH_LOOKBACK 안이면 한 번에 (시작 하한 now - LOOKBACK, 그 사이 봉은 없음이 확인됨)
+    #       그보다 오래된 티커(재시작·장애 뒤)는 확인 시각 일 단위로 묶어 묶음별 가장 이른 마지막 봉부터 → 하한 때문에 생기던 공백 없음
+    now = time.time()
+    cold, backfill = [], set()
+    groups: Dict[int, Dict[str, int]] = {}
+    for t in tickers:
+        _, start, _, replace = _sync_plan(t, interval, period, now)
+        if start is None:
+            cold.append(t)
+            if replace:
+                backfill.add(t)
         else:
-            results.append(f"• **{name}**: 데이터 없음")
-    return "**주요 지수 (실시간)**\n" + "\n".join(results)
+            known = max(start, _SYNCED_AT.get((t, interval), 0.0))
+            groups.setdefault(max(0, int((now - known) // TS_BATCH_LOOKBACK)), {})[t] = start
+    if cold:
+        df = _download_bars(tuple(cold), interval, period=period)
+        _store_batch(df, cold, interval, int(now - _PERIOD_SECONDS[period]), frozenset(backfill))
+        if df is not None:
+            _SYNCED_AT.update(((t, interval), now) for t in cold)
+    for age, starts in sorted(groups.items()):
+        start = min(starts.values())
+        if age == 0:
+            start = max(start, int(now - TS_BATCH_LOOKBACK))
+        df = _download_bars(tuple(starts), interval, start=start)
+        _store_batch(df, starts, interval)
+        if df is not None:
+            _SYNCED_AT.update(((t, interval), now) for t in starts)
+
+def _quotes_from_store(tickers) -> Dict[str, Dict[str, Any]]:
+    # 티커별 1분봉(없으면 일봉) 마지막/직전 종가 → 등락은 벡터로 계산 (네트워크 없음)
+    n = len(tickers)
+    price = np.full(n, np.nan)
+    prev_close = np.full(n, np.nan)
+    ts: List[Optional[str]] = [None] * n
+    for i, t in enumerate(tickers):
+        for interval in ("1m", "1d"):
+            bars = TS_STORE.tail(t, interval, TS_TAIL_ROWS)
+            close = bars["close"]
+            if len(close):
+                price[i] = close[-1]
+                if len(close) >= 2:
+                    prev_close[i] = close[-2]
+                ts[i] = datetime.fromtimestamp(int(bars["ts"][-1]), KST).isoformat()
+                break
+
+    # prevClose 0/NaN은 NaN으로
+    with np.errstate(divide="ignore", invalid="ignore"):
+        change = price - prev_close
+        change_pct = np.where(prev_close != 0, change / prev_close * 100.0, np.nan)
+
+    now = datetime.now(KST).isoformat()
+    nan_none = lambda v: None if np.isnan(v) else v
+    out = {}
+    for i, t in enumerate(tickers):
+        nd = _price_digits(t, nan_none(price[i]))
+        out[t] = {
+            "ticker": t,
+            "price": _round_or_none(nan_none(price[i]), nd),
+            "prevClose": _round_or_none(nan_none(prev_close[i]), nd),
+            "change": _round_or_none(nan_none(change[i]), nd),
+            "changePct": _round_or_none(nan_none(change_pct[i]), 2),
+            "ts_kst": ts[i] or now,
+        }
+    return out
+
+@coalesced
+def _fetch_quotes_batch(tickers: tuple) -> Dict[str, Dict[str, Any]]:
+    # 1분봉 일괄 증분 → 1분봉이 한 번도 없던 티커만 5일/일봉 일괄 (단건 조회와 같은 규칙)
+    _sync_batch(tickers, "1m", "1d")
+    need = tuple(t for t in tickers if TS_STORE.last_ts(t, "1m") is None)
+    if need:
+        _sync_batch(need, "1d", "5d")
+    return _quotes_from_store(tickers)
+
+def fetch_quotes_yf(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    # 티커 목록 → {입력 티커: 시세 dict} (정규화/중복 제거 후 정렬된 튜플로 병합 키 고정)
+    norm = {t: _normalize_ticker(t) for t in tickers}
+    batch = _fetch_quotes_batch(tuple(sorted(set(norm.values())))) if norm else {}
+    return {t: batch[n] for t, n in norm.items()}
+
+# ===== 시장 스냅샷 =====
+# INDEX_MAP/FX_MAP 전체 시세를 백그라운드(스케줄러)에서 주기 갱신, 요청 경로는 메모리 dict만 읽음 (market_snapshot.py)
+# stale-while-revalidate: TTL 지나면 기존 값 즉시 반환 + 백그라운드 갱신 1회 트리거
+# 요청 경로는 절대 조회하지 않음: 비어 있거나 MAX_STALE 초과(갱신 중단 등)여도 있는 값 반환 + 백그라운드 갱신 (expired_hits로 집계)
+# 티커별 만료는 거래 캘린더 TTL → 휴장 중인 시장은 다음 개장까지 다시 받지 않음
+# 환율 크로스(derived)는 조회하지 않고 갱신마다 다리 시세로 다시 계산 → 모든 쌍이 같은 시점 기준
+# fetch는 람다로 감쌈 (모듈 함수 교체 — 벤치 스텁 등 — 가 스냅샷에도 반영되도록)
+MARKET_SNAPSHOT_INTERVAL = int(os.getenv("MARKET_SNAPSHOT_INTERVAL", "15"))   # 스케줄러 갱신 주기(초)
+MARKET_SNAPSHOT_TTL = int(os.getenv("MARKET_SNAPSHOT_TTL", "30"))             # 이후엔 stale
+MARKET_SNAPSHOT_MAX_STALE = int(os.getenv("MARKET_SNAPSHOT_MAX_STALE", "600"))
+
+MARKET = MarketSnapshot(
+    [v["ticker"] for v in INDEX_MAP.values()] + FX.legs,
+    fetch=lambda tickers: fetch_quotes_yf(tickers), ttl_for=CALENDAR.quote_ttl, normalize=_normalize_ticker,
+    ttl=MARKET_SNAPSHOT_TTL, max_stale=MARKET_SNAPSHOT_MAX_STALE, derived=FX,
+)
 
-def get_fx_rates() -> str:
-    # 주요 환율 요약 문자열 생성
+def get_quote(ticker: str) -> Dict[str, Any]:
+    # 스냅샷 우선, 대상 외 티커/데이터 없음이면 단건 조회
+    return MARKET.get(ticker) or fetch_quote_yf(ticker)
+
+# ===== 목록 밖 6자리 코드 =====
+# 종목 인덱스에 없는 코드는 코스피(.KS) → 코스닥(.KQ) 순으로 시세가 나오는 쪽을 채택
+# 찾은 시장만 기억 (실패는 일시 장애일 수 있어 기억하지 않음, 상장 종목 수만큼으로 자연 제한)
+_KRX_CODE_TICKERS: Dict[str, str] = {}
+
+def krx_code_ticker(code: str) -> Optional[str]:
+    code = code.strip()
+    if code in _KRX_CODE_TICKERS:
+        return _KRX_CODE_TICKERS[code]
+    for suffix in (".KS", ".KQ"):
+        if get_quote(code + suffix).get("price") is not None:
+            _KRX_CODE_TICKERS[code] = code + suffix
+            return code + suffix
+    return None
+
+def resolve_ticker(raw: str, **kw) -> Optional[dict]:
+    # TICKERS.resolve + 목록 밖 6자리 코드의 시장 확인 (네트워크 조회가 있으므로 도구 실행 경로에서만 사용)
+    hit = TICKERS.resolve(raw, **kw)
+    if hit is None and is_krx_code(raw):
+        ticker = krx_code_ticker(raw)
+        if ticker:
+            hit = {"ticker": ticker, "name": raw.strip(), "name_en": "", "match": "code", "score": 0.5}
+    return hit
+
+def get_quotes(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    # 여러 종목: 스냅샷 → 단건 캐시 → 나머지는 한 번의 일괄 조회(fetch_quotes_yf), 결과는 단건 캐시에도 저장
+    out: Dict[str, Dict[str, Any]] = {}
+    miss = []
+    for t in tickers:
+        q = MARKET.get(t)
+        if q is None:
+            hit = QUOTE_CACHE.get(_normalize_ticker(t))
+            q = None if hit is MISS else hit
+        if q is None:
+            miss.append(t)
+        else:
+            out[t] = q
+    for t, q in (fetch_quotes_yf(miss) if miss else {}).items():
+        if q.get("price") is not None:
+            QUOTE_CACHE.set(_normalize_ticker(t), q, CALENDAR.quote_ttl(t))
+        out[t] = q
+    return out
+
+def _quote_lines(mapping: Dict[str, Dict[str, str]], quotes: Dict[str, Dict[str, Any]]) -> List[str]:
+    # 이름: 가격 (등락률) 목록
     results = []
-    for key, info in FX_MAP.items():
-        q = fetch_quote_yf(info["ticker"])
+    for key, info in mapping.items():
+        q = quotes.get(info["ticker"]) or {}
         name, price, pct = info["name"], q.get("price"), q.get("changePct")
         if price is not None:
             if pct is not None:
@@ -513,46 +1030,388 @@ def get_fx_rates() -> str:
                 results.append(f"• **{name}**: {price:,.2f}")
         else:
             results.append(f"• **{name}**: 데이터 없음")
-    return "**주요 환율 (실시간)**\n" + "\n".join(results)
+    return results
+
+def get_market_indices(quotes: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    # 주요 지수 요약 문자열 생성 (quotes 미지정 시 스냅샷)
+    if quotes is None:
+        quotes = MARKET.quotes()
+    return "**주요 지수 (실시간)**\n" + "\n".join(_quote_lines(INDEX_MAP, quotes))
+
+def get_fx_rates(quotes: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    # 주요 환율 요약 문자열 생성 (quotes 미지정 시 스냅샷)
+    if quotes is None:
+        quotes = MARKET.quotes()
+    return "**주요 환율 (실시간)**\n" + "\n".join(_quote_lines(FX_MAP, quotes))
 
 def get_kospi_index() -> str:
     # 코스피 단건 포맷
-    q = fetch_quote_yf("^KS11"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
+    q = get_quote("^KS11"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
     if price is None: return "**코스피 지수**\n• 현재 데이터를 가져올 수 없습니다."
     sign = "+" if (ch or 0) >= 0 else ""
     return f"**코스피 지수 (실시간)**\n• 현재가: {price:,.2f}\n• 변동: {sign}{ch if ch is not None else 'N/A'} ({sign}{pct if pct is not None else 'N/A'}%)"
 
 def get_kosdaq_index() -> str:
     # 코스닥 단건 포맷
-    q = fetch_quote_yf("^KQ11"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
+    q = get_quote("^KQ11"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
     if price is None: return "**코스닥 지수**\n• 현재 데이터를 가져올 수 없습니다."
     sign = "+" if (ch or 0) >= 0 else ""
     return f"**코스닥 지수 (실시간)**\n• 현재가: {price:,.2f}\n• 변동: {sign}{ch if ch is not None else 'N/A'} ({sign}{pct if pct is not None else 'N/A'}%)"
 
 def get_usd_krw() -> str:
     # 달러/원 포맷
-    q = fetch_quote_yf("USDKRW=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
+    q = get_quote("USDKRW=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
     if price is None: return "**원/달러 환율**\n• 현재 데이터를 가져올 수 없습니다."
     sign = "+" if (ch or 0) >= 0 else ""
     return f"**원/달러 환율 (실시간)**\n• 현재: {price:,.2f}원\n• 변동: {sign}{(ch or 0):.2f}원 ({sign}{(pct or 0):.2f}%)"
 
 def get_jpy_krw() -> str:
     # 엔/원 포맷
-    q = fetch_quote_yf("JPYKRW=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
+    q = get_quote("JPYKRW=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
     if price is None: return "**원/엔 환율**\n• 현재 데이터를 가져올 수 없습니다."
     sign = "+" if (ch or 0) >= 0 else ""
     return f"**원/엔 환율 (실시간)**\n• 현재: {price:,.2f}원\n• 변동: {sign}{(ch or 0):.2f}원 ({sign}{(pct or 0):.2f}%)"
 
+def fx_quotes(pairs: List[tuple]) -> Dict[str, Dict[str, Any]]:
+    # 임의 통화쌍 여러 개: 스냅샷 다리 우선, 스냅샷에 없는 통화 다리만 get_quotes 일괄(캐시) → 같은 다리 묶음으로 계산
+    need = fx.legs([c for p in pairs for c in p])
+    snap = MARKET.quotes()
+    quotes = {t: snap[t] for t in need if (snap.get(t) or {}).get("price") is not None}
+    missing = [t for t in need if t not in quotes]
+    if missing:
+        quotes.update(get_quotes(missing))
+    return fx.derive(quotes, list(pairs))
+
+def fx_quote(base: str, quote: str) -> Dict[str, Any]:
+    return fx_quotes([(base, quote)])[fx.ticker(base, quote)]
+
+def _fx_num(v: float) -> str:
+    # 환율 크기별 자릿수 (1,750.23 / 1.0843 / 0.006667)
+    return f"{v:,.2f}" if abs(v) >= 100 else f"{v:.4f}" if abs(v) >= 0.1 else f"{v:.6f}"
+
+def get_fx_rate(pair: str) -> str:
+    # 통화쌍 포맷 ("GBP_KRW", "EUR/JPY", "파운드/원", "파운드" → 원화 대비)
+    p = fx.parse_pair(pair)
+    if p is None:
+        return f"'{pair}' 통화쌍을 해석하지 못했습니다. 예: GBP_KRW, EUR/JPY, 파운드/원 (지원 통화: {', '.join(fx.CURRENCIES)})"
+    title = f"**{fx.name(*p)} 환율 ({p[0]}/{p[1]})**"
+    q = fx_quote(*p)
+    if q.get("price") is None:
+        return f"{title}\n• 현재 데이터를 가져올 수 없습니다."
+    ch, pct = q.get("change") or 0, q.get("changePct") or 0
+    sign = "+" if ch >= 0 else ""
+    lines = [title, f"• 현재: 1{p[0]} = {_fx_num(q['price'])}{p[1]}",
+             f"• 변동: {sign}{_fx_num(ch)} ({sign}{pct:.2f}%)", f"• 기준시각: {q.get('ts_kst') or '-'}"]
+    if q.get("derived"):
+        lines.append("• 달러 기준 환율로 계산한 값입니다.")
+    return "\n".join(lines)
+
 def get_eur_usd() -> str:
     # 유로/달러 포맷
-    q = fetch_quote_yf("EURUSD=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
+    q = get_quote("EURUSD=X"); price, ch, pct = q.get("price"), q.get("change"), q.get("changePct")
     if price is None: return "**유로/달러 환율**\n• 현재 데이터를 가져올 수 없습니다."
     sign = "+" if (ch or 0) >= 0 else ""
-    return f"**유로/달러 환율 (실시간)**\n• 현재: {price:,.2f}달러\n• 변동: {sign}{(ch or 0):.2f} ({sign}{(pct or 0):.2f}%)"
+    return f"**유로/달러 환율 (실시간)**\n• 현재: {_fx_num(price)}달러\n• 변동: {sign}{_fx_num(ch or 0)} ({sign}{(pct or 0):.2f}%)"
+
+# ===== 상승/하락 상위 (유니버스 스냅샷) =====
+# 유니버스(코스피/코스닥/미국 대형주 종목 파일 — 지수 구성 종목 일부이므로 지수명으로 표기하지 않음) 일봉을 스케줄러가 주기적으로 일괄 증분 조회 → movers.compute 결과만 보관
+# 요청 경로(get_top_movers)는 미리 계산된 결과만 읽음 — 아직 없으면 "준비 중" + 백그라운드 계산 1회 트리거 (요청은 대기 안 함)
+# 계산(일괄 다운로드)은 락 밖, 결과 교체만 락 안 → 갱신 중에도 읽기는 이전 결과로 즉시 응답
+# 유니버스별 만료는 대표 종목의 거래 캘린더 TTL → 휴장 중에는 다시 받지 않음
+UNIVERSE_DIR = os.getenv("UNIVERSE_DIR", str(Path(__file__).resolve().parent / "data" / "universe"))
+MOVERS_UNIVERSES = [u.strip().upper() for u in os.getenv("MOVERS_UNIVERSES", "KOSPI_LARGE,KOSDAQ_LARGE,US_LARGE").split(",") if u.strip()]
+MOVERS_INTERVAL = int(os.getenv("MOVERS_INTERVAL", "300"))   # 스케줄러 갱신 주기(초)
+MOVERS_DEPTH = MOVERS_DEPTH_MAX                             # 보관할 순위 깊이 (도구 count 상한)
+MOVERS_VOLUME_WINDOW = 20                                   # 거래량 급증 기준: 직전 20거래일 평균
+MOVERS_NAMES = {"KOSPI_LARGE": "코스피 대형주", "KOSDAQ_LARGE": "코스닥 대형주", "US_LARGE": "미국 대형주"}
+_MOVERS_ALIASES = {"KOSPI": "KOSPI_LARGE", "코스피": "KOSPI_LARGE", "KOSPI200": "KOSPI_LARGE", "코스피200": "KOSPI_LARGE",
+                   "KOSDAQ": "KOSDAQ_LARGE", "코스닥": "KOSDAQ_LARGE", "KOSDAQ150": "KOSDAQ_LARGE", "코스닥150": "KOSDAQ_LARGE",
+                   "SP500": "US_LARGE", "SP": "US_LARGE", "S&P500": "US_LARGE", "SPX": "US_LARGE", "US": "US_LARGE", "미국": "US_LARGE"}
+
+class MoversSnapshot:
+    def __init__(self, universes: Dict[str, List[tuple]], depth: int):
+        self.universes = {u: rows for u, rows in universes.items() if rows}
+        self.depth = depth
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._lock = threading.Lock()                   # _data/_expires 교체용 (짧게만 보유)
+        self._refresh_lock = threading.Lock()           # 동시 갱신 직렬화 (스케줄러/운영 갱신/최초 요청 트리거)
+        self._warming = False
+        self.not_ready = 0
+        self.refreshes = self.failures = self.closed_skips = 0
+        self.last_duration: Dict[str, float] = {}
+
+    def refresh(self, names: Optional[List[str]] = None, force: bool = False):
+        # 만료된 유니버스만: 일봉 일괄 증분(_sync_batch) → 저장소 끝부분으로 배열 구성 → 순위 계산 후 교체
+        with self._refresh_lock:
+            for u in names or list(self.universes):
+                if not force and u in self._data and self._expires.get(u, 0.0) > time.monotonic():
+                    self.closed_skips += 1
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    res = self._compute(u)
+                    with self._lock:
+                        self._data[u] = res
+                        self._expires[u] = time.monotonic() + CALENDAR.quote_ttl(self.universes[u][0][0])
+                    self.refreshes += 1
+                except Exception:
+                    self.failures += 1
+                    log.exception(f"상승/하락 상위 갱신 실패: {u}")
+                finally:
+                    self.last_duration[u] = round(time.perf_counter() - t0, 3)
+
+    def _warm(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._warming = False
+
+    def _compute(self, u: str) -> Dict[str, Any]:
+        rows = self.universes[u]
+        tickers = [t for t, _ in rows]
+        _sync_batch(tuple(tickers), "1d", "1mo")
+        n, w = len(tickers), MOVERS_VOLUME_WINDOW
+        price, prev, vol, avg = (np.full(n, np.nan) for _ in range(4))
+        last_ts = 0
+        for i, t in enumerate(tickers):
+            bars = TS_STORE.tail(t, "1d", w + 1)
+            c = bars["close"]
+            if not len(c):
+                continue
+            price[i], vol[i] = c[-1], bars["volume"][-1]
+            last_ts = max(last_ts, int(bars["ts"][-1]))
+            if len(c) >= 2:
+                prev[i] = c[-2]
+                past = bars["volume"][:-1]
+                if (~np.isnan(past)).any():
+                    avg[i] = np.nanmean(past)
+        names = [name or (TICKERS.resolve(t, prefix=False, fuzzy=False) or {}).get("name") or t for t, name in rows]
+        res = movers.compute(tickers, names, price, prev, vol, avg, k=self.depth)
+        res["as_of"] = datetime.now(KST).isoformat()
+        res["bar_date"] = datetime.fromtimestamp(last_ts, ZoneInfo(MARKETS[market_for(tickers[0])]["tz"])).date().isoformat() if last_ts else None
+        return res
+
+    def get(self, u: str) -> Optional[Dict[str, Any]]:
+        # 계산된 결과 (없으면 None + 백그라운드 계산 트리거 — 스케줄러 첫 실행 전 요청)
+        with self._lock:
+            d = self._data.get(u)
+            if d is not None or self._warming:
+                if d is None:
+                    self.not_ready += 1
+                return d
+            self._warming = True
+            self.not_ready += 1
+        threading.Thread(target=self._warm, name="movers-warm", daemon=True).start()
+        return None
+
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self._data)                     # 갱신 스레드가 교체 중일 수 있으므로 복사 후 순회
+        return {
+            "universes": {u: len(rows) for u, rows in self.universes.items()},
+            "computed": {u: d["as_of"] for u, d in data.items()},
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "closed_skips": self.closed_skips,
+            "not_ready": self.not_ready,
+            "last_refresh_s": self.last_duration,
+        }
+
+MOVERS = MoversSnapshot({u: movers.load_universe(os.path.join(UNIVERSE_DIR, f"{u}.csv")) for u in MOVERS_UNIVERSES}, MOVERS_DEPTH)
+
+def _mover_line(i: int, r: dict, volume: bool = False) -> str:
+    label = r["ticker"] if r["name"] == r["ticker"] else f"{r['name']}({r['ticker']})"
+    pct = "-" if r["changePct"] is None else f"{r['changePct']:+.2f}%"
+    price = "-" if r["price"] is None else f"{r['price']:,.2f}"
+    extra = f" · 거래량 {r['volumeRatio']:.1f}배" if volume and r["volumeRatio"] is not None else ""
+    return f"{i}. {label} {price} ({pct}){extra}"
+
+MOVERS_KINDS = ("gainers", "losers", "volume", "breadth")
+
+def get_top_movers(universe: str = "KOSPI_LARGE", kind: str = "all", count: int = 5) -> str:
+    # 미리 계산된 유니버스 스냅샷에서 상승/하락/거래량 급증 상위 + 등락 종목 수
+    u = (universe or "KOSPI_LARGE").upper().replace(" ", "")
+    u = _MOVERS_ALIASES.get(u, u)
+    if u not in MOVERS.universes:
+        return f"지원하지 않는 유니버스입니다: {universe} (가능: {', '.join(MOVERS.universes) or '없음'})"
+    kind = (kind or "all").strip().lower()
+    if kind != "all" and kind not in MOVERS_KINDS:
+        return f"지원하지 않는 구분입니다: {kind} (가능: all, {', '.join(MOVERS_KINDS)})"
+    d = MOVERS.get(u)
+    if d is None:
+        return f"**{MOVERS_NAMES.get(u, u)}** 상승/하락 상위를 집계하는 중입니다. 잠시 후 다시 물어봐 주세요."
+    if not d["priced"]:
+        return f"**{MOVERS_NAMES.get(u, u)}** 구성 종목 시세를 가져올 수 없습니다."
+    count = max(1, min(MOVERS_DEPTH, int(count or 5)))
+    kinds = MOVERS_KINDS if kind == "all" else (kind,)
+    b = d["breadth"]
+    lines = [f"**{MOVERS_NAMES.get(u, u)} 상승/하락 상위** (기준 {d['bar_date'] or '-'}, {d['priced']}/{d['universe_size']}종목)"]
+    titles = {"gainers": "상승률 상위", "losers": "하락률 상위", "volume": f"거래량 급증(직전 {MOVERS_VOLUME_WINDOW}일 평균 대비)"}
+    for k in kinds:
+        if k == "breadth":
+            ratio = f" · 상승/하락 {b['ad_ratio']:.2f}" if b["ad_ratio"] is not None else ""
+            med = f" · 중앙값 {b['median_pct']:+.2f}%" if b["median_pct"] is not None else ""
+            lines.append(f"• 등락: 상승 {b['advancers']} / 하락 {b['decliners']} / 보합 {b['unchanged']}{ratio}{med}")
+        else:
+            rows = d[k][:count]
+            lines.append(f"• {titles[k]}")
+            lines += [f"  {_mover_line(i, r, k == 'volume')}" for i, r in enumerate(rows, 1)] or ["  해당 종목 없음"]
+    return "\n".join(lines)
+
+# ===== 단건 시세 캐시 =====
+# fetch_quote_yf 결과 (키: 정규화 티커, TTL: CALENDAR.quote_ttl)
+QUOTE_CACHE = TTLCache(maxsize=int(os.getenv("QUOTE_CACHE_SIZE", "1024")))
+
+# ===== 도구 결과 캐시 =====
+# 키: (도구명, 정규화 인자) / TTL: 데이터 갱신 주기 기준 (시세 초, 뉴스 1분, ECOS/FRED 시간)
+TOOL_CACHE = TTLCache(maxsize=int(os.getenv("TOOL_CACHE_SIZE", "512")))
+TOOL_CACHE_NEGATIVE_TTL = 10   # 실패 문구가 담긴 결과는 짧게만 보관
+_UPPER_ARGS = ("market_type", "indicator_type", "ticker")
+_FAIL_MARKERS = ("조회 실패", "가져올 수 없습니다", "가져오지 못했습니다", "파싱 오류", "찾을 수 없습니다", "데이터 없음", "집계하는 중")
+
+def _tool_cache_key(tool_name: str, arguments: dict) -> tuple:
+    # 공백/대소문자 차이만 있는 동일 질의를 같은 키로
+    norm = {}
+    for k, v in (arguments or {}).items():
+        if isinstance(v, str):
+            v = " ".join(v.split())
+            v = v.upper() if k in _UPPER_ARGS else v
+        norm[k] = v
+    if tool_name == "get_latest_news":
+        norm["count"] = int(norm.get("count", 5))
+    return tool_name, json.dumps(norm, ensure_ascii=False, sort_keys=True)
+
+_MARKET_TYPE_TICKER = {"KOSPI": "^KS11", "KOSDAQ": "^KQ11", "USD_KRW": "USDKRW=X", "JPY_KRW": "JPYKRW=X", "EUR_USD": "EURUSD=X"}
+
+def _tool_ttl(tool_name: str, arguments: dict) -> float:
+    if tool_name == "get_market":
+        t = (arguments.get("market_type") or "").upper()
+        if t == "MARKET_SUMMARY":
+            return 30
+        # 단일 시세는 해당 시장 세션 기준 (휴장 중이면 다음 개장까지)
+        if t == "FX":
+            return CALENDAR.quote_ttl("USDKRW=X")   # 모든 통화쌍이 같은 FX 세션
+        if t == "QUOTE" and arguments.get("tickers"):
+            return min(CALENDAR.quote_ttl(x) for x in arguments["tickers"])   # 가장 먼저 갱신되는 시장 기준
+        ticker = (arguments.get("ticker") or "") if t == "QUOTE" else _MARKET_TYPE_TICKER.get(t, "")
+        return CALENDAR.quote_ttl(ticker) if ticker else 15
+    if tool_name == "get_latest_news":
+        return 60
+    if tool_name == "get_technicals":
+        return _tech_ttl(arguments.get("ticker") or "")
+    if tool_name == "get_top_movers":
+        return 30   # 본 데이터는 MOVERS 스냅샷 (MOVERS_INTERVAL마다 갱신)
+    if tool_name == "get_indicator":
+        t = (arguments.get("indicator_type") or "").upper()
+        # 기준금리/목표범위는 일 단위, 나머지(ECOS 월간, FEDFUNDS 월간)는 길게
+        return 3600 if t in ("BASE_RATE", "US_FED_TARGET") else 6 * 3600
+    if tool_name == "search_docs":
+        return 600
+    if tool_name == "price_alert":
+        return 0     # 등록/취소는 상태 변경, 목록은 세션별 → 캐시 안 함
+    return 0
+
+def _tool_cache_store(key: tuple, tool_name: str, arguments: dict, result: dict):
+    if not result.get("ok"):
+        return
+    ttl = _tool_ttl(tool_name, arguments)
+    if any(m in (result.get("markdown") or "") for m in _FAIL_MARKERS):
+        ttl = min(ttl, TOOL_CACHE_NEGATIVE_TTL)
+    TOOL_CACHE.set(key, result, ttl)
 
 # ===== 도구 실행기 =====
+# 캐시 조회 → 미스면 실제 실행 후 저장 (use_cache=False: 조회만 건너뛰고 새 값으로 갱신)
+def _canonical_args(tool_name: str, arguments: dict) -> dict:
+    # QUOTE 종목명/코드를 로컬 인덱스로 티커로 변환 ("삼성전자"/"005930"/"005930.KS" → 같은 캐시 키, 시장별 TTL)
+    if tool_name == "get_market" and (arguments.get("market_type") or "").upper() == "FX":
+        p = fx.parse_pair(arguments.get("pair") or arguments.get("ticker") or "")
+        if p:
+            return {"market_type": "FX", "pair": f"{p[0]}_{p[1]}"}
+    if tool_name == "get_market" and (arguments.get("market_type") or "").upper() == "QUOTE":
+        if isinstance(arguments.get("tickers"), list):
+            # 목록: 순서 유지 + 같은 종목 중복 제거 (못 찾은 이름은 그대로 남겨 안내)
+            out = []
+            for raw in arguments["tickers"]:
+                found = _quote_target(str(raw))
+                v = found[0] if found else " ".join(str(raw).split())
+                if v and v not in out:
+                    out.append(v)
+            return {**arguments, "tickers": out}
+        hit = resolve_ticker(arguments.get("ticker") or "")
+        if hit:
+            return {**arguments, "ticker": hit["ticker"]}
+    if tool_name == "get_technicals":
+        found = _resolve_instrument(arguments.get("ticker") or "", loose=True, probe=True)
+        if found:
+            return {**arguments, "ticker": found[0]}
+    if tool_name == "price_alert":
+        # 세션은 모델 인자가 아니라 요청 컨텍스트에서 (병합 키에도 포함 → 다른 세션끼리 공유 안 됨, TTL 0이라 캐시 안 함)
+        return {**arguments, "session_id": _REQ_SESSION.get()}
+    return arguments
+
+def run_tool(tool_name: str, arguments: dict, use_cache: bool = True) -> dict:
+    # 인자 정규화/키 생성 실패(모델이 보낸 잘못된 인자)도 이 도구 하나의 오류 결과로
+    try:
+        arguments = _canonical_args(tool_name, arguments)
+        key = _tool_cache_key(tool_name, arguments)
+    except Exception as e:
+        log.warning("tool arguments rejected: %s %r (%s)", tool_name, arguments, e)
+        return {"ok": False, "error": f"잘못된 인자: {e}"}
+    if use_cache:
+        hit = TOOL_CACHE.get(key)
+        if hit is not MISS:
+            return hit
+    # 같은 키로 이미 실행 중이면 그 결과를 함께 받음
+    result = FLIGHT.do(("run_tool",) + key, _run_tool_uncached, tool_name, arguments)
+    _tool_cache_store(key, tool_name, arguments, result)
+    return result
+
+def _quote_target(raw: str) -> Optional[tuple]:
+    # 비교 목록 항목 → (티커, 이름): 지수/환율 키·이름과 종목 정확 일치 → 종목 접두/퍼지 ("삼성전자, 코스피")
+    return _resolve_instrument(raw, loose=True, probe=True)
+
+def _quote_table(raws: List[str]) -> str:
+    # 여러 종목 비교표 (입력 순서, 최대 QUOTE_MAX_TICKERS) — 시세는 get_quotes 한 번
+    found, missing = [], []
+    for raw in raws:
+        hit = _quote_target(str(raw))
+        if hit is None:
+            missing.append(str(raw))
+        elif hit[0] not in (f[0] for f in found):
+            found.append(hit)
+    extra = found[QUOTE_MAX_TICKERS:]
+    found = found[:QUOTE_MAX_TICKERS]
+    quotes = get_quotes([t for t, _ in found]) if found else {}
+    lines = ["| 종목 | 현재가 | 변동 | 등락률 | 기준시각 |", "|---|---:|---:|---:|---|"] if found else []
+    for ticker, name in found:
+        q = quotes.get(ticker) or {}
+        label = ticker if name == ticker else f"{name}({ticker})"
+        if q.get("price") is None:
+            lines.append(f"| {label} | 가져오지 못했습니다 | - | - | - |")
+            continue
+        ch, pct = q.get("change"), q.get("changePct")
+        sign = "+" if (ch or 0) >= 0 else ""
+        move = "- | -" if ch is None else f"{sign}{ch:,.2f} | {sign}{(pct or 0):.2f}%"   # 변동 미확정(헤지 일봉 시세)
+        lines.append(f"| {label} | {q['price']:,.2f} | {move} | {(q.get('ts_kst') or '')[:16]} |")
+    if extra:
+        lines.append(f"• 최대 {QUOTE_MAX_TICKERS}종목까지 비교합니다. 제외: " + ", ".join(n for _, n in extra))
+    if missing:
+        lines.append("• 찾지 못한 종목: " + ", ".join(missing))
+    return "\n".join(lines) or "비교할 종목을 찾지 못했습니다. 종목명이나 티커(예: 005930.KS, AAPL)를 확인해 주세요."
+
 # Function Call 이름 → 실제 함수 라우팅/출력 포맷
-def run_tool(tool_name: str, arguments: dict) -> dict:
+def _run_tool_uncached(tool_name: str, arguments: dict) -> dict:
+    t0 = time.perf_counter()
+    try:
+        return _dispatch_tool(tool_name, arguments)
+    finally:
+        dt = time.perf_counter() - t0
+        TOOL_SECONDS.observe(dt, tool=tool_name)
+        _add_timing(f"tool:{tool_name}", dt)
+
+def _dispatch_tool(tool_name: str, arguments: dict) -> dict:
     try:
         if tool_name == "get_latest_news":
             n = int(arguments.get("count", 5))
@@ -596,44 +1455,470 @@ def run_tool(tool_name: str, arguments: dict) -> dict:
                 data = get_jpy_krw()
             elif t == "EUR_USD":
                 data = get_eur_usd()
+            elif t == "FX":
+                data = get_fx_rate(arguments.get("pair") or arguments.get("ticker") or "")
             elif t == "MARKET_SUMMARY":
-                data = f"{get_market_indices()}\n\n{get_fx_rates()}"
+                quotes = MARKET.quotes()
+                data = f"{get_market_indices(quotes)}\n\n{get_fx_rates(quotes)}"
+            elif t == "QUOTE" and arguments.get("tickers"):
+                data = _quote_table(arguments["tickers"])
             elif t == "QUOTE":
-                ticker = (arguments.get("ticker") or "").strip()
-                q = fetch_quote_yf(ticker)
+                raw = (arguments.get("ticker") or "").strip()
+                hit = resolve_ticker(raw)
+                if hit is None and is_krx_code(raw):
+                    data = f"종목코드 {raw}를 코스피(.KS)/코스닥(.KQ)에서 찾지 못했습니다. 코드를 확인해 주세요."
+                    return {"ok": True, "markdown": data}
+                if hit is None:
+                    # 인덱스에도 없고 심볼 표기도 아니면 네트워크 조회 없이 후보만 안내
+                    cands = ", ".join(f"{c['name']}({c['ticker']})" for c in TICKERS.search(raw, 3))
+                    data = f"'{raw}'에 해당하는 종목을 찾지 못했습니다." + (f" 혹시: {cands}" if cands else
+                           " 종목명이나 티커(예: 005930.KS, AAPL)를 확인해 주세요.")
+                    return {"ok": True, "markdown": data}
+                ticker = hit["ticker"]
+                label = ticker if hit["name"] == ticker else f"{hit['name']}({ticker})"
+                q = get_quote(ticker)
                 if q.get("price") is not None:
                     ch, pct = q.get("change"), q.get("changePct")
                     sign = "+" if (ch or 0) >= 0 else ""
                     # f-string은 % 기호 이스케이프 불필요하므로 안전함
-                    data = (
-                        f"{ticker.upper()} {q['price']:,.2f} · 변동 {sign}{(ch or 0):.2f} "
-                        f"({sign}{(pct or 0):.2f}%) · 기준시각 {q.get('ts_kst', '')}"
-                    )
+                    move = "" if ch is None else f" · 변동 {sign}{ch:.2f} ({sign}{(pct or 0):.2f}%)"
+                    data = f"{label} {q['price']:,.2f}{move} · 기준시각 {q.get('ts_kst', '')}"
                 else:
                     data = (
-                        f"시세 API 응답이 비정상이라 {ticker.upper()} 현재가를 가져오지 못했습니다; "
-                        f"대안: 야후파이낸스에서 티커 {ticker.upper()}로 실시간 가격을 확인해 주세요."
+                        f"시세 API 응답이 비정상이라 {label} 현재가를 가져오지 못했습니다; "
+                        f"대안: 야후파이낸스에서 티커 {ticker}로 실시간 가격을 확인해 주세요."
                     )
             else:
                 data = "지원하지 않는 시장 데이터입니다."
             return {"ok": True, "markdown": data}
 
+        elif tool_name == "get_top_movers":
+            data = get_top_movers(arguments.get("universe") or "KOSPI_LARGE", arguments.get("kind") or "all",
+                                  int(arguments.get("count") or 5))
+            return {"ok": True, "markdown": data}
+
+        elif tool_name == "get_technicals":
+            raw = (arguments.get("ticker") or "").strip()
+            found = _resolve_instrument(raw, loose=True, probe=True)
+            if not found:
+                data = f"'{raw}'에 해당하는 지수/종목을 찾지 못했습니다. 지수 키(KOSPI 등)나 종목명/티커를 확인해 주세요."
+            else:
+                r = get_technicals(found[0])
+                data = r["error"] if "error" in r else _technicals_markdown(found[1], r)
+            return {"ok": True, "markdown": data}
+
+        elif tool_name == "price_alert":
+            return {"ok": True, "markdown": price_alert(arguments.get("session_id") or "default", arguments)}
+
         elif tool_name == "search_docs":
-            q = arguments.get("query") or ""
-            resp = client.responses.create(
-                model="gpt-5",
-                instructions=SYSTEM_INSTRUCTIONS,
-                tools=[{"type": "file_search", "vector_store_ids": [VS_ID]}],
-                input=[{"role":"user","content":[{"type":"input_text","text":q}]}],
-            )
-            ans = (getattr(resp, "output_text", "") or "").strip() or "문서에서 답을 찾지 못했습니다."
-            return {"ok": True, "markdown": ans}
+            with upstream("openai"):
+                resp = client.responses.create(**_search_docs_request(arguments))
+            return {"ok": True, "markdown": _search_docs_answer(resp)}
 
         return {"ok": False, "error": f"Unknown tool: {tool_name}"}
     except Exception as e:
         log.exception("Tool execution failed")
         return {"ok": False, "error": str(e)}
 
+def _search_docs_request(arguments: dict) -> dict:
+    # RAG(file_search) 요청 파라미터
+    q = arguments.get("query") or ""
+    return dict(
+        model="gpt-5",
+        instructions=SYSTEM_INSTRUCTIONS,
+        tools=[{"type": "file_search", "vector_store_ids": [VS_ID]}],
+        input=[{"role":"user","content":[{"type":"input_text","text":q}]}],
+    )
+
+def _search_docs_answer(resp) -> str:
+    return (getattr(resp, "output_text", "") or "").strip() or "문서에서 답을 찾지 못했습니다."
+
+ASYNC_FLIGHT = AsyncSingleFlight()
+
+# ===== 도구 스레드 풀 =====
+# 타임아웃 난 도구도 스레드는 끝날 때까지 점유하므로 기본 실행기(to_thread, 스트림 프레임 등)와 분리된 고정 크기 풀 사용
+# 풀이 차면 새 도구는 대기열에서 기다리다 호출별 타임아웃으로 끝남(대기 중 취소되면 실행 안 됨) → running/queued로 포화 확인
+TOOL_POOL_SIZE = int(os.getenv("TOOL_POOL_SIZE", "32"))
+
+class ToolPool:
+    def __init__(self, size: int):
+        self.size = size
+        self._pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="tool")
+        self._lock = threading.Lock()
+        self.running = self.queued = self.cancelled = 0
+
+    def _run(self, ctx, fn, args):
+        with self._lock:
+            self.queued -= 1
+            self.running += 1
+        try:
+            return ctx.run(fn, *args)
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def _done(self, fut):
+        if fut.cancelled():
+            with self._lock:
+                self.queued -= 1
+                self.cancelled += 1
+
+    async def run(self, fn, *args):
+        # contextvar(요청 타이밍/세션)를 복사해 풀 스레드에서 실행 — asyncio 쪽 취소는 시작 전이면 실행 자체를 취소
+        with self._lock:
+            self.queued += 1
+        fut = self._pool.submit(self._run, contextvars.copy_context(), fn, args)
+        fut.add_done_callback(self._done)
+        return await asyncio.wrap_future(fut)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": self.size, "running": self.running, "queued": self.queued, "cancelled": self.cancelled}
+
+TOOL_POOL = ToolPool(TOOL_POOL_SIZE)
+
+# ===== 비동기 도구 실행기 =====
+# search_docs는 AsyncOpenAI로 직접, 나머지(requests/yfinance/pymongo 블로킹)는 도구 스레드 풀로 오프로드
+async def arun_tool(tool_name: str, arguments: dict, use_cache: bool = True) -> dict:
+    if tool_name == "search_docs":
+        key = _tool_cache_key(tool_name, arguments)
+        if use_cache:
+            hit = TOOL_CACHE.get(key)
+            if hit is not MISS:
+                return hit
+        try:
+            with upstream("openai"):
+                resp = await ASYNC_FLIGHT.do(key, lambda: aclient.responses.create(**_search_docs_request(arguments)))
+            result = {"ok": True, "markdown": _search_docs_answer(resp)}
+        except Exception as e:
+            log.exception("Tool execution failed")
+            return {"ok": False, "error": str(e)}
+        _tool_cache_store(key, tool_name, arguments, result)
+        return result
+    return await TOOL_POOL.run(run_tool, tool_name, arguments, use_cache)
+
+# ===== 병렬 도구 실행 =====
+# 한 턴의 tool_calls를 동시에 실행(호출별 타임아웃), 결과는 원래 tool_call_id 순서로 재조립
+# 느린 업스트림 하나가 타임아웃돼도 나머지 결과는 그대로 모델에 전달
+TOOL_TIMEOUT_SECS = float(os.getenv("TOOL_TIMEOUT_SECS", "15"))
+
+async def _run_tool_bounded(tool_name: str, args: dict, use_cache: bool = True) -> dict:
+    # 호출별 타임아웃 + 예외/타임아웃도 결과 dict로 (모델 경로 tool_calls와 라우터 경로 공통)
+    try:
+        return await asyncio.wait_for(arun_tool(tool_name, args, use_cache), TOOL_TIMEOUT_SECS)
+    except asyncio.TimeoutError:
+        log.warning("tool timeout: %s %s", tool_name, args)
+        return {"ok": False, "error": f"{tool_name} 응답 지연(Timeout {TOOL_TIMEOUT_SECS:g}s)"}
+    except Exception as e:
+        log.exception("tool failed: %s", tool_name)
+        return {"ok": False, "error": str(e)}
+
+async def _tool_task(idx: int, tool_name: str, raw_args: str, use_cache: bool = True):
+    # (원래 순서 idx, 결과) 반환
+    try:
+        args = json.loads(raw_args or "{}")
+    except json.JSONDecodeError:
+        return idx, {"ok": False, "error": f"잘못된 인자: {raw_args[:100]}"}
+    return idx, await _run_tool_bounded(tool_name, args, use_cache)
+
+def _tool_message(tool_call_id: str, result: dict) -> dict:
+    return {"role": "tool", "tool_call_id": tool_call_id, "content": json.dumps(result, ensure_ascii=False)}
+
+async def run_tool_calls(calls: List[Dict[str, str]], use_cache: bool = True) -> List[dict]:
+    # calls: [{"id", "name", "arguments"}] → 같은 순서의 tool 메시지 목록
+    pairs = await asyncio.gather(*[_tool_task(i, c["name"], c["arguments"], use_cache) for i, c in enumerate(calls)])
+    return [_tool_message(calls[i]["id"], result) for i, result in pairs]
+
+# ===== 로컬 의도 라우터 =====
+# 명확한 도구 요청("코스피 지금", "환율", "CPI 알려줘", "NVDA 주가")을 규칙으로 도구+인자에 바로 매핑
+# → 도구 선택용 1차 completion 생략. 분석/비교/복합 질문은 None을 돌려 기존 모델 경로로
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") == "1"
+ROUTER_MODE = os.getenv("ROUTER_MODE", "phrase")   # phrase: 모델 1회로 문장화 / direct: 도구 결과 그대로
+ROUTER_MAX_LEN = 40
+_ROUTER_SKIP = re.compile(r"왜|이유|전망|비교|분석|예측|영향|의미|어떻게|추천|설명|차이|그리고|vs", re.IGNORECASE)
+_QUOTE_WORDS = r"(?:주가|시세|얼마|현재가|가격|지금)"
+_TECH_WORDS = r"(?:이동\s*평균|이평선?|\d+\s*일\s*선|RSI|변동성|기술적\s*지표|52\s*주|낙폭|드로\s*다운|과매수|과매도)"
+_MOVERS_WORDS = r"(?:많이|가장|제일)\s*(?:오른|올랐|상승|내린|내렸|하락|떨어진|떨어졌)|(?:상승|하락)\s*률?\s*(?:상위|순위|톱|top)|급등주?|급락주?|거래량\s*(?:급증|상위|터진)|(?:상승|하락|등락)\s*종목\s*수|시장\s*폭"
+_ALERT_COND = r"(?:넘|돌파하|웃돌|올라가|오르|되|떨어지|내려가|빠지|밑돌|깨지)\s*(?:으)?면|이상이면|이하(?:로|면|가)|아래로|밑으로"
+_ALERT_WORDS = rf"(?:{_ALERT_COND}).*(?:알려|알림|알람)"
+_WHAT_IF = r"[가-힣]면(?=[\s?!.,]|$)|좋(?:아|을까|나요?|은가)|나빠|나쁜가|유리|불리|괜찮"   # "환율 오르면 수출기업에 좋아?" 같은 가정/평가 질문
+_NO_TECH = rf"^(?!.*(?:{_TECH_WORDS}|{_MOVERS_WORDS}|{_ALERT_WORDS}|{_WHAT_IF}))"   # 기술적 지표/상승·하락 상위/가격 알림/가정·평가 질문은 지수/환율 시세 규칙에서 제외
+ROUTER_FUZZY_MIN = float(os.getenv("ROUTER_FUZZY_MIN", "0.8"))   # 라우터는 오매칭 비용이 커서 도구 경로보다 엄격하게
+
+class IntentRouter:
+    # 규칙: (이름, 정규식, 도구, 인자 dict 또는 builder(match, text) → dict|None, direct 기본값)
+    # classifier(text) → (도구, 인자, 점수) | None : 규칙에 안 걸린 경우만 사용 (선택)
+    def __init__(self, classifier=None, min_score: float = 0.8):
+        self.rules: List[tuple] = []
+        self.classifier = classifier
+        self.min_score = min_score
+
+    def add_rule(self, name: str, pattern: str, tool: str, args=None, direct: Optional[bool] = None,
+                 flags: int = re.IGNORECASE):
+        self.rules.append((name, re.compile(pattern, flags), tool, args, direct))
+
+    def route(self, text: str) -> Optional[Dict[str, Any]]:
+        if not text or len(text) > ROUTER_MAX_LEN or _ROUTER_SKIP.search(text):
+            return None
+        hits = []
+        for name, rx, tool, args, direct in self.rules:
+            m = rx.search(text)
+            if not m:
+                continue
+            a = args(m, text) if callable(args) else dict(args or {})
+            if a is not None:
+                hits.append({"tool": tool, "arguments": a, "rule": name, "direct": direct})
+        # 서로 다른 도구/인자가 둘 이상 걸리면(복합 질문) 모델에 맡김
+        if len({(h["tool"], json.dumps(h["arguments"], sort_keys=True)) for h in hits}) == 1:
+            return hits[0]
+        if not hits and self.classifier is not None:
+            res = self.classifier(text)
+            if res and res[2] >= self.min_score:
+                return {"tool": res[0], "arguments": res[1], "rule": "classifier", "direct": None}
+        return None
+
+class BigramClassifier:
+    # 초경량 로컬 분류기: 문자 bigram 코사인 유사도로 가장 가까운 예시의 (도구, 인자)
+    def __init__(self, examples: List[tuple]):
+        self.examples = [(self._vec(t), tool, args) for t, tool, args in examples]
+
+    @staticmethod
+    def _vec(text: str) -> Dict[str, int]:
+        t = re.sub(r"\s+", "", text.lower())
+        v: Dict[str, int] = {}
+        for i in range(len(t) - 1):
+            v[t[i:i+2]] = v.get(t[i:i+2], 0) + 1
+        return v
+
+    @staticmethod
+    def _cos(a: Dict[str, int], b: Dict[str, int]) -> float:
+        dot = sum(c * b.get(k, 0) for k, c in a.items())
+        na = sum(c * c for c in a.values()) ** 0.5
+        nb = sum(c * c for c in b.values()) ** 0.5
+        return dot / (na * nb) if na and nb else 0.0
+
+    def __call__(self, text: str):
+        v = self._vec(text)
+        best = max(((self._cos(v, ev), tool, args) for ev, tool, args in self.examples), default=None, key=lambda x: x[0])
+        return (best[1], dict(best[2]), best[0]) if best else None
+
+def _news_args(m, text):
+    if "뉴스" not in text:
+        return None
+    n = re.search(r"top\s*(\d{1,2})", text, flags=re.IGNORECASE)
+    return {"count": max(1, min(50, int(n.group(1)))) if n else 5}
+
+def _fed_args(m, text):
+    return {"indicator_type": "US_FED_TARGET" if re.search(r"목표|범위|target", text, re.IGNORECASE) else "US_FEDFUNDS"}
+
+def _quote_args(m, text):
+    # 영문 대문자 단어는 종목 인덱스에 있을 때만 (GDP/CPI/ETF 같은 약어는 목록에 없으므로 모델로)
+    # 시장 접미사까지 쓴 6자리 코드(005930.KS)는 그대로, "LG 주가"처럼 목록 심볼은 종목명 규칙과 같은 티커로
+    sym = m.group(1).upper()
+    if re.search(rf"{_TECH_WORDS}|{_ALERT_WORDS}", text, re.IGNORECASE):
+        return None
+    if re.fullmatch(r"\d{6}\.K[SQ]", sym):
+        return {"market_type": "QUOTE", "ticker": sym}
+    hit = TICKERS.resolve(sym, prefix=False, fuzzy=False)
+    if hit is None or hit["match"] != "exact":
+        return None
+    return {"market_type": "QUOTE", "ticker": hit["ticker"]}
+
+_PARTICLE = re.compile(r"(?:의|은|는|이|가)$")
+
+def _name_quote_args(m, text):
+    # 시세 단어 앞 한두 어절을 종목 인덱스로 조회 (정확/별칭/엄격한 퍼지만, 접두는 모호해서 모델에 맡김)
+    words = [w for w in m.group(1).split() if not re.fullmatch(_QUOTE_WORDS, w)]   # "엔비디아 지금 얼마"
+    if not words or re.search(rf"{_TECH_WORDS}|{_ALERT_WORDS}", text, re.IGNORECASE):
+        return None
+    cands = [" ".join(words[-2:]), words[-1]] if len(words) > 1 else [words[0]]
+    cands += [_PARTICLE.sub("", c) for c in cands]
+    for fuzzy in (False, True):   # 모든 후보의 정확 일치를 퍼지보다 먼저
+        for c in cands:
+            hit = TICKERS.resolve(c, prefix=False, fuzzy=fuzzy, min_score=ROUTER_FUZZY_MIN)
+            if hit and hit["match"] in ("exact", "fuzzy"):
+                return {"market_type": "QUOTE", "ticker": hit["ticker"]}
+    return None
+
+# 달러/원 외 통화 언급 (있으면 usd_krw 규칙 제외)
+_FX_OTHER = "|".join(sorted({re.escape(a) for c, v in fx.CURRENCIES.items() if c not in ("USD", "KRW") for a in v[3]}, key=len, reverse=True))
+# 기존 규칙(달러/원·엔/원·유로/달러)이 맡는 쌍
+_FX_RULE_PAIRS = {("USD", "KRW"), ("JPY", "KRW"), ("EUR", "USD")}
+
+def _fx_args(m, text):
+    # 문장 속 통화 한두 개 → 통화쌍 (하나면 원화 대비)
+    p = fx.pair_of(fx.currencies_in(text))
+    if p is None or p in _FX_RULE_PAIRS:
+        return None
+    return {"market_type": "FX", "pair": f"{p[0]}_{p[1]}"}
+
+def _movers_args(m, text):
+    # 유니버스: 코스닥 / 미국·S&P·뉴욕 / 그 외 코스피 — 종류: 문장 속 단어 (여러 개면 전체)
+    u = "KOSDAQ_LARGE" if re.search(r"코스닥|KOSDAQ", text, re.IGNORECASE) else \
+        "US_LARGE" if re.search(r"미국|S\s*&\s*P|뉴욕|나스닥|美", text, re.IGNORECASE) else "KOSPI_LARGE"
+    kinds = {k for k, rx in (("gainers", r"오른|올랐|상승\s*률|급등"), ("losers", r"내린|내렸|하락\s*률|떨어|급락"),
+                             ("volume", r"거래량"), ("breadth", r"종목\s*수|시장\s*폭")) if re.search(rx, text)}
+    return {"universe": u, "kind": kinds.pop() if len(kinds) == 1 else "all"}
+
+_TECH_FILLER = re.compile(rf"{_TECH_WORDS}|\d+|지표|알려\s*줘|보여\s*줘|어때|어떤가요?|얼마|좀|현재|지금|[?!.,]", re.IGNORECASE)
+
+def _tech_args(m, text):
+    # 지표 단어/군더더기를 뺀 나머지 어절에서 대상 하나 (지수·환율 키/통칭 → 종목 정확 일치 → 엄격한 퍼지)
+    words = _TECH_FILLER.sub(" ", text).split()
+    cands = words + [_PARTICLE.sub("", w) for w in words]   # "유가"는 그대로, "코스피의" → "코스피"
+    for c in cands:
+        found = _resolve_instrument(c)
+        if found:
+            return {"ticker": found[0]}
+    for c in cands:
+        hit = TICKERS.resolve(c, prefix=False, min_score=ROUTER_FUZZY_MIN)
+        if hit and hit["match"] == "fuzzy":
+            return {"ticker": hit["ticker"]}
+    return None
+
+_ALERT_NUM = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(만|천)?")
+
+def _alert_args(m, text):
+    # "USD/KRW 1400 넘으면 알려줘" / "삼성전자 8만원 되면 알려줘" → 조건 앞 마지막 숫자 = 기준가, 그 앞 = 대상
+    if re.search(_TECH_WORDS, text, re.IGNORECASE):
+        return None
+    head, cond = text[:m.start()], text[m.start():]
+    nums = list(_ALERT_NUM.finditer(head))
+    if not nums:
+        return None
+    n = nums[-1]
+    price = float(n.group(1).replace(",", "")) * {"만": 10000, "천": 1000}.get(n.group(2), 1)
+    words = head[:n.start()].split()
+    cands = [" ".join(words)] + words[::-1] + [_PARTICLE.sub("", w) for w in words[::-1]]   # 기준가에 가까운 어절부터
+    target = next((t for c in cands if c and (t := _alert_target(c, loose=False))), None)
+    if target is None or not price:
+        return None
+    direction = "above" if re.search(r"넘|돌파|웃돌|올라|오르|이상", cond) else \
+        "below" if re.search(r"떨어|내려|빠지|밑|깨지|이하|아래", cond) else "auto"
+    return {"action": "create", "ticker": target[0], "price": price, "direction": direction}
+
+def _build_router() -> IntentRouter:
+    classifier = None
+    if os.getenv("ROUTER_CLASSIFIER", "0") == "1":
+        classifier = BigramClassifier([
+            ("코스피 지수 알려줘", "get_market", {"market_type": "KOSPI"}),
+            ("코스닥 지수 알려줘", "get_market", {"market_type": "KOSDAQ"}),
+            ("원달러 환율 얼마", "get_market", {"market_type": "USD_KRW"}),
+            ("엔화 환율 얼마", "get_market", {"market_type": "JPY_KRW"}),
+            ("오늘 시장 요약해줘", "get_market", {"market_type": "MARKET_SUMMARY"}),
+            ("물가 상승률 알려줘", "get_indicator", {"indicator_type": "CPI"}),
+            ("한국 기준금리 얼마", "get_indicator", {"indicator_type": "BASE_RATE"}),
+            ("미국 금리 얼마", "get_indicator", {"indicator_type": "US_FEDFUNDS"}),
+            ("최근 경제 뉴스 보여줘", "get_latest_news", {"count": 5}),
+            ("코스피 이동평균 알려줘", "get_technicals", {"ticker": "^KS11"}),
+            ("오늘 많이 오른 종목", "get_top_movers", {"universe": "KOSPI_LARGE", "kind": "gainers"}),
+        ])
+    r = IntentRouter(classifier=classifier, min_score=0.6)
+    # 뉴스(기존 빠른 경로와 동일: 모델 없이 바로 목록)
+    r.add_rule("news", r"최신|top\s*\d{1,2}", "get_latest_news", _news_args, direct=True)
+    # 경제지표
+    r.add_rule("cpi", r"\bCPI\b|소비자\s*물가", "get_indicator", {"indicator_type": "CPI"})
+    r.add_rule("ppi", r"\bPPI\b|생산자\s*물가", "get_indicator", {"indicator_type": "PPI"})
+    r.add_rule("gdp", r"\bGDP\b|경제\s*성장률", "get_indicator", {"indicator_type": "GDP"})
+    r.add_rule("trade", r"무역\s*수지", "get_indicator", {"indicator_type": "TRADE_BALANCE"})
+    r.add_rule("current_account", r"경상\s*수지", "get_indicator", {"indicator_type": "CURRENT_ACCOUNT"})
+    r.add_rule("fed", r"미국\s*(?:기준)?\s*금리|연준|FOMC|연방\s*기금", "get_indicator", _fed_args)
+    r.add_rule("base_rate", r"^(?!.*(?:미국|연준)).*(?:한국\s*)?기준\s*금리", "get_indicator", {"indicator_type": "BASE_RATE"})
+    # 지수/환율
+    r.add_rule("kospi", rf"{_NO_TECH}.*(?:코스피|KOSPI)", "get_market", {"market_type": "KOSPI"})
+    r.add_rule("kosdaq", rf"{_NO_TECH}.*(?:코스닥|KOSDAQ)", "get_market", {"market_type": "KOSDAQ"})
+    r.add_rule("jpy_krw", rf"{_NO_TECH}.*(?:엔\s*화|엔\s*/\s*원|원\s*/\s*엔|엔\s*환율)", "get_market", {"market_type": "JPY_KRW"})
+    r.add_rule("eur_usd", rf"{_NO_TECH}.*유로", "get_market", {"market_type": "EUR_USD"})
+    r.add_rule("usd_krw", rf"{_NO_TECH}(?!.*(?:{_FX_OTHER})).*(?:환율|달러|원\s*/\s*달러)", "get_market", {"market_type": "USD_KRW"})
+    r.add_rule("fx_pair", rf"{_NO_TECH}.*(?:환율|환전)", "get_market", _fx_args)
+    r.add_rule("summary", r"시장\s*요약|시황|증시\s*요약", "get_market", {"market_type": "MARKET_SUMMARY"})
+    # 유니버스 상승/하락 상위·시장 폭
+    r.add_rule("movers", _MOVERS_WORDS, "get_top_movers", _movers_args)
+    # 가격 알림: 대상 + 기준가 + 조건("넘으면", "아래로 떨어지면") + 알려줘/알림 / 내 알림 목록
+    r.add_rule("price_alert", rf"(?:{_ALERT_COND})(?=.*(?:알려|알림|알람))", "price_alert", _alert_args, direct=True)
+    r.add_rule("alert_list", r"^(?!.*(?:\d|취소|삭제)).*(?:알림|알람)\s*(?:목록|리스트|확인|현황)|(?:내|등록한|설정한)\s*(?:가격\s*)?(?:알림|알람)(?!.*(?:취소|삭제))",
+               "price_alert", {"action": "list"}, direct=True)
+    # 기술적 지표: 지표 단어 + 지수/환율/종목 하나
+    r.add_rule("technicals", _TECH_WORDS, "get_technicals", _tech_args)
+    # 개별 종목: 영문 심볼/KRX 코드 또는 종목명(로컬 인덱스) + 시세 단어
+    r.add_rule("quote_symbol", rf"(?<![A-Za-z0-9])(\d{{6}}\.K[SQ]|[A-Z]{{1,5}}(?:[.-][A-Z])?)\s*{_QUOTE_WORDS}", "get_market", _quote_args, flags=0)
+    if len(TICKERS):
+        r.add_rule("quote_name", rf"(\S+(?:\s+\S+)?)\s*{_QUOTE_WORDS}", "get_market", _name_quote_args)
+    return r
+
+ROUTER = _build_router()
+
+def _router_messages(intent: Dict[str, Any], result: dict) -> List[dict]:
+    # 라우터가 고른 도구 호출을 모델이 직접 부른 것처럼 assistant/tool 메시지로 구성
+    call = {"id": "router_0", "name": intent["tool"], "arguments": json.dumps(intent["arguments"], ensure_ascii=False)}
+    return [_assistant_tool_calls_msg([call]), _tool_message(call["id"], result)]
+
+def _assistant_tool_calls_msg(calls: List[Dict[str, str]], content: Optional[str] = None) -> dict:
+    return {
+        "role": "assistant",
+        "content": content,
+        "tool_calls": [
+            {"id": c["id"], "type": "function", "function": {"name": c["name"], "arguments": c["arguments"]}}
+            for c in calls
+        ],
+    }
+
+# ===== Direct 답변 모드 =====
+# 도구 1개짜리 답변은 도구 markdown을 그대로 반환(2차 completion 생략)
+# 모드: off(항상 2차 호출) / policy(DIRECT_TOOLS에 있는 도구만) / always(모든 단일 도구)
+DIRECT_ANSWER_MODE = os.getenv("DIRECT_ANSWER_MODE", "policy")
+# search_docs는 이미 완성 문장(RAG 응답), 뉴스 목록은 기존 빠른 경로와 동일하게 바로 반환
+DIRECT_TOOLS = {t.strip() for t in os.getenv("DIRECT_TOOLS", "search_docs,get_latest_news").split(",") if t.strip()}
+
+def _use_direct(payload: dict, tool_name: str, rule_default: Optional[bool] = None, routed: bool = False) -> bool:
+    # 우선순위: 요청 플래그 direct → 라우터 규칙 기본값 → ROUTER_MODE(라우터 경로) → 모드/도구 정책
+    if payload.get("direct") is not None:
+        return bool(payload["direct"])
+    if rule_default is not None:
+        return rule_default
+    if routed and ROUTER_MODE == "direct":
+        return True
+    if DIRECT_ANSWER_MODE == "always":
+        return True
+    return DIRECT_ANSWER_MODE == "policy" and tool_name in DIRECT_TOOLS
+
+# ===== 응답 경로 통계 =====
+# 경로별 건수/지연 분포: router_direct, router_phrase, model_direct(2차 생략), model_full, model_no_tool, error
+class PathStats:
+    def __init__(self, window: int = 2000):
+        self.window = window
+        self._lat: Dict[str, "deque"] = {}
+        self._count: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, path: str, seconds: float):
+        with self._lock:
+            self._count[path] = self._count.get(path, 0) + 1
+            self._lat.setdefault(path, deque(maxlen=self.window)).append(seconds)
+
+    @staticmethod
+    def _pct(sorted_vals: List[float], q: float) -> float:
+        i = min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))
+        return round(sorted_vals[i], 4)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            out = {}
+            for path, n in self._count.items():
+                vals = sorted(self._lat[path])
+                out[path] = {
+                    "count": n,
+                    "mean_s": round(sum(vals) / len(vals), 4),
+                    "p50_s": self._pct(vals, 0.50),
+                    "p90_s": self._pct(vals, 0.90),
+                    "p99_s": self._pct(vals, 0.99),
+                }
+            total = sum(self._count.values())
+            short = self._count.get("router_direct", 0) + self._count.get("model_direct", 0)
+        return {"paths": out, "total": total, "short_path_ratio": round(short / total, 4) if total else 0.0}
+
+PATH_STATS = PathStats()
+
 # ===== FastAPI 앱/CORS =====
 # 앱 인스턴스 생성, 전역 CORS 허용(데모 편의)
 app = FastAPI(title="Chat+RAG+News+Indicators (Function Calling)")
@@ -641,25 +1926,104 @@ app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=False, allow_methods=["*"], allow_headers=["*"],
 )
+
+# ===== 운영(/admin) 인증 =====
+# CORS가 전체 허용이므로 /admin 엔드포인트는 X-Admin-Token 헤더로 보호 (ADMIN_TOKEN 미설정 시 비활성 → 404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="관리자 토큰이 필요합니다.")
+
 # ===== 세션 메모리 =====
-# 간단한 인메모리 대화 히스토리 (최근 20턴)
-SESSIONS: Dict[str, List[Dict[str, str]]] = {}
+# 인메모리 대화 히스토리 (세션당 최근 20턴) + 유휴 TTL + LRU 축출 + 전체 메모리 상한
+# 프롬프트에는 토큰 예산만큼의 최근 메시지 + 그보다 오래된 대화의 롤링 요약만 넣는다
 MAX_TURNS = 20
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", "3600"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", "20000"))
+
+SESSIONS = SessionStore(MAX_TURNS, SESSION_IDLE_TTL, SESSION_MAX_BYTES, SESSION_MAX_COUNT)
 
 def get_session(session_id: str) -> List[Dict[str, str]]:
-    # 세션 조회/초기화
-    if session_id not in SESSIONS: SESSIONS[session_id] = []
-    return SESSIONS[session_id]
+    # 세션 히스토리 조회
+    return SESSIONS.get(session_id)
 
 def add_turn(session_id: str, role: str, content: str):
-    # 세션 저장 및 길이 제한
-    sess = get_session(session_id)
-    sess.append({"role": role, "content": content})
-    if len(sess) > 2 * MAX_TURNS:
-        SESSIONS[session_id] = sess[-2*MAX_TURNS:]
+    # 세션 저장 및 길이/메모리 제한
+    SESSIONS.add_turn(session_id, role, content)
+
+# ===== 롤링 요약 =====
+# 예산 창 밖으로 밀려난 메시지가 쌓이면 요청 경로 밖(백그라운드 태스크)에서 요약에 접어 넣음
+SUMMARY_MODEL = os.getenv("SUMMARY_MODEL", "gpt-5-mini")
+SUMMARY_MIN_OVERFLOW = 4   # 창 밖 메시지가 이 개수 이상일 때만 요약(호출 빈도 제한)
+SUMMARY_PROMPT = """
+너는 대화 요약기다. [이전 요약]과 [이어진 대화]를 합쳐 갱신된 요약만 출력하라.
+- 한국어 5~8문장 이내, 사용자의 관심 종목/지표/질문 의도와 답변에 나온 핵심 수치·날짜를 보존한다.
+- 인사말/군더더기는 버린다.
+"""
+_SUMMARY_TASKS: set = set()
+
+async def summarize_session(session_id: str):
+    job = SESSIONS.begin_summary(session_id, SUMMARY_MIN_OVERFLOW, HISTORY_TOKEN_BUDGET)
+    if job is None:
+        return
+    prev, turns, upto = job
+    convo = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    try:
+        with upstream("openai"):
+            comp = await aclient.chat.completions.create(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_PROMPT},
+                    {"role": "user", "content": f"[이전 요약]\n{prev or '(없음)'}\n\n[이어진 대화]\n{convo}"},
+                ],
+            )
+        summary = (comp.choices[0].message.content or "").strip()
+        SESSIONS.end_summary(session_id, upto, summary or None)
+    except Exception:
+        log.exception("session summary failed")
+        SESSIONS.end_summary(session_id)
+
+def schedule_summary(session_id: str):
+    # 응답 반환을 막지 않도록 태스크로 분리 (참조 유지로 GC 방지)
+    task = asyncio.create_task(summarize_session(session_id))
+    _SUMMARY_TASKS.add(task)
+    task.add_done_callback(_SUMMARY_TASKS.discard)
+
+# ===== 챗 공통 유틸 =====
+# 세션 히스토리 → 메시지 구성, 요청 옵션 해석
+def _build_messages(session_id: str, user_msg: str) -> List[Dict[str, Any]]:
+    # 시스템 프롬프트 + (롤링 요약) + 토큰 예산 안의 최근 메시지 + 이번 질문
+    summary, window, _ = SESSIONS.get_context(session_id, HISTORY_TOKEN_BUDGET)
+    msgs = [{"role": "system", "content": SYSTEM_INSTRUCTIONS}]
+    if summary:
+        msgs.append({"role": "system", "content": f"이전 대화 요약:\n{summary}"})
+    for t in window:
+        msgs.append({"role": t["role"], "content": t["content"]})
+    msgs.append({"role": "user", "content": user_msg})
+    return msgs
+
+def _route(payload: dict, user_msg: str) -> Optional[Dict[str, Any]]:
+    # payload["router"]=false 로 요청별 비활성화
+    if not ROUTER_ENABLED or payload.get("router") is False:
+        return None
+    return ROUTER.route(user_msg)
+
+def _router_direct(payload: dict, intent: Dict[str, Any]) -> bool:
+    return _use_direct(payload, intent["tool"], intent.get("direct"), routed=True)
+
+# ===== 챗 요청 병합 =====
+# 히스토리 없는 동일 질문은 진행 중인 답변 하나를 공유 (COALESCE_CHAT=0이면 끔, 알림 요청은 세션에 쓰므로 제외)
+COALESCE_CHAT = os.getenv("COALESCE_CHAT", "1") == "1"
+_ALERT_HINT = re.compile(rf"{_ALERT_COND}|알림|알람")
+CHAT_FLIGHT = AsyncSingleFlight()
 
 # ===== 메인 챗 엔드포인트 =====
-# 사용자 메시지 → OpenAI → (필요시) 함수 호출 → 최종 답변
+# 사용자 메시지 → (라우터 적중 시 도구 바로 실행) → OpenAI → (필요시) 함수 호출 → 최종 답변
 @app.post("/api/chat")
 @app.post("/chat")
 async def chat(payload: dict = Body(...)):
@@ -668,66 +2032,635 @@ async def chat(payload: dict = Body(...)):
     if not user_msg:
         return {"answer": "질문이 비어있습니다."}
 
-    # "뉴스 최신/Top N" 빠른 경로 처리
-    m = re.search(r"top\s*(\d{1,2})", user_msg, flags=re.IGNORECASE)
-    if "뉴스" in user_msg and ("최신" in user_msg or m):
-        try:
-            n = max(1, min(50, int(m.group(1)))) if m else 5
-            rows = fetch_latest_topn_from_mongo(n)
-            return {"answer": format_topn_md(rows)}
-        except Exception:
-            return {"answer": "DB 조회 오류. 잠시 후 다시 시도해 주세요."}
-
     # 세션 히스토리 구성
-    msgs = [{"role": "system", "content": SYSTEM_INSTRUCTIONS}]
-    for t in get_session(session_id):
-        msgs.append({"role": t["role"], "content": t["content"]})
-    msgs.append({"role": "user", "content": user_msg})
+    timings: Dict[str, float] = {}
+    _REQ_TIMINGS.set(timings)
+    _REQ_SESSION.set(session_id)
+    msgs = _build_messages(session_id, user_msg)
+    t0 = time.perf_counter()
 
     try:
-        # 1차 응답(도구 사용 여부 판단)
-        comp = client.chat.completions.create(
+        # 히스토리 없는(무상태) 동일 질문은 진행 중인 답변 하나를 공유 (세션에 쓰는 알림 요청은 제외)
+        if COALESCE_CHAT and len(msgs) == 2 and not _ALERT_HINT.search(user_msg):
+            key = (user_msg, payload.get("direct"), bool(payload.get("no_cache")), payload.get("router"))
+            answer, path = await CHAT_FLIGHT.do(key, lambda: _answer(payload, user_msg, msgs))
+        else:
+            answer, path = await _answer(payload, user_msg, msgs)
+
+        with stage("session_write"):
+            add_turn(session_id, "user", user_msg)
+            add_turn(session_id, "assistant", answer)
+            schedule_summary(session_id)
+        total = time.perf_counter() - t0
+        PATH_STATS.record(path, total)
+        CHAT_SECONDS.observe(total, path=path)
+        log.info("chat path=%s total=%.3fs stages=%s", path, total, timings)
+        out = {"answer": answer, "session_id": session_id}
+        if payload.get("debug"):
+            out["timings"] = {"path": path, "total": round(total, 4), **timings}
+        return out
+    except Exception as e:
+        log.exception("chat failed")
+        PATH_STATS.record("error", time.perf_counter() - t0)
+        CHAT_SECONDS.observe(time.perf_counter() - t0, path="error")
+        return {"answer": "일시적 오류가 발생했습니다. 잠시 후 다시 시도해주세요."}
+
+async def _answer(payload: dict, user_msg: str, msgs: List[Dict[str, Any]]) -> tuple:
+    # (답변, 경로) — 라우터 → 1차 completion → 도구 → (direct | 2차 completion)
+    use_cache = not payload.get("no_cache")
+    with stage("router"):
+        intent = _route(payload, user_msg)
+    if intent:
+        # 라우터 경로: 도구 실행 → direct면 결과 그대로, 아니면 문장화용 completion 1회
+        with stage("tools"):
+            result = await _run_tool_bounded(intent["tool"], intent["arguments"], use_cache)
+        if _router_direct(payload, intent) and result.get("ok"):
+            return result["markdown"], "router_direct"
+        with stage("completion_2"), upstream("openai"):
+            final = await aclient.chat.completions.create(
+                model="gpt-5",
+                messages=msgs + _router_messages(intent, result),
+            )
+        return final.choices[0].message.content or "응답 생성 실패", "router_phrase"
+
+    # 1차 응답(도구 사용 여부 판단)
+    with stage("completion_1"), upstream("openai"):
+        comp = await aclient.chat.completions.create(
             model="gpt-5",
             messages=msgs,
             tools=TOOLS,
             tool_choice="auto",
         )
-        msg = comp.choices[0].message
-
-        # 도구 호출 시: 실행 결과를 재주입해 최종 응답 생성
-        if getattr(msg, "tool_calls", None):
-            tool_msgs = []
-            for tc in msg.tool_calls:
-                fn = tc.function.name
-                args = json.loads(tc.function.arguments or "{}")
-                result = run_tool(fn, args)
-                tool_msgs.append({"role": "tool", "tool_call_id": tc.id, "content": json.dumps(result, ensure_ascii=False)})
-
-            final = client.chat.completions.create(
-                model="gpt-5",
-                messages=msgs + [msg] + tool_msgs
-            )
-            answer = final.choices[0].message.content or "응답 생성 실패"
+    msg = comp.choices[0].message
+    if not getattr(msg, "tool_calls", None):
+        return msg.content or "응답 생성 실패", "model_no_tool"
+
+    # 도구 호출 시: 실행 결과를 재주입해 최종 응답 생성
+    with stage("tools"):
+        tool_msgs = await run_tool_calls([
+            {"id": tc.id, "name": tc.function.name, "arguments": tc.function.arguments}
+            for tc in msg.tool_calls
+        ], use_cache)
+
+    # 단일 도구 + direct 허용이면 도구 markdown 그대로(2차 호출 생략)
+    single = json.loads(tool_msgs[0]["content"]) if len(tool_msgs) == 1 else None
+    if single and single.get("ok") and _use_direct(payload, msg.tool_calls[0].function.name):
+        return single["markdown"], "model_direct"
+    with stage("completion_2"), upstream("openai"):
+        final = await aclient.chat.completions.create(
+            model="gpt-5",
+            messages=msgs + [msg] + tool_msgs
+        )
+    return final.choices[0].message.content or "응답 생성 실패", "model_full"
+
+# ===== 스트리밍 챗 엔드포인트 (SSE) =====
+# 토큰 단위 전송: start → token* → (tool running/done)* → token* → done | error
+async def _stream_completion(stage_name: str, request: dict, parts: List[str], calls: Dict[int, Dict[str, str]]):
+    # OpenAI 스트림 요청 + 청크 소비: 텍스트 토큰은 yield, tool_calls 조각은 index별로 누적
+    # 소요시간은 create()와 청크 대기(await)만 합산해 끝날 때 1회 기록 — yield 후 클라이언트가 읽어 갈 때까지의 시간은 제외
+    busy, t = 0.0, time.perf_counter()
+    try:
+        stream = await aclient.chat.completions.create(**request, stream=True)
+        busy, t = busy + time.perf_counter() - t, None
+        it = stream.__aiter__()
+        while True:
+            t = time.perf_counter()
+            try:
+                chunk = await it.__anext__()
+            except StopAsyncIteration:
+                break
+            busy, t = busy + time.perf_counter() - t, None
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if getattr(delta, "content", None):
+                parts.append(delta.content)
+                yield _sse("token", {"text": delta.content})
+            for tc in getattr(delta, "tool_calls", None) or []:
+                slot = calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                if tc.id:
+                    slot["id"] = tc.id
+                if tc.function is not None:
+                    slot["name"] += tc.function.name or ""
+                    slot["arguments"] += tc.function.arguments or ""
+    except Exception:
+        UPSTREAM_ERRORS.inc(upstream="openai")
+        raise
+    finally:
+        if t is not None:
+            busy += time.perf_counter() - t
+        _record_stage(stage_name, busy)
+        _record_upstream("openai", busy)
+
+async def _chat_stream_events(payload: dict, user_msg: str, session_id: str):
+    # 비동기 제너레이터 → AsyncOpenAI 스트림을 이벤트 루프에서 직접 순회
+    use_cache = not payload.get("no_cache")
+    t0 = time.perf_counter()
+    timings: Dict[str, float] = {}
+    _REQ_TIMINGS.set(timings)
+    _REQ_SESSION.set(session_id)
+    yield _sse("start", {"session_id": session_id})
+
+    msgs = _build_messages(session_id, user_msg)
+    try:
+        parts: List[str] = []
+        with stage("router"):
+            intent = _route(payload, user_msg)
+        if intent:
+            # 라우터 경로: 도구 상태 이벤트 → direct면 결과 한 번에, 아니면 문장화 스트리밍
+            yield _sse("tool", {"name": intent["tool"], "status": "running"})
+            with stage("tools"):
+                result = await _run_tool_bounded(intent["tool"], intent["arguments"], use_cache)
+            yield _sse("tool", {"name": intent["tool"], "status": "done" if result.get("ok") else "error"})
+            if _router_direct(payload, intent) and result.get("ok"):
+                path = "router_direct"
+                parts.append(result["markdown"])
+                yield _sse("token", {"text": result["markdown"]})
+            else:
+                path = "router_phrase"
+                request = dict(model="gpt-5", messages=msgs + _router_messages(intent, result))
+                async for ev in _stream_completion("completion_2", request, parts, {}):
+                    yield ev
         else:
-            answer = msg.content or "응답 생성 실패"
+            # 1차 응답(도구 사용 여부 판단) — 도구 없이 답하면 그대로 토큰 전송
+            calls: Dict[int, Dict[str, str]] = {}
+            request = dict(model="gpt-5", messages=msgs, tools=TOOLS, tool_choice="auto")
+            async for ev in _stream_completion("completion_1", request, parts, calls):
+                yield ev
+            path = "model_no_tool"
+
+            # 도구 호출 시: 실행 상태 이벤트 → 결과 재주입 → 최종 응답 스트리밍
+            if calls:
+                ordered = [calls[i] for i in sorted(calls)]
+                assistant_msg = _assistant_tool_calls_msg(ordered, "".join(parts) or None)
+                # 전부 동시에 시작, 끝나는 순서대로 done 이벤트, 메시지는 원래 순서로
+                for c in ordered:
+                    yield _sse("tool", {"name": c["name"], "status": "running"})
+                # tools 단계 = 시작 ~ 마지막 도구 완료 (done 이벤트를 클라이언트가 읽어 가는 시간은 제외)
+                results: Dict[int, dict] = {}
+                done_at: List[float] = []
+                t_tools = time.perf_counter()
+                tasks = [asyncio.ensure_future(_tool_task(i, c["name"], c["arguments"], use_cache)) for i, c in enumerate(ordered)]
+                for task in tasks:
+                    task.add_done_callback(lambda _: done_at.append(time.perf_counter()))
+                for fut in asyncio.as_completed(tasks):
+                    i, result = await fut
+                    results[i] = result
+                    yield _sse("tool", {"name": ordered[i]["name"], "status": "done" if result.get("ok") else "error"})
+                _record_stage("tools", max(done_at) - t_tools)
+                tool_msgs = [_tool_message(c["id"], results[i]) for i, c in enumerate(ordered)]
+
+                # 도구 호출 전 텍스트는 이미 클라이언트에 전송됐으므로 저장 답변에도 남기고, 이어지는 답과는 빈 줄로 구분
+                if "".join(parts).strip():
+                    parts.append("\n\n")
+                    yield _sse("token", {"text": "\n\n"})
+                if len(ordered) == 1 and results[0].get("ok") and _use_direct(payload, ordered[0]["name"]):
+                    path = "model_direct"
+                    parts.append(results[0]["markdown"])
+                    yield _sse("token", {"text": results[0]["markdown"]})
+                else:
+                    path = "model_full"
+                    request = dict(model="gpt-5", messages=msgs + [assistant_msg] + tool_msgs)
+                    async for ev in _stream_completion("completion_2", request, parts, {}):
+                        yield ev
+
+        answer = "".join(parts).strip() or "응답 생성 실패"
+        with stage("session_write"):
+            add_turn(session_id, "user", user_msg)
+            add_turn(session_id, "assistant", answer)
+            schedule_summary(session_id)
+        total = time.perf_counter() - t0
+        PATH_STATS.record(path, total)
+        CHAT_SECONDS.observe(total, path=path)
+        done = {"answer": answer, "session_id": session_id}
+        if payload.get("debug"):
+            done["timings"] = {"path": path, "total": round(total, 4), **timings}
+        yield _sse("done", done)
+    except Exception:
+        log.exception("chat stream failed")
+        PATH_STATS.record("error", time.perf_counter() - t0)
+        CHAT_SECONDS.observe(time.perf_counter() - t0, path="error")
+        yield _sse("error", {"message": "일시적 오류가 발생했습니다. 잠시 후 다시 시도해주세요."})
+
+async def _ttfb_observed(events):
+    # 첫 token 이벤트까지의 시간(TTFB) 기록
+    t0, seen = time.perf_counter(), False
+    async for ev in events:
+        if not seen and ev.startswith("event: token"):
+            seen = True
+            STREAM_TTFB_SECONDS.observe(time.perf_counter() - t0)
+        yield ev
+
+@app.post("/api/chat/stream")
+@app.post("/chat/stream")
+async def chat_stream(payload: dict = Body(...)):
+    user_msg = (payload.get("message") or "").strip()
+    session_id = payload.get("session_id", "default")
+    if not user_msg:
+        return {"answer": "질문이 비어있습니다."}
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(
+        _ttfb_observed(_chat_stream_events(payload, user_msg, session_id)),
+        media_type="text/event-stream",
+        headers=headers,
+    )
 
-        add_turn(session_id, "user", user_msg)
-        add_turn(session_id, "assistant", answer)
-        return {"answer": answer, "session_id": session_id}
-    except Exception as e:
-        log.exception("chat failed")
-        return {"answer": "일시적 오류가 발생했습니다. 잠시 후 다시 시도해주세요."}
+# ===== 시세 선택 조회 =====
+# keys(개별 키) / groups(KR·US·EU·ASIA·COMMODITIES·RATES·FX) / indices·fx 플래그 → 키 목록 (INDEX_MAP → FX_MAP 순서 유지)
+# 그룹은 거래소로 자동 분류 (예외만 _KEY_GROUP_OVERRIDES), fields로 행 필드 제한
+_TICKER_KEYS: Dict[str, List[tuple]] = {}   # 티커 → [(indices|fx, 키)]
+for _group, _m in (("indices", INDEX_MAP), ("fx", FX_MAP)):
+    for _k, _v in _m.items():
+        _TICKER_KEYS.setdefault(_v["ticker"], []).append((_group, _k))
+_KEY_TICKER = {k: t for t, keys in _TICKER_KEYS.items() for _, k in keys}
+_KEY_SECTION = {k: g for keys in _TICKER_KEYS.values() for g, k in keys}
+_ALL_KEYS = [*INDEX_MAP, *FX_MAP]
+
+_MARKET_GROUP = {"KRX": "KR", "US": "US", "EU": "EU", "UK": "EU", "JP": "ASIA", "CN": "ASIA", "HK": "ASIA",
+                 "FUT": "COMMODITIES", "FX": "FX"}
+_KEY_GROUP_OVERRIDES = {"US10Y": "RATES"}
+MARKET_GROUPS: Dict[str, set] = {}
+for _k in _ALL_KEYS:
+    _g = _KEY_GROUP_OVERRIDES.get(_k) or _MARKET_GROUP[market_for(_KEY_TICKER[_k])]
+    MARKET_GROUPS.setdefault(_g, set()).add(_k)
+ROW_FIELDS = ("key", "name", "ticker", "price", "prevClose", "change", "changePct", "ts_kst", "market", "session")
+
+def _csv_upper(s: Optional[str]) -> List[str]:
+    return [x.strip().upper() for x in (s or "").split(",") if x.strip()]
+
+def _select_keys(keys: Optional[str], groups: Optional[str], indices: int, fx: int, default_all: bool = False):
+    # → (선택 키 목록, 알 수 없는 키/그룹 목록) — keys/groups가 없으면 플래그(둘 다 0이면 default_all)
+    want, unknown = set(), []
+    for k in _csv_upper(keys):
+        if k in _KEY_TICKER:
+            want.add(k)
+        else:
+            unknown.append(k)
+    for g in _csv_upper(groups):
+        if g in MARKET_GROUPS:
+            want.update(MARKET_GROUPS[g])
+        else:
+            unknown.append(g)
+    if not keys and not groups:
+        sections = {s for flag, s in ((indices, "indices"), (fx, "fx")) if flag}
+        if not sections and default_all:
+            sections = {"indices", "fx"}
+        want = {k for k in _ALL_KEYS if _KEY_SECTION[k] in sections}
+    return [k for k in _ALL_KEYS if k in want], unknown
+
+def _describe_markets(keys: Iterable[str]) -> Dict[str, dict]:
+    # 키 목록에 걸린 시장만 세션 상태 계산
+    markets: Dict[str, dict] = {}
+    for k in keys:
+        mk = market_for(_KEY_TICKER[k])
+        if mk not in markets:
+            markets[mk] = CALENDAR.describe(mk)
+    return markets
 
 # ===== 보조 시세 API =====
-# 지수/환율 묶음 조회(경량 JSON)
+# 지수/환율 묶음 조회(경량 JSON) — 시장 스냅샷에서 읽음, 같은 버전·선택·세션 상태 재요청은 304
+# 티커별 market/session + 시장별 세션(다음 개장/마감) + poll_after_s(권장 폴링 간격)
+# 선택: keys=KOSPI,USD_KRW / groups=KR,FX / indices=1&fx=1 (기존), fields=price,changePct (key는 항상 포함)
 @app.get("/api/markets")
-def api_markets(indices: int = 0, fx: int = 0):
-    payload = {"ts_kst": datetime.now(KST).isoformat(), "data": {}}
-    if indices:
-        payload["data"]["indices"] = [{"key": k, "name": v["name"], **fetch_quote_yf(v["ticker"])} for k, v in INDEX_MAP.items()]
-    if fx:
-        payload["data"]["fx"] = [{"key": k, "name": v["name"], **fetch_quote_yf(v["ticker"])} for k, v in FX_MAP.items()]
-    return payload
+def api_markets(request: Request, indices: int = 0, fx: int = 0, keys: Optional[str] = None,
+                groups: Optional[str] = None, fields: Optional[str] = None):
+    selected, unknown = _select_keys(keys, groups, indices, fx)
+    want_fields = [f for f in (x.strip() for x in (fields or "").split(",")) if f]
+    bad_fields = [f for f in want_fields if f not in ROW_FIELDS]
+    if unknown or bad_fields:
+        return JSONResponse({"error": "알 수 없는 키/그룹/필드", "unknown": unknown + bad_fields,
+                             "groups": sorted(MARKET_GROUPS), "fields": list(ROW_FIELDS)}, status_code=400)
+    cols = ["key"] + [f for f in ROW_FIELDS if f in want_fields and f != "key"] if want_fields else list(ROW_FIELDS)
+
+    # 선택된 키의 시장만 세션 계산
+    markets = _describe_markets(selected)
+    states = "".join(f"{mk}:{d['state'][0]}" for mk, d in sorted(markets.items()))
+    sel = zlib.crc32(f"{','.join(selected)}|{','.join(cols)}".encode())
+    etag = f'W/"{MARKET.version}-{sel:08x}-{states}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    quotes = MARKET.quotes()
+    payload = {
+        "ts_kst": datetime.now(KST).isoformat(), "version": MARKET.version, "as_of": MARKET.as_of,
+        "markets": markets,
+        "poll_after_s": int(min((CALENDAR.quote_ttl(mk) for mk in markets), default=CALENDAR.open_ttl)),
+        "data": {},
+    }
+    for k in selected:
+        t = _KEY_TICKER[k]
+        section = _KEY_SECTION[k]
+        mk = market_for(t)
+        q = quotes.get(t) or {"ticker": t, "price": None}
+        full = {"key": k, "name": (INDEX_MAP.get(k) or FX_MAP[k])["name"], **q, "market": mk, "session": markets[mk]["state"]}
+        payload["data"].setdefault(section, []).append({c: full.get(c) for c in cols})
+    return JSONResponse(payload, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+# ===== 시세 스트리밍 (SSE) =====
+# 스냅샷 새 버전 → 바뀐 시세만 delta로 1회 직렬화 → 전체 구독자에게 fan-out (필터가 같은 구독자끼리 프레임 공유)
+# 구독자별 bounded 큐: 가득 차면 밀린 delta를 버리고 resync(현재 전체 상태) 1건으로 대체, 반복되면 연결 종료
+MARKET_STREAM_MAX_CLIENTS = int(os.getenv("MARKET_STREAM_MAX_CLIENTS", "5000"))
+MARKET_STREAM_QUEUE = int(os.getenv("MARKET_STREAM_QUEUE", "16"))
+MARKET_STREAM_MAX_RESYNCS = int(os.getenv("MARKET_STREAM_MAX_RESYNCS", "10"))
+MARKET_STREAM_PING_SECS = float(os.getenv("MARKET_STREAM_PING_SECS", "15"))
+MARKET_HUB = MarketHub(
+    MARKET, _KEY_TICKER, _describe_markets,
+    max_clients=MARKET_STREAM_MAX_CLIENTS, queue_size=MARKET_STREAM_QUEUE,
+    ping_secs=MARKET_STREAM_PING_SECS, max_resyncs=MARKET_STREAM_MAX_RESYNCS,
+)
+
+def _stream_keys(keys: Optional[str], indices: int, fx: int, groups: Optional[str] = None) -> frozenset:
+    # keys/groups 우선, 없으면 indices/fx 플래그(둘 다 0이면 전체) — 알 수 없는 키는 무시
+    return frozenset(_select_keys(keys, groups, indices, fx, default_all=True)[0])
+
+# 연결 시 snapshot 1건 → 이후 변경분 delta, 느린 클라이언트는 resync/종료
+@app.get("/api/markets/stream")
+async def api_markets_stream(keys: Optional[str] = None, indices: int = 0, fx: int = 0, groups: Optional[str] = None):
+    sub_keys = _stream_keys(keys, indices, fx, groups)
+    if not sub_keys:
+        return JSONResponse({"error": "구독할 키가 없습니다."}, status_code=400)
+    return MARKET_HUB.response(MARKET_HUB.stream, sub_keys)
+
+# ===== 시세 히스토리 (차트) =====
+# 로컬 시계열 저장소 구간을 서버에서 points개로 다운샘플 → 조회 범위와 무관하게 응답 크기 고정
+# range → 봉 주기: 1d/5d는 1분봉, 그 이상은 일봉 / 구간은 마지막 봉 기준 (휴장 중이면 직전 세션까지)
+HISTORY_RANGES = {"1d": "1m", "5d": "1m", "1mo": "1d", "3mo": "1d", "6mo": "1d", "1y": "1d", "2y": "1d", "5y": "1d"}
+HISTORY_METHODS = ("lttb", "minmax")
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", "1000"))
+HISTORY_CACHE = TTLCache(maxsize=int(os.getenv("HISTORY_CACHE_SIZE", "256")))
+
+# 지수/환율 한글 통칭 → INDEX_MAP/FX_MAP 키 (정식 이름은 자동 등록)
+_INSTRUMENT_ALIASES = {
+    "나스닥": "NASDAQ", "다우": "DOW", "다우존스": "DOW", "s&p": "SP500", "s&p500": "SP500", "러셀": "RUSSELL",
+    "공포지수": "VIX", "니케이": "NIKKEI225", "닛케이": "NIKKEI225", "상해": "SHANGHAI", "상하이": "SHANGHAI",
+    "항셍": "HANG_SENG", "닥스": "DAX", "유가": "WTI_OIL", "원유": "WTI_OIL", "wti": "WTI_OIL", "브렌트": "BRENT_OIL",
+    "금": "GOLD", "금값": "GOLD", "은": "SILVER", "구리": "COPPER", "미국채": "US10Y", "10년물": "US10Y",
+    "환율": "USD_KRW", "달러": "USD_KRW", "원달러": "USD_KRW", "엔화": "JPY_KRW", "엔": "JPY_KRW", "유로": "EUR_USD",
+}
+_INSTRUMENT_NAMES = {
+    **{normalize_name(v["name"]): k for m in (INDEX_MAP, FX_MAP) for k, v in m.items()},
+    **{normalize_name(a): k for a, k in _INSTRUMENT_ALIASES.items()},
+}
+
+def _resolve_instrument(query: str, loose: bool = False, probe: bool = False) -> Optional[tuple]:
+    # → (티커, 이름): INDEX_MAP/FX_MAP 키·티커·이름/통칭 → 종목 인덱스 (loose면 접두/퍼지까지)
+    # probe: 목록 밖 6자리 코드의 시장을 시세 조회로 확인 (라우터처럼 네트워크를 타면 안 되는 곳에선 False)
+    raw = (query or "").strip()
+    k = raw.upper()
+    key = k if k in _KEY_TICKER else _INSTRUMENT_NAMES.get(normalize_name(raw))
+    if key is None and k in _TICKER_KEYS:
+        key = _TICKER_KEYS[k][0][1]
+    if key:
+        return _KEY_TICKER[key], (INDEX_MAP.get(key) or FX_MAP[key])["name"]
+    hit = (resolve_ticker if probe else TICKERS.resolve)(raw, prefix=loose, fuzzy=loose)
+    return (hit["ticker"], hit["name"]) if hit else None
+
+def _history_ticker(key: str) -> Optional[tuple]:
+    # 차트 키: 지수/환율 키·이름 또는 종목 인덱스 정확 일치(코드/심볼 포함, 목록 밖 6자리 코드는 .KS → .KQ 확인)
+    return _resolve_instrument(key, probe=True)
+
+def _range_start(ticker: str, rng: str, last: int) -> int:
+    # 1d: 마지막 봉이 속한 현지 날짜 0시 (직전 세션 전체) / 그 외: 마지막 봉 - 기간
+    if rng == "1d":
+        tz = ZoneInfo(MARKETS[market_for(ticker)]["tz"])
+        day = datetime.fromtimestamp(last, tz).replace(hour=0, minute=0, second=0, microsecond=0)
+        return int(day.timestamp())
+    return last - _PERIOD_SECONDS[rng]
+
+def _json_floats(a: np.ndarray) -> List[Optional[float]]:
+    return [None if v != v else v for v in np.round(a.astype(float), 4).tolist()]
+
+@coalesced
+def _history_payload(ticker: str, rng: str, points: int, method: str, with_ohlc: bool) -> dict:
+    # 저장소 증분 동기화(실패 시 저장된 값으로) → 구간 읽기 → 다운샘플
+    interval = HISTORY_RANGES[rng]
+    stale = _sync_history(ticker, interval, rng, tail=0) is None
+    last = TS_STORE.last_ts(ticker, interval)
+    if last is None:
+        return {"error": f"{ticker} 시세 이력이 없습니다."}
+    bars = TS_STORE.read(ticker, interval, start=_range_start(ticker, rng, last))
+    t, c = bars["ts"], bars["close"]
+    out = {"ticker": ticker, "range": rng, "interval": interval, "method": "ohlc" if with_ohlc else method,
+           "source_points": int(len(c)), "as_of": datetime.fromtimestamp(last, KST).isoformat(), "stale": stale}
+    if with_ohlc:
+        d = downsample.ohlc(t, bars["open"], bars["high"], bars["low"], c, points)
+        out.update({"t": d["t"].tolist(), **{f: _json_floats(d[f]) for f in ("open", "high", "low", "close")}})
+    else:
+        idx = downsample.lttb(t, c, points) if method == "lttb" else downsample.minmax(c, points)
+        out.update({"t": t[idx].tolist(), "close": _json_floats(c[idx])})
+    out["points"] = len(out["t"])
+    return out
+
+@app.get("/api/markets/history")
+def api_markets_history(request: Request, key: str, rng: str = Query("1mo", alias="range"), points: int = 200,
+                        method: str = "lttb", ohlc: int = 0):
+    # t: UTC epoch 초 배열, close(ohlc=1이면 open/high/low/close) 배열 — 열 단위라 JSON이 작음
+    if rng not in HISTORY_RANGES:
+        return JSONResponse({"error": f"range는 {', '.join(HISTORY_RANGES)} 중 하나"}, status_code=400)
+    if method not in HISTORY_METHODS:
+        return JSONResponse({"error": f"method는 {', '.join(HISTORY_METHODS)} 중 하나"}, status_code=400)
+    found = _history_ticker(key)
+    if not found:
+        return JSONResponse({"error": f"알 수 없는 키: {key}"}, status_code=404)
+    ticker, name = found
+    points = max(3, min(points, HISTORY_MAX_POINTS))
+    ck = (ticker, rng, points, method, bool(ohlc))
+    payload = HISTORY_CACHE.get(ck)
+    if payload is MISS:
+        payload = _history_payload(*ck)
+        if "error" in payload:
+            return JSONResponse(payload, status_code=502)
+        if not payload["stale"]:
+            HISTORY_CACHE.set(ck, payload, CALENDAR.quote_ttl(ticker))
+    etag = f'W/"{"-".join(map(str, ck))}-{payload["t"][-1] if payload["t"] else 0}-{payload["points"]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse({"key": key.strip().upper(), "name": name, **payload}, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+# ===== 기술적 지표 =====
+# 로컬 저장소 일봉(TECH_PERIOD)을 증분 동기화 후 technicals.compute로 계산
+# 결과는 (티커, 현지 거래일) 단위 캐시: 장중이면 마감까지, 휴장 중이면 다음 개장까지 재계산 없음
+TECH_PERIOD = os.getenv("TECH_PERIOD", "2y")
+TECH_CACHE = TTLCache(maxsize=int(os.getenv("TECH_CACHE_SIZE", "256")))
+
+def _tech_ttl(ticker: str) -> float:
+    st = CALENDAR.session(ticker)
+    until = st["next_close"] if st["state"] == "open" else st["next_open"]
+    if until is None:
+        return CALENDAR.closed_ttl_max
+    return max(60.0, min((until - datetime.now(timezone.utc)).total_seconds(), 24 * 3600))
+
+def _trading_day(ticker: str) -> str:
+    return datetime.now(ZoneInfo(MARKETS[market_for(ticker)]["tz"])).date().isoformat()
+
+def get_technicals(ticker: str) -> Dict[str, Any]:
+    hit = TECH_CACHE.get((ticker, _trading_day(ticker)))
+    return hit if hit is not MISS else _technicals_uncached(ticker, _trading_day(ticker))
+
+@coalesced
+def _technicals_uncached(ticker: str, day: str) -> Dict[str, Any]:
+    # 동기화 실패 시 저장된 일봉으로 계산(stale, 캐시 안 함)
+    stale = _sync_history(ticker, "1d", TECH_PERIOD, tail=0) is None
+    bars = TS_STORE.read(ticker, "1d", start=int(time.time()) - _PERIOD_SECONDS[TECH_PERIOD])
+    if not len(bars["close"]):
+        return {"error": f"{ticker} 일봉 이력이 없습니다."}
+    res = {"ticker": ticker, "stale": stale, **technicals.compute(bars["ts"], bars["high"], bars["low"], bars["close"])}
+    if not stale:
+        TECH_CACHE.set((ticker, day), res, _tech_ttl(ticker))
+    return res
+
+def _technicals_markdown(name: str, r: Dict[str, Any]) -> str:
+    num = lambda v, suffix="": "-" if v is None else f"{v:,.2f}{suffix}"
+    pct = lambda v: "-" if v is None else f"{v:+.2f}%"
+    sma, close = r["sma"], r["close"]
+    trend = ""
+    if sma.get(20) is not None and sma.get(60) is not None:
+        trend = f" (종가가 20일선 {'위' if close >= sma[20] else '아래'}, 20일선이 60일선 {'위' if sma[20] >= sma[60] else '아래'})"
+    rsi = r["rsi"]
+    rsi_note = "" if rsi is None else " · 과매수 구간" if rsi >= 70 else " · 과매도 구간" if rsi <= 30 else ""
+    rng = r["range_52w"]
+    day = datetime.fromtimestamp(r["last_ts"], KST).date().isoformat()
+    lines = [
+        f"**{name}({r['ticker']}) 기술적 지표** (기준 {day}, 일봉 {r['bars']}개)",
+        f"• 종가: {num(close)} · 수익률 1주 {pct(r['returns']['1w'])} / 1개월 {pct(r['returns']['1m'])} / 3개월 {pct(r['returns']['3m'])} / 1년 {pct(r['returns']['1y'])}",
+        "• 이동평균: " + ", ".join(f"{n}일 {num(v)}" for n, v in sma.items()) + trend,
+        f"• RSI(14): {num(rsi)}{rsi_note}",
+        f"• 실현 변동성(연율): 20일 {num(r['vol'][20], '%')} · 60일 {num(r['vol'][60], '%')}",
+        f"• 낙폭: 1년 고점 대비 {pct(r['drawdown']['current'])} · 1년 최대 {pct(r['drawdown']['max_1y'])}",
+        f"• 52주 범위: {num(rng['low'])} ~ {num(rng['high'])} (현재 위치 {num(rng['position'], '%')})",
+    ]
+    if r.get("stale"):
+        lines.append("• 참고: 최신 일봉 조회에 실패해 저장된 데이터 기준입니다.")
+    return "\n".join(lines)
+
+# ===== 가격 알림 =====
+# 세션별 "대상이 기준가 이상/이하가 되면" 알림 (alerts.AlertBook: 티커별 정렬 임계값 인덱스 + 저널/스냅샷 파일 영속)
+# 평가: 시장 스냅샷 새 버전마다 이번에 바뀐 시세만(리스너) + 스냅샷 밖 티커(개별 종목 등)는 ALERTS_POLL_INTERVAL마다 일괄 조회
+# 발동 이벤트는 세션 수신함에 쌓임 → /api/alerts/events(폴링, after=마지막 event_id) / /api/alerts/stream(SSE)
+ALERTS_FILE = os.getenv("ALERTS_FILE", str(DATA_DIR / "alerts.json"))
+ALERTS_MAX_PER_SESSION = int(os.getenv("ALERTS_MAX_PER_SESSION", "50"))
+ALERTS_POLL_INTERVAL = int(os.getenv("ALERTS_POLL_INTERVAL", "60"))   # 스냅샷 밖 티커 조회 주기(초)
+ALERTS_COMPACT_INTERVAL = int(os.getenv("ALERTS_COMPACT_INTERVAL", "300"))   # 저널 → 스냅샷 압축 주기(초)
+ALERT_STREAM_MAX_CLIENTS = int(os.getenv("ALERT_STREAM_MAX_CLIENTS", "5000"))
+ALERT_STREAM_QUEUE = int(os.getenv("ALERT_STREAM_QUEUE", "16"))
+ALERT_DIRECTIONS = {"above": "이상", "below": "이하"}
+
+ALERTS = AlertBook(ALERTS_FILE, max_per_session=ALERTS_MAX_PER_SESSION)
+MARKET.add_listener(lambda version, got: ALERTS.evaluate(got))
+
+def _alert_target(raw: str, loose: bool = True, probe: bool = False) -> Optional[tuple]:
+    # → (티커, 이름): 지수/환율 키·이름 → 통화쌍 표기(USD/KRW, GBP_KRW, 파운드/원) → 종목 인덱스 (loose면 접두/퍼지까지)
+    raw = (raw or "").strip()
+    if re.search(r"[/_]|환율|=X$", raw, re.IGNORECASE) or re.fullmatch(r"[A-Za-z]{6}", raw):
+        p = fx.parse_pair(raw)
+        if p:
+            return fx.ticker(*p), fx.name(*p)
+    return _resolve_instrument(raw, loose=loose, probe=probe)
+
+def _alert_num(ticker: str, v: float) -> str:
+    return _fx_num(v) if ticker.upper().endswith("=X") else f"{v:,.2f}"
+
+def _alert_label(a: Dict[str, Any]) -> str:
+    label = a["ticker"] if a["name"] == a["ticker"] else f"{a['name']}({a['ticker']})"
+    return f"{label} {_alert_num(a['ticker'], a['threshold'])} {ALERT_DIRECTIONS[a['direction']]}"
+
+def _alert_event(e: Dict[str, Any]) -> Dict[str, Any]:
+    # 수신함 이벤트 → 응답 형태 (세션 id 제외, 안내 문구 추가)
+    out = {k: v for k, v in e.items() if k != "session_id"}
+    out["message"] = f"{_alert_label(e)} 도달 — 현재 {_alert_num(e['ticker'], e['price'])}"
+    return out
+
+def create_alert(session_id: str, raw: str, price, direction: str = "auto") -> tuple:
+    # → (알림 dict | None, 안내 문구) — 방향 auto는 현재가 기준, 이미 조건을 만족하면 등록하지 않음
+    target = _alert_target(str(raw), probe=True)
+    if target is None:
+        return None, f"'{raw}'에 해당하는 지수/환율/종목을 찾지 못했습니다. 예: USD/KRW, KOSPI, 삼성전자"
+    try:
+        threshold = float(price)
+    except (TypeError, ValueError):
+        return None, "알림 기준 가격을 숫자로 알려 주세요."
+    ticker, name = target
+    cur = (_alert_quotes([ticker]).get(ticker) or {}).get("price")
+    if direction not in ALERT_DIRECTIONS:
+        if cur is None:
+            return None, f"{name} 현재가를 확인하지 못해 방향을 정할 수 없습니다. '이상' 또는 '이하'로 지정해 주세요."
+        direction = "above" if threshold > cur else "below"
+    if cur is not None and (cur >= threshold if direction == "above" else cur <= threshold):
+        return None, f"{name} 현재가가 {_alert_num(ticker, cur)}로 이미 {_alert_num(ticker, threshold)} {ALERT_DIRECTIONS[direction]}입니다."
+    try:
+        a = ALERTS.add(session_id, ticker, name, direction, threshold, price_at=cur)
+    except AlertError as e:
+        return None, str(e)
+    now = f" (현재 {_alert_num(ticker, cur)})" if cur is not None else ""
+    return a, f"{a['id']}번 알림을 등록했습니다: {_alert_label(a)}{now}. 조건을 만족하면 알려 드릴게요."
+
+def price_alert(session_id: str, arguments: dict) -> str:
+    # price_alert 도구: create / list / cancel
+    action = (arguments.get("action") or "create").lower()
+    if action == "list":
+        rows = ALERTS.list(session_id)
+        if not rows:
+            return "등록된 가격 알림이 없습니다."
+        return "\n".join(["**등록된 가격 알림**"] + [f"{a['id']}. {_alert_label(a)} (등록 {a['created_at'][:16]})" for a in rows])
+    if action == "cancel":
+        aid = arguments.get("alert_id")
+        if aid is not None and ALERTS.cancel(session_id, int(aid)):
+            return f"{aid}번 알림을 취소했습니다."
+        return f"취소할 알림을 찾지 못했습니다: {aid}"
+    return create_alert(session_id, arguments.get("ticker") or "", arguments.get("price"),
+                        (arguments.get("direction") or "auto").lower())[1]
+
+def _alert_quotes(tickers: List[str]) -> Dict[str, Dict[str, Any]]:
+    # 통화쌍은 fx_quotes(달러 다리로 계산 — 환율 답변과 같은 값), 나머지는 get_quotes 일괄
+    # (스냅샷 대상은 메모리, 나머지는 단건 캐시/일괄 조회)
+    pairs = {t: p for t in tickers if t.upper().endswith("=X") and (p := fx.parse_pair(t))}
+    rest = [t for t in tickers if t not in pairs]
+    out = get_quotes(rest) if rest else {}
+    if pairs:
+        derived = fx_quotes(list(pairs.values()))
+        out.update({t: derived[fx.ticker(*p)] for t, p in pairs.items()})
+    return out
+
+def _poll_alerts():
+    # 알림이 걸린 전체 티커 시세 → 평가
+    tickers = ALERTS.tickers()
+    if tickers:
+        ALERTS.evaluate(_alert_quotes(tickers))
+
+ALERT_HUB = AlertHub(
+    ALERTS, render=_alert_event,
+    max_clients=ALERT_STREAM_MAX_CLIENTS, queue_size=ALERT_STREAM_QUEUE, ping_secs=MARKET_STREAM_PING_SECS,
+)
+
+@app.get("/api/alerts")
+def api_alerts(session_id: str = "default"):
+    return {"session_id": session_id, "alerts": ALERTS.list(session_id)}
+
+@app.post("/api/alerts")
+def api_alerts_create(payload: dict = Body(...)):
+    # {session_id, ticker, price, direction(above/below/auto)}
+    sid = payload.get("session_id") or "default"
+    alert, message = create_alert(sid, payload.get("ticker") or "", payload.get("price"),
+                                  (payload.get("direction") or "auto").lower())
+    if alert is None:
+        return JSONResponse({"status": "error", "message": message}, status_code=400)
+    return {"status": "ok", "alert": alert, "message": message}
+
+@app.delete("/api/alerts/{alert_id}")
+def api_alerts_cancel(alert_id: int, session_id: str = "default"):
+    if not ALERTS.cancel(session_id, alert_id):
+        return JSONResponse({"status": "error", "message": "알림을 찾을 수 없습니다."}, status_code=404)
+    return {"status": "ok", "alert_id": alert_id}
+
+# 폴링: after(마지막으로 받은 event_id) 이후 발동분
+@app.get("/api/alerts/events")
+def api_alerts_events(session_id: str = "default", after: int = 0):
+    events = [_alert_event(e) for e in ALERTS.events(session_id, after)]
+    return {"session_id": session_id, "events": events, "last_event_id": events[-1]["event_id"] if events else after}
+
+# 스트림: 연결 시 after 이후 밀린 이벤트 → 이후 발동 즉시 alert 이벤트
+@app.get("/api/alerts/stream")
+async def api_alerts_stream(session_id: str = "default", after: int = 0):
+    return ALERT_HUB.response(ALERT_HUB.stream, session_id, after)
 
 # =========================
 # S T T (CLOVA + ffmpeg)
@@ -754,7 +2687,7 @@ def _ffmpeg_to_wav16k(in_path: str) -> str:
 # API 키/엔드포인트/언어 매핑
 CLOVA_KEY_ID = os.getenv("CLOVA_KEY_ID", "")
 CLOVA_KEY = os.getenv("CLOVA_KEY", "")
-CSR_URL = "https://naveropenapi.apigw.ntruss.com/recog/v1/stt"
+CSR_URL = os.getenv("CSR_URL", "https://naveropenapi.apigw.ntruss.com/recog/v1/stt")
 LANG_MAP = {"ko": "Kor", "en": "Eng", "ja": "Jpn"}
 
 def normalize_lang(l: str) -> str:
@@ -777,7 +2710,7 @@ async def stt_clova(audio_file: UploadFile = File(...), lang: str = Query("Kor")
         src_path = tmp.name
     wav_path = None
     try:
-        wav_path = _ffmpeg_to_wav16k(src_path)
+        wav_path = await asyncio.to_thread(_ffmpeg_to_wav16k, src_path)
         headers = {
             "X-NCP-APIGW-API-KEY-ID": CLOVA_KEY_ID,
             "X-NCP-APIGW-API-KEY": CLOVA_KEY,
@@ -785,12 +2718,15 @@ async def stt_clova(audio_file: UploadFile = File(...), lang: str = Query("Kor")
         }
         url = f"{CSR_URL}?lang={lang}"
         with open(wav_path, "rb") as f:
-            res = requests.post(url, headers=headers, data=f.read(), timeout=60)
-        if res.status_code != 200:
-            return JSONResponse(
-                {"error": f"CSR 실패: {res.status_code} {res.text}"}, status_code=500
-            )
+            audio = f.read()
+        with upstream("clova"):
+            res = await asyncio.to_thread(requests.post, url, headers=headers, data=audio, timeout=60)
+            res.raise_for_status()
         return {"text": res.text.strip(), "lang": lang}
+    except requests.HTTPError as e:
+        return JSONResponse(
+            {"error": f"CSR 실패: {e.response.status_code} {e.response.text}"}, status_code=500
+        )
     except Exception as e:
         log.exception("STT 처리 오류")
         return JSONResponse({"error": str(e)}, status_code=500)
@@ -872,9 +2808,10 @@ def tts_google_post(payload: dict = Body(...)):
             )
             media_type, ext = "audio/wav", "wav"
 
-        resp = tts_client.synthesize_speech(
-            input=synthesis_input, voice=voice_params, audio_config=audio_cfg
-        )
+        with upstream("gtts"):
+            resp = tts_client.synthesize_speech(
+                input=synthesis_input, voice=voice_params, audio_config=audio_cfg
+            )
         headers = {
             "Content-Type": media_type,
             "Cache-Control": "no-cache",
@@ -890,12 +2827,109 @@ def tts_google_post(payload: dict = Body(...)):
 # =========================
 
 # ===== 세션 리셋 =====
-# 인메모리 세션 전체 초기화
+# 요청한 세션만 초기화 (session_id: body 또는 쿼리, 없으면 /chat과 같은 "default")
 @app.post("/reset")
 @app.post("/api/reset")
-async def reset():
-    SESSIONS.clear()  # 세션 딕셔너리 전부 초기화
-    return {"status": "ok", "message": "대화 기록 초기화 완료"}
+async def reset(session_id: Optional[str] = None, payload: Optional[dict] = Body(default=None)):
+    sid = (payload or {}).get("session_id") or session_id or "default"
+    SESSIONS.reset(sid)
+    return {"status": "ok", "message": "대화 기록 초기화 완료", "session_id": sid}
+
+# ===== 세션 관리 =====
+# 세션 수/메모리/축출 통계, 전체 초기화(운영용)
+@app.get("/admin/sessions", dependencies=[Depends(require_admin)])
+def admin_sessions():
+    return SESSIONS.stats()
+
+@app.post("/admin/sessions/clear", dependencies=[Depends(require_admin)])
+def admin_sessions_clear():
+    return {"status": "ok", "removed": SESSIONS.clear()}
+
+# ===== 도구 캐시 관리 =====
+# 적중률/크기 조회, 도구별 또는 전체 비우기
+@app.get("/admin/cache", dependencies=[Depends(require_admin)])
+def admin_cache_stats():
+    return {
+        "tool_cache": TOOL_CACHE.stats(),
+        "tool_pool": TOOL_POOL.stats(),
+        "singleflight": {"upstream": FLIGHT.stats(), "docs": ASYNC_FLIGHT.stats(), "chat": CHAT_FLIGHT.stats()},
+    }
+
+@app.post("/admin/cache/purge", dependencies=[Depends(require_admin)])
+def admin_cache_purge(payload: dict = Body(default={})):
+    tool = (payload or {}).get("tool")
+    removed = TOOL_CACHE.purge((lambda k: k[0] == tool) if tool else None)
+    return {"status": "ok", "removed": removed}
+
+# ===== 응답 경로 통계 =====
+# 짧은 경로(router_direct/model_direct) 비율과 경로별 지연 분포
+@app.get("/admin/chat/paths", dependencies=[Depends(require_admin)])
+def admin_chat_paths():
+    return PATH_STATS.snapshot()
+
+# ===== 시장 스냅샷 상태 =====
+# 버전/경과시간/갱신 통계, 즉시 갱신(운영용)
+@app.get("/admin/market", dependencies=[Depends(require_admin)])
+def admin_market():
+    return {**MARKET.stats(), "stream": MARKET_HUB.stats(), "single_quote": QUOTE_STATS.stats(),
+            "ticker_index": TICKERS.stats(), "ts_store": TS_STORE.stats(),
+            "history_cache": HISTORY_CACHE.stats(), "technicals_cache": TECH_CACHE.stats(), "movers": MOVERS.stats()}
+
+# ===== 가격 알림 상태 =====
+# 등록 수/발동 수 + 스냅샷 1회 평가 비용(µs), 스트림 구독자
+@app.get("/admin/alerts", dependencies=[Depends(require_admin)])
+def admin_alerts():
+    return {**ALERTS.stats(), "stream": ALERT_HUB.stats()}
+
+@app.post("/admin/market/refresh", dependencies=[Depends(require_admin)])
+def admin_market_refresh():
+    ok = MARKET.refresh(force=True)
+    return {"status": "ok" if ok else "error", **MARKET.stats()}
+
+# ===== Prometheus 메트릭 =====
+# 캐시/세션/병합 통계는 스크레이프 시점에 콜백으로 수집 (누적값은 counter_fn → *_total)
+REGISTRY.gauge_fn("tool_cache_hit_ratio", "Tool result cache hit ratio", lambda: TOOL_CACHE.stats()["hit_ratio"])
+REGISTRY.gauge_fn("tool_cache_entries", "Tool result cache entries", lambda: TOOL_CACHE.stats()["size"])
+REGISTRY.counter_fn(
+    "tool_cache_events_total", "Tool result cache hits/misses/evictions",
+    lambda: {(k,): v for k, v in TOOL_CACHE.stats().items() if k in ("hits", "misses", "expired", "evictions")},
+    ("event",),
+)
+REGISTRY.gauge_fn("tool_pool_size", "Tool thread pool size", lambda: TOOL_POOL.size)
+REGISTRY.gauge_fn(
+    "tool_pool_tasks", "Tool calls running in / waiting for the tool thread pool",
+    lambda: {(k,): v for k, v in TOOL_POOL.stats().items() if k in ("running", "queued")},
+    ("state",),
+)
+REGISTRY.gauge_fn("market_snapshot_age_seconds", "Age of the market snapshot", lambda: min(MARKET.age(), 1e9))
+REGISTRY.gauge_fn("market_snapshot_version", "Market snapshot version", lambda: MARKET.version)
+REGISTRY.gauge_fn("market_stream_clients", "Connected market stream subscribers", MARKET_HUB.clients)
+REGISTRY.counter_fn("market_stream_overflows_total", "Subscriber queue overflows", lambda: MARKET_HUB.overflows)
+REGISTRY.gauge_fn("alerts_active", "Registered price alerts", lambda: ALERTS.stats()["active"])
+REGISTRY.counter_fn("alerts_fired_total", "Fired price alerts", lambda: ALERTS.fired_total)
+REGISTRY.gauge_fn("alert_eval_last_tick_seconds", "Alert evaluation cost of the last snapshot tick", lambda: ALERTS.last_tick_s)
+REGISTRY.gauge_fn("sessions_live", "Live chat sessions", lambda: SESSIONS.stats()["sessions"])
+REGISTRY.gauge_fn("sessions_bytes", "Approximate session memory", lambda: SESSIONS.stats()["bytes"])
+REGISTRY.counter_fn(
+    "singleflight_shared_total", "Calls served by an in-flight leader",
+    lambda: {("upstream",): FLIGHT.shared, ("docs",): ASYNC_FLIGHT.shared, ("chat",): CHAT_FLIGHT.shared},
+    ("group",),
+)
+
+@app.middleware("http")
+async def _observe_http(request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_SECONDS.observe(
+        time.perf_counter() - t0,
+        route=getattr(route, "path", "unmatched"), method=request.method, status=str(response.status_code),
+    )
+    return response
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 # ===== 헬스체크 =====
 # 간단 상태/서버시각(KST) 반환
@@ -922,6 +2956,14 @@ def _start_scheduler():
     except Exception as e:
         log.exception("인덱스 생성 실패")
 
+    # 로컬 시계열 저장소로 시장 스냅샷 선채움 (첫 갱신 전에도 즉시 응답)
+    try:
+        n = MARKET.seed(_quotes_from_store(MARKET.tickers))
+        if n:
+            log.info(f"시장 스냅샷 선채움: {n}/{len(MARKET.tickers)} (저장소 {TS_STORE_DIR})")
+    except Exception:
+        log.exception("시장 스냅샷 선채움 실패")
+
     # 스케줄러 시작
     try:
         scheduler.add_job(
@@ -933,6 +2975,62 @@ def _start_scheduler():
             coalesce=True,
             misfire_grace_time=60,
         )
+        # 시장 스냅샷 갱신 (시작 직후 1회 + 주기)
+        scheduler.add_job(
+            MARKET.refresh,
+            "interval",
+            seconds=MARKET_SNAPSHOT_INTERVAL,
+            id="market_snapshot",
+            next_run_time=datetime.now(KST),
+            max_instances=1,
+            coalesce=True,
+        )
+        # 유니버스 상승/하락 상위 (시장 스냅샷 첫 갱신 뒤 시작)
+        scheduler.add_job(
+            MOVERS.refresh,
+            "interval",
+            seconds=MOVERS_INTERVAL,
+            id="market_movers",
+            next_run_time=datetime.now(KST) + timedelta(seconds=5),
+            max_instances=1,
+            coalesce=True,
+        )
+        # 스냅샷 밖 티커(개별 종목 등) 가격 알림 평가
+        scheduler.add_job(
+            _poll_alerts,
+            "interval",
+            seconds=ALERTS_POLL_INTERVAL,
+            id="price_alerts",
+            max_instances=1,
+            coalesce=True,
+        )
+        # 가격 알림 저널 압축 (변경이 있었을 때만)
+        scheduler.add_job(
+            ALERTS.compact,
+            "interval",
+            seconds=ALERTS_COMPACT_INTERVAL,
+            id="price_alerts_compact",
+            max_instances=1,
+            coalesce=True,
+        )
+        # 시계열 meta 미기록분 기록 (추가가 멈춘 시계열도 마지막 행 수가 남도록)
+        scheduler.add_job(
+            TS_STORE.flush,
+            "interval",
+            seconds=30,
+            id="ts_store_flush",
+            max_instances=1,
+            coalesce=True,
+        )
+        # 유휴 세션 정리 (쓰기 없는 시간대에도 메모리 회수)
+        scheduler.add_job(
+            SESSIONS.sweep,
+            "interval",
+            minutes=5,
+            id="session_sweep",
+            max_instances=1,
+            coalesce=True,
+        )
         scheduler.start()
         log.info("APScheduler started.")
     except Exception:
@@ -944,4 +3042,6 @@ def _stop_scheduler():
         scheduler.shutdown()
         log.info("APScheduler stopped.")
     except Exception:
-        log.exception("APScheduler 종료 실패")
\ No newline at end of file
+        log.exception("APScheduler 종료 실패")
+    ALERTS.compact()   # 종료 시 저널을 스냅샷으로 합침
+    TS_STORE.flush()   # 미기록 시계열 meta
\ No newline at end of file
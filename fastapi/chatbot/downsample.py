@@ -0,0 +1,71 @@
+# downsample.py — 차트용 시계열 다운샘플링 (NumPy, 외부 의존성 없음)
+# lttb: 모양 보존(Largest-Triangle-Three-Buckets) 인덱스 선택 / minmax: 버킷별 최저·최고점 / ohlc: 버킷별 시가·고가·저가·종가
+# 사용: from downsample import lttb, minmax, ohlc → idx = lttb(t, close, 200); t[idx], close[idx]
+
+from typing import Dict
+
+import numpy as np
+
+# ===== 버킷 분할 =====
+# 길이 n을 b개 버킷으로: 패딩 후 (b, size) 모양으로 reshape → 버킷 연산을 축 하나로 벡터화
+def _buckets(y: np.ndarray, b: int, size: int = 0):
+    size = size or -(-len(y) // b)
+    pad = np.full(b * size, np.nan)
+    pad[:len(y)] = y
+    return pad.reshape(b, size), size
+
+# ===== LTTB =====
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    # 첫/끝 점 고정 + 가운데 n-2개 버킷마다 (직전 선택점, 다음 버킷 평균)과 이루는 삼각형 넓이가 최대인 점
+    # 선택이 직전 선택점에 의존 → 버킷 단위 루프, 버킷 안 넓이 계산은 벡터
+    size = len(y)
+    if n >= size or n < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)   # 가운데 구간 [1, size-1)을 n-2개로
+    # 다음 버킷 평균은 선택과 무관 → 누적합으로 한 번에
+    cx, cy = np.concatenate(([0.0], np.cumsum(x))), np.concatenate(([0.0], np.cumsum(y)))
+    nxt_lo, nxt_hi = edges[1:], np.append(edges[2:], size)   # 마지막 가운데 버킷의 다음 = 끝 점
+    cnt = np.maximum(nxt_hi - nxt_lo, 1)
+    avg_x = (cx[nxt_hi] - cx[nxt_lo]) / cnt
+    avg_y = (cy[nxt_hi] - cy[nxt_lo]) / cnt
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i]) * (by - y[a]) - (x[a] - bx) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+# ===== min/max =====
+def minmax(y: np.ndarray, n: int) -> np.ndarray:
+    # n/2개 버킷마다 최저·최고점 인덱스(시간 순) — 급등락 스파이크를 놓치지 않음
+    size = len(y)
+    b = n // 2
+    if n >= size or b < 1:
+        return np.arange(size)
+    grid, width = _buckets(np.asarray(y, dtype=float), b)
+    valid = ~np.all(np.isnan(grid), axis=1)
+    grid = grid[valid]
+    base = np.flatnonzero(valid) * width
+    lo = base + np.nanargmin(grid, axis=1)
+    hi = base + np.nanargmax(grid, axis=1)
+    return np.unique(np.concatenate((lo, hi)))   # 정렬 + 같은 점(평평한 버킷) 중복 제거
+
+# ===== OHLC =====
+def ohlc(t: np.ndarray, o: np.ndarray, h: np.ndarray, l: np.ndarray, c: np.ndarray, n: int) -> Dict[str, np.ndarray]:
+    # n개 버킷으로 재집계: 시각/시가 = 버킷 첫 봉, 고가 = 최대, 저가 = 최소, 종가 = 마지막 봉
+    size = len(c)
+    if n >= size or n < 1:
+        return {"t": t, "open": o, "high": h, "low": l, "close": c}
+    width = -(-size // n)
+    b = -(-size // width)                       # 빈 버킷이 생기지 않는 버킷 수
+    first = np.arange(b) * width
+    last = np.minimum(first + width, size) - 1
+    H, _ = _buckets(np.asarray(h, dtype=float), b, width)
+    L, _ = _buckets(np.asarray(l, dtype=float), b, width)
+    return {"t": t[first], "open": o[first], "high": np.nanmax(H, axis=1), "low": np.nanmin(L, axis=1), "close": c[last]}
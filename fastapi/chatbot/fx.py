@@ -0,0 +1,166 @@
+# fx.py — 달러 기준 환율 몇 개로 모든 통화쌍(크로스)을 계산 (네트워크 없음)
+# 통화마다 USD 대비 야후 티커 하나(USDKRW=X, EURUSD=X …)만 조회 → 통화당 "1달러 = x 단위"로 환산 → A/B = x[B] / x[A]
+# 같은 스냅샷의 다리(leg)만 쓰므로 어떤 쌍이든 같은 시점 기준 (기준시각 = 두 다리 중 이른 쪽)
+# 사용: import fx → fx.parse_pair("파운드/원") → ("GBP", "KRW") / fx.cross(quotes, "GBP", "KRW") → 시세 dict (quotes: 다리 티커 → 시세)
+
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+BASE = "USD"
+
+# ===== 통화 정의 =====
+# 코드 → (USD 다리 티커, 티커가 "1단위 = x달러" 표기인지, 한글명, 별칭)
+CURRENCIES: Dict[str, tuple] = {
+    "USD": (None, False, "달러", ("미달러", "미국달러", "달러", "dollar")),
+    "KRW": ("USDKRW=X", False, "원", ("원화", "원")),
+    "JPY": ("USDJPY=X", False, "엔", ("엔화", "엔", "yen")),
+    "CNY": ("USDCNY=X", False, "위안", ("위안화", "위안", "인민폐")),
+    "EUR": ("EURUSD=X", True, "유로", ("유로화", "유로", "euro")),
+    "GBP": ("GBPUSD=X", True, "파운드", ("파운드화", "파운드", "영국파운드")),
+    "AUD": ("AUDUSD=X", True, "호주달러", ("호주달러", "호주 달러")),
+    "NZD": ("NZDUSD=X", True, "뉴질랜드달러", ("뉴질랜드달러", "뉴질랜드 달러")),
+    "CAD": ("USDCAD=X", False, "캐나다달러", ("캐나다달러", "캐나다 달러")),
+    "CHF": ("USDCHF=X", False, "스위스프랑", ("스위스프랑", "스위스 프랑", "프랑")),
+    "HKD": ("USDHKD=X", False, "홍콩달러", ("홍콩달러", "홍콩 달러")),
+    "SGD": ("USDSGD=X", False, "싱가포르달러", ("싱가포르달러", "싱가포르 달러", "싱달러")),
+    "TWD": ("USDTWD=X", False, "대만달러", ("대만달러", "대만 달러")),
+    "INR": ("USDINR=X", False, "루피", ("인도루피", "루피")),
+    "THB": ("USDTHB=X", False, "바트", ("태국바트", "바트")),
+    "VND": ("USDVND=X", False, "동", ("베트남동",)),
+}
+
+# 통화쌍 표기 관례: 우선순위가 높은 통화가 앞(기준 통화), 원화는 항상 뒤 (EUR/USD, USD/JPY, GBP/KRW)
+_PRIORITY = ["EUR", "GBP", "AUD", "NZD", "USD", "CAD", "CHF", "CNY", "HKD", "SGD", "TWD", "JPY", "INR", "THB", "VND", "KRW"]
+
+def leg(code: str) -> Optional[str]:
+    # 통화의 USD 다리 티커 (USD는 None)
+    return CURRENCIES[code][0]
+
+def legs(codes) -> List[str]:
+    return list(dict.fromkeys(t for c in codes if (t := leg(c))))
+
+def ticker(base: str, quote: str) -> str:
+    # 야후 표기 통화쌍 티커 (스냅샷/캐시 키로 사용)
+    return f"{base}{quote}=X"
+
+def name(base: str, quote: str) -> str:
+    return f"{CURRENCIES[base][2]}/{CURRENCIES[quote][2]}"
+
+# ===== 통화쌍 해석 =====
+# "GBP_KRW" / "gbp/krw" / "GBPKRW=X" / "파운드/원" / "파운드 원화" / "파운드" (원화 기준)
+_ALIASES = sorted(((a.replace(" ", ""), c) for c, v in CURRENCIES.items() for a in v[3]), key=lambda x: -len(x[0]))
+_ALIAS_RX = re.compile("|".join(re.escape(a) for a, _ in _ALIASES))
+_ALIAS_CODE = dict(_ALIASES)
+_CODE_RX = re.compile(r"([A-Z]{3})[\s_/\-]?([A-Z]{3})(?:=X)?")
+
+def order(a: str, b: str) -> Tuple[str, str]:
+    # 관례 순서로 정렬된 (기준, 상대) 통화
+    return (a, b) if _PRIORITY.index(a) <= _PRIORITY.index(b) else (b, a)
+
+def currencies_in(text: str) -> List[str]:
+    # 문장 안 통화 언급 (등장 순서, 중복 제거)
+    return list(dict.fromkeys(_ALIAS_CODE[m] for m in _ALIAS_RX.findall(re.sub(r"\s+", "", text or ""))))
+
+def parse_pair(s: str) -> Optional[Tuple[str, str]]:
+    # 코드 표기는 적힌 순서 그대로, 한글 통칭은 관례 순서
+    raw = (s or "").strip()
+    m = _CODE_RX.fullmatch(raw.upper())
+    if m and m.group(1) in CURRENCIES and m.group(2) in CURRENCIES and m.group(1) != m.group(2):
+        return m.group(1), m.group(2)
+    return pair_of(currencies_in(raw))
+
+def pair_of(codes: List[str]) -> Optional[Tuple[str, str]]:
+    # 언급된 통화 → 관례 순서 쌍 (하나면 원화 대비, 원화뿐이면 달러/원, 셋 이상은 모호 → None)
+    if len(codes) == 1:
+        codes = ["USD", "KRW"] if codes[0] == "KRW" else [codes[0], "KRW"]
+    if len(codes) != 2:
+        return None
+    return order(*codes)
+
+# ===== 크로스 계산 =====
+def _units(quotes: Dict[str, dict], codes: List[str]) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+    # 통화별 1달러당 단위(현재/전일) — 다리 시세가 없으면 NaN
+    price = np.full(len(codes), np.nan)
+    prev = np.full(len(codes), np.nan)
+    ts: List[Optional[str]] = [None] * len(codes)
+    for i, c in enumerate(codes):
+        t = CURRENCIES[c][0]
+        if t is None:
+            price[i] = prev[i] = 1.0
+            continue
+        q = quotes.get(t) or {}
+        if q.get("price") is not None:
+            price[i] = q["price"]
+            prev[i] = q["prevClose"] if q.get("prevClose") else np.nan
+            ts[i] = q.get("ts_kst")
+    if any(CURRENCIES[c][1] for c in codes):
+        inv = np.array([CURRENCIES[c][1] for c in codes])
+        with np.errstate(divide="ignore"):
+            price = np.where(inv, 1.0 / price, price)
+            prev = np.where(inv, 1.0 / prev, prev)
+    return price, prev, ts
+
+def _round(v: float, digits: int = 6) -> Optional[float]:
+    # 유효숫자 기준 (엔/달러 0.006667 같은 작은 값도 자릿수 유지)
+    return None if not np.isfinite(v) else float(f"{v:.{digits}g}") + 0.0
+
+def derive(quotes: Dict[str, dict], pairs: List[Tuple[str, str]]) -> Dict[str, Dict[str, object]]:
+    # 여러 쌍을 한 번에: 필요한 통화만 환산한 뒤 나눗셈 한 번 (다리 티커 자체인 쌍은 조회 원본 그대로)
+    codes = list(dict.fromkeys(c for p in pairs for c in p))
+    idx = {c: i for i, c in enumerate(codes)}
+    price, prev, ts = _units(quotes, codes)
+    b = np.array([idx[p[0]] for p in pairs], dtype=np.int64)
+    q = np.array([idx[p[1]] for p in pairs], dtype=np.int64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate, prev_rate = price[q] / price[b], prev[q] / prev[b]
+        pct = (rate - prev_rate) / prev_rate * 100.0
+    out = {}
+    for i, (base, quote) in enumerate(pairs):
+        t = ticker(base, quote)
+        if t in (leg(base), leg(quote)) and (quotes.get(t) or {}).get("price") is not None:
+            out[t] = quotes[t]
+            continue
+        stamps = [s for s in (ts[b[i]], ts[q[i]]) if s]
+        out[t] = {
+            "ticker": t,
+            "price": _round(rate[i]),
+            "prevClose": _round(prev_rate[i]),
+            "change": _round(rate[i] - prev_rate[i]),
+            "changePct": None if not np.isfinite(pct[i]) else round(float(pct[i]), 2) + 0.0,   # -0.0 → 0.0
+            "ts_kst": min(stamps) if stamps else None,
+            "derived": True,
+        }
+    return out
+
+def cross(quotes: Dict[str, dict], base: str, quote: str) -> Dict[str, object]:
+    # 단일 쌍 (다리 시세가 없으면 price None)
+    return derive(quotes, [(base, quote)])[ticker(base, quote)]
+
+# ===== 엔진 =====
+# 고정 통화쌍 목록(스냅샷 대상) → 필요한 다리 티커 / 다리 시세로 전체 쌍 계산 + 통계
+class FxEngine:
+    def __init__(self, pairs: List[Tuple[str, str]], extra: Tuple[str, ...] = ()):
+        self.pairs = list(dict.fromkeys(pairs))
+        self.tickers = [ticker(*p) for p in self.pairs]                        # 계산으로 채우는 쌍 티커
+        self.legs = legs([c for p in self.pairs for c in p] + list(extra))    # 실제로 조회하는 티커
+        self.derivations = 0
+        self.last_duration = 0.0
+
+    def derive(self, quotes: Dict[str, dict]) -> Dict[str, Dict[str, object]]:
+        t0 = time.perf_counter()
+        out = derive(quotes, self.pairs)
+        self.derivations += 1
+        self.last_duration = time.perf_counter() - t0
+        return out
+
+    def stats(self) -> dict:
+        return {
+            "pairs": len(self.pairs),
+            "legs": len(self.legs),
+            "derived_only": len(set(self.tickers) - set(self.legs)),
+            "derivations": self.derivations,
+            "last_derive_ms": round(self.last_duration * 1000, 3),
+        }
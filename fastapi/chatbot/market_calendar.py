@@ -0,0 +1,174 @@
+# market_calendar.py — 거래소 세션/휴장일 캘린더 (시세 캐시 TTL, /api/markets 세션 상태)
+# 시장: KRX / US / EU(독일·유로존) / UK / JP / CN / HK 정규장 + FX(주말 휴장) + FUT(CME Globex)
+# 휴장일: 로컬 JSON 파일 {"KRX": ["2025-01-01", ...], ...} (MARKET_HOLIDAYS_FILE로 교체 가능)
+# 사용: from market_calendar import CALENDAR → CALENDAR.session("^KS11"), CALENDAR.quote_ttl("AAPL")
+
+import os
+import json
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+log = logging.getLogger("chatbot")
+
+KST = ZoneInfo("Asia/Seoul")
+
+# ===== 세션 정의 =====
+# 요일(월=0) → [(시작분, 종료분)] (거래소 현지시각, 종료 1440 = 자정)
+_WEEKDAYS = range(5)
+
+def _weekdays(*sessions: Tuple[int, int]) -> Dict[int, List[Tuple[int, int]]]:
+    return {d: list(sessions) for d in _WEEKDAYS}
+
+MARKETS: Dict[str, dict] = {
+    "KRX": {"tz": "Asia/Seoul",       "week": _weekdays((540, 930))},               # 09:00-15:30
+    "US":  {"tz": "America/New_York", "week": _weekdays((570, 960))},               # 09:30-16:00
+    "EU":  {"tz": "Europe/Berlin",    "week": _weekdays((540, 1050))},              # 09:00-17:30 (XETRA/Eurex)
+    "UK":  {"tz": "Europe/London",    "week": _weekdays((480, 990))},               # 08:00-16:30
+    "JP":  {"tz": "Asia/Tokyo",       "week": _weekdays((540, 690), (750, 930))},   # 09:00-11:30, 12:30-15:30
+    "CN":  {"tz": "Asia/Shanghai",    "week": _weekdays((570, 690), (780, 900))},   # 09:30-11:30, 13:00-15:00
+    "HK":  {"tz": "Asia/Hong_Kong",   "week": _weekdays((570, 720), (780, 960))},   # 09:30-12:00, 13:00-16:00
+    # FX: 일 17:00 ~ 금 17:00 (뉴욕) 연속
+    "FX":  {"tz": "America/New_York", "week": {6: [(1020, 1440)], 0: [(0, 1440)], 1: [(0, 1440)],
+                                               2: [(0, 1440)], 3: [(0, 1440)], 4: [(0, 1020)]}},
+    # CME Globex: 일 18:00 ~ 금 17:00 (뉴욕), 평일 17:00-18:00 정산 휴식
+    "FUT": {"tz": "America/New_York", "week": {6: [(1080, 1440)], 0: [(0, 1020), (1080, 1440)],
+                                               1: [(0, 1020), (1080, 1440)], 2: [(0, 1020), (1080, 1440)],
+                                               3: [(0, 1020), (1080, 1440)], 4: [(0, 1020)]}},
+}
+
+# ===== 티커 → 시장 =====
+_SYMBOL_MARKET = {
+    "^KS11": "KRX", "^KQ11": "KRX",
+    "^N225": "JP", "^TOPX": "JP",
+    "^HSI": "HK",
+    "^FTSE": "UK",
+    "^GDAXI": "EU", "^STOXX50E": "EU",
+}
+_SUFFIX_MARKET = (
+    (".KS", "KRX"), (".KQ", "KRX"), (".T", "JP"), (".SS", "CN"), (".SZ", "CN"),
+    (".HK", "HK"), (".L", "UK"), (".DE", "EU"), (".PA", "EU"), (".AS", "EU"),
+    ("=X", "FX"), ("=F", "FUT"),
+)
+
+def market_for(ticker: str) -> str:
+    t = (ticker or "").strip().upper()
+    if t in _SYMBOL_MARKET:
+        return _SYMBOL_MARKET[t]
+    for suffix, market in _SUFFIX_MARKET:
+        if t.endswith(suffix):
+            return market
+    return "US"   # 미국 지수(^DJI/^GSPC/^VIX/^TNX 등)와 미국 상장 종목
+
+# ===== 캘린더 =====
+class MarketCalendar:
+    # 세션 구간을 현지 날짜 단위로 펼쳐서(휴장일 제외) 현재 시각이 속한 구간/다음 개장/직전 마감을 찾음
+    SCAN_DAYS = 16   # 연휴 + 주말을 넘기기에 충분한 탐색 범위
+
+    def __init__(self, holidays: Optional[Dict[str, Set[date]]] = None,
+                 open_ttl: float = 15, grace_ttl: float = 60, close_grace: float = 600, closed_ttl_max: float = 6 * 3600):
+        self.holidays = holidays or {}
+        self.open_ttl = open_ttl               # 장중 시세 TTL
+        self.grace_ttl = grace_ttl             # 마감 직후(종가 확정 전) TTL
+        self.close_grace = close_grace         # 마감 후 grace 구간 길이(초)
+        self.closed_ttl_max = closed_ttl_max   # 휴장 중 TTL 상한 (휴장일 파일 누락 대비)
+        self._cache: Dict[Tuple[str, date], List[Tuple[datetime, datetime]]] = {}
+
+    @classmethod
+    def load(cls, path: str, **kw) -> "MarketCalendar":
+        holidays: Dict[str, Set[date]] = {}
+        try:
+            raw = json.loads(Path(path).read_text(encoding="utf-8"))
+            for market, days in raw.items():
+                if market.startswith("_"):
+                    continue
+                holidays[market.upper()] = {date.fromisoformat(d) for d in days}
+            log.info(f"휴장일 로드: {path} ({', '.join(f'{m} {len(d)}' for m, d in holidays.items())})")
+        except FileNotFoundError:
+            log.warning(f"휴장일 파일 없음: {path} (주말만 휴장 처리)")
+        except Exception:
+            log.exception(f"휴장일 파일 파싱 실패: {path}")
+        return cls(holidays, **kw)
+
+    def is_holiday(self, market: str, day: date) -> bool:
+        return day in self.holidays.get(market, ())
+
+    def _intervals(self, market: str, now: datetime) -> List[Tuple[datetime, datetime]]:
+        # 현지 날짜 기준 4일 전 ~ SCAN_DAYS일 뒤까지의 개장 구간 (자정을 잇는 구간은 병합)
+        # 구간 목록은 (시장, 현지 날짜)가 같으면 동일 → 캐시
+        tz = ZoneInfo(MARKETS[market]["tz"])
+        key = (market, now.astimezone(tz).date())
+        cached = self._cache.get(key)
+        if cached is None:
+            if len(self._cache) > 256:
+                self._cache.clear()
+            cached = self._cache[key] = self._build_intervals(market, tz, key[1])
+        return cached
+
+    def _build_intervals(self, market: str, tz: ZoneInfo, today: date) -> List[Tuple[datetime, datetime]]:
+        spec = MARKETS[market]
+        start = today - timedelta(days=4)
+        out: List[Tuple[datetime, datetime]] = []
+        for i in range(self.SCAN_DAYS + 4):
+            day = start + timedelta(days=i)
+            if self.is_holiday(market, day):
+                continue
+            midnight = datetime.combine(day, time(0), tzinfo=tz)
+            for a, b in spec["week"].get(day.weekday(), ()):
+                s, e = midnight + timedelta(minutes=a), midnight + timedelta(minutes=b)
+                if out and out[-1][1] == s:
+                    out[-1] = (out[-1][0], e)
+                else:
+                    out.append((s, e))
+        return out
+
+    def session(self, ticker_or_market: str, now: Optional[datetime] = None) -> dict:
+        # {"market", "state": open|break|closed, "next_open", "next_close", "last_close"} (datetime, UTC aware)
+        market = ticker_or_market if ticker_or_market in MARKETS else market_for(ticker_or_market)
+        now = now or datetime.now(timezone.utc)
+        last_close = next_open = next_close = None
+        state = "closed"
+        for s, e in self._intervals(market, now):
+            if e <= now:
+                last_close = e
+            elif s <= now:
+                state, next_close = "open", e
+            else:
+                next_open = s
+                break
+        if state == "closed" and last_close and next_open and last_close.date() == next_open.date():
+            state = "break"   # 점심 휴장 / 선물 정산 휴식
+        return {"market": market, "state": state, "next_open": next_open, "next_close": next_close, "last_close": last_close}
+
+    def quote_ttl(self, ticker: str, now: Optional[datetime] = None) -> float:
+        # 장중: open_ttl / 마감 직후: grace_ttl / 휴장: 다음 개장까지(상한 closed_ttl_max)
+        now = now or datetime.now(timezone.utc)
+        st = self.session(ticker, now)
+        if st["state"] == "open":
+            return self.open_ttl
+        if st["last_close"] and (now - st["last_close"]).total_seconds() < self.close_grace:
+            return self.grace_ttl
+        if st["next_open"] is None:
+            return self.closed_ttl_max
+        until_open = (st["next_open"] - now).total_seconds()
+        return max(self.open_ttl, min(until_open, self.closed_ttl_max))
+
+    def describe(self, ticker_or_market: str, now: Optional[datetime] = None) -> dict:
+        # JSON 응답용 (시각은 KST ISO)
+        st = self.session(ticker_or_market, now)
+        iso = lambda d: d.astimezone(KST).isoformat() if d else None
+        return {"market": st["market"], "state": st["state"],
+                "next_open": iso(st["next_open"]), "next_close": iso(st["next_close"])}
+
+# ===== 기본 인스턴스 =====
+# TTL/경계는 환경변수로 조정
+HOLIDAYS_FILE = os.getenv("MARKET_HOLIDAYS_FILE", str(Path(__file__).resolve().parent / "data" / "market_holidays.json"))
+CALENDAR = MarketCalendar.load(
+    HOLIDAYS_FILE,
+    open_ttl=float(os.getenv("QUOTE_TTL_OPEN", "15")),
+    grace_ttl=float(os.getenv("QUOTE_TTL_GRACE", "60")),
+    close_grace=float(os.getenv("QUOTE_CLOSE_GRACE", "600")),
+    closed_ttl_max=float(os.getenv("QUOTE_TTL_CLOSED_MAX", str(6 * 3600))),
+)
@@ -0,0 +1,161 @@
+# market_snapshot.py — 시장 스냅샷: 고정 티커 묶음 시세를 백그라운드에서 주기 갱신, 요청 경로는 메모리 dict만 읽음
+# stale-while-revalidate: TTL 지나면 기존 값 즉시 반환 + 백그라운드 갱신 1회 트리거 (요청 경로는 절대 조회하지 않음)
+# 티커별 만료는 ttl_for(티커) → 휴장 중인 시장은 다음 개장까지 다시 받지 않음 / 환율 크로스(derived)는 갱신마다 다리 시세로 재계산
+# 사용: from market_snapshot import MarketSnapshot → snap = MarketSnapshot(tickers, fetch=..., ttl_for=..., ttl=30, max_stale=600)
+#       snap.refresh() (스케줄러) / snap.quotes() · snap.get("^KS11") (요청 경로) / snap.add_listener(fn(version, got))
+
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from fx import FxEngine
+
+log = logging.getLogger("chatbot")
+KST = ZoneInfo("Asia/Seoul")
+
+class MarketSnapshot:
+    def __init__(self, tickers: List[str], fetch: Callable[[List[str]], Dict[str, Dict[str, Any]]],
+                 ttl_for: Callable[[str], float], ttl: float, max_stale: float,
+                 derived: Optional[FxEngine] = None, normalize: Callable[[str], str] = lambda t: t):
+        self.tickers = list(dict.fromkeys(tickers))
+        self.fetch, self.ttl_for, self.normalize = fetch, ttl_for, normalize   # 일괄 조회 / 티커별 만료(초) / 티커 표기 보정
+        self.derived = derived
+        self.ttl, self.max_stale = ttl, max_stale
+        self._quotes: Dict[str, Dict[str, Any]] = {}   # 갱신 시 통째로 교체 (읽기 중 변경 없음)
+        self._expires: Dict[str, float] = {}            # 티커별 만료 monotonic (ttl_for — 거래 캘린더)
+        self.version = 0
+        self.updated_at = 0.0                           # monotonic
+        self.as_of: Optional[str] = None                # KST ISO
+        self._index = {t.upper() for t in self.tickers + (derived.tickers if derived else [])}
+        self._refresh_lock = threading.Lock()
+        self._revalidating = False                      # _state_lock 안에서만 변경 (백그라운드 갱신 스레드 1개)
+        self._state_lock = threading.Lock()
+        self._listeners: List = []                      # fn(version, {티커: 시세}) — 새 버전마다 호출
+        self.refreshes = self.failures = self.fresh_hits = self.stale_hits = self.expired_hits = 0
+        self.closed_skips = self.last_due = 0
+        self.last_duration = 0.0
+
+    def age(self) -> float:
+        return time.monotonic() - self.updated_at if self.version else float("inf")
+
+    def refresh(self, if_older_than: float = 0.0, force: bool = False) -> bool:
+        # 만료된 티커만 일괄 조회 → 이전 값과 병합(이번에 비어 온 티커는 직전 값 유지) → 교체
+        # if_older_than: 락 대기 중 다른 스레드가 이미 갱신했으면 건너뜀 / force: 만료 무시 전체 조회
+        with self._refresh_lock:
+            if self.age() <= if_older_than:
+                return True
+            now = time.monotonic()
+            due = self.tickers if force else [t for t in self.tickers if self._expires.get(t, 0.0) <= now]
+            self.last_due = len(due)
+            if not due:
+                self.closed_skips += 1   # 전부 휴장 중 + 값 유효 → 조회 없이 신선도만 갱신(버전 유지)
+                self.updated_at = now
+                return True
+            t0 = time.perf_counter()
+            try:
+                fresh = self.fetch(due)
+            except Exception:
+                self.failures += 1
+                log.exception("시장 스냅샷 갱신 실패")
+                return False
+            finally:
+                self.last_duration = time.perf_counter() - t0
+            got = {t: q for t, q in fresh.items() if q.get("price") is not None}
+            if not got:
+                self.failures += 1   # 전부 비었으면 버전 유지(장애로 간주)
+                return False
+            for t in got:
+                self._expires[t] = now + self.ttl_for(t)
+            self._quotes = self._derive({**fresh, **self._quotes, **got}, got)   # 처음부터 비어 있던 티커도 키는 유지
+            self.version += 1
+            self.updated_at = time.monotonic()
+            self.as_of = datetime.now(KST).isoformat()
+            self.refreshes += 1
+            for fn in self._listeners:
+                try:
+                    fn(self.version, got)
+                except Exception:
+                    log.exception("시장 스냅샷 리스너 오류")
+            return True
+
+    def _derive(self, quotes: Dict[str, Dict[str, Any]], got: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        # 다리 시세로 크로스 재계산 후 병합 (리스너에 넘길 got에도 값이 있는 쌍 추가)
+        if self.derived is None:
+            return quotes
+        d = self.derived.derive(quotes)
+        got.update({t: q for t, q in d.items() if q.get("price") is not None})
+        return {**quotes, **d}
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+
+    def seed(self, quotes: Dict[str, Dict[str, Any]]) -> int:
+        # 재시작 직후 로컬 저장소 값으로 바로 응답 (stale로 표시 → 첫 요청/스케줄러가 곧바로 갱신)
+        got = {t: q for t, q in quotes.items() if q.get("price") is not None}
+        with self._refresh_lock:
+            if self.version or not got:
+                return 0
+            self._quotes = self._derive({**quotes, **got}, got)
+            self.version = 1
+            self.updated_at = time.monotonic() - self.ttl - 1
+            self.as_of = max(q["ts_kst"] for q in got.values())
+        return len(got)
+
+    def _revalidate(self):
+        try:
+            self.refresh(if_older_than=self.ttl)
+        finally:
+            with self._state_lock:
+                self._revalidating = False
+
+    def revalidate(self) -> bool:
+        # 백그라운드 갱신 1회 트리거 (이미 진행 중이면 무시) — 호출측은 기다리지 않음
+        with self._state_lock:
+            if self._revalidating:
+                return False
+            self._revalidating = True
+        threading.Thread(target=self._revalidate, name="market-revalidate", daemon=True).start()
+        return True
+
+    def quotes(self) -> Dict[str, Dict[str, Any]]:
+        # 전체 스냅샷 dict (읽기 전용으로 사용) — 오래됐어도 즉시 반환, 갱신은 백그라운드
+        age = self.age()
+        if age > self.ttl:
+            if age > self.max_stale:
+                self.expired_hits += 1
+            else:
+                self.stale_hits += 1
+            self.revalidate()
+        else:
+            self.fresh_hits += 1
+        return self._quotes
+
+    def get(self, ticker: str) -> Optional[Dict[str, Any]]:
+        # 스냅샷 대상 티커면 시세 dict, 아니면 None (호출측이 단건 조회로 대체)
+        t = self.normalize((ticker or "").strip()).upper()
+        if t not in self._index:
+            return None
+        q = self.quotes().get(t)
+        return q if q and q.get("price") is not None else None
+
+    def stats(self) -> dict:
+        age = self.age()
+        return {
+            "version": self.version,
+            "as_of": self.as_of,
+            "age_s": round(age, 3) if age != float("inf") else None,
+            "tickers": len(self.tickers),
+            "ttl_s": self.ttl,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "closed_skips": self.closed_skips,
+            "last_due": self.last_due,
+            "last_refresh_s": round(self.last_duration, 3),
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "expired_hits": self.expired_hits,
+            **({"fx": self.derived.stats()} if self.derived else {}),
+        }
@@ -0,0 +1,90 @@
+# market_stream.py — 시세 스트리밍(SSE) 허브: 스냅샷 새 버전 → 바뀐 시세만 delta로 → 구독 키 집합별 1회 직렬화 → 같은 집합 구독자끼리 프레임 공유
+# 구독자별 bounded 큐 / resync / 연결 종료 / 구독자 상한은 sse.SseHub 공통 처리
+# 사용: hub = MarketHub(MARKET, key_ticker={"KOSPI": "^KS11", ...}, describe=lambda keys: {시장: 세션}, max_clients=..., queue_size=..., ping_secs=...)
+#       → return hub.response(hub.stream, frozenset(keys))
+
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List
+
+from market_snapshot import MarketSnapshot
+from sse import SseHub, RESYNC, CLOSE, PING, frame
+
+QUOTE_FIELDS = ("price", "prevClose", "change", "changePct", "ts_kst")
+
+class MarketHub(SseHub):
+    def __init__(self, snapshot: MarketSnapshot, key_ticker: Dict[str, str],
+                 describe: Callable[[Iterable[str]], Dict[str, dict]], **kw):
+        super().__init__(**kw)
+        self.snapshot = snapshot
+        self.key_ticker = key_ticker                      # 구독 키 → 티커
+        self.ticker_keys: Dict[str, List[str]] = {}       # 티커 → 구독 키들 (같은 티커를 여러 키가 공유)
+        for k, t in key_ticker.items():
+            self.ticker_keys.setdefault(t, []).append(k)
+        self.describe = describe                          # 키 목록 → 시장별 세션 상태
+        self._last: Dict[str, tuple] = {}                 # 티커 → 마지막 발행 값 (변경 판정)
+        self.published = self.fanouts = self.frames_built = 0
+        snapshot.add_listener(self._on_update)
+
+    def _on_update(self, version: int, quotes: Dict[str, Dict[str, Any]]):
+        # 스냅샷 갱신 스레드에서 호출 → 이벤트 루프로 넘김 (첫 구독 전에는 발행 기준값만 기록)
+        if not self.publish(version, quotes):
+            for t, q in quotes.items():
+                self._last[t] = tuple(q.get(f) for f in QUOTE_FIELDS[:4])
+
+    def _fanout(self, version: int, quotes: Dict[str, Dict[str, Any]]):
+        delta = {}
+        for t, q in quotes.items():
+            cur = tuple(q.get(f) for f in QUOTE_FIELDS[:4])
+            if self._last.get(t) == cur:
+                continue
+            self._last[t] = cur
+            for k in self.ticker_keys.get(t, ()):
+                delta[k] = {f: q.get(f) for f in QUOTE_FIELDS}
+        if not delta:
+            return
+        self.published += 1
+        for keys, subs in list(self.subs.items()):
+            self.frames_built += 1
+            part = {k: v for k, v in delta.items() if k in keys}
+            if not part:
+                continue
+            fr = frame("delta", {"version": version, "as_of": self.snapshot.as_of, "quotes": part})
+            for sub in list(subs):
+                self.fanouts += 1
+                self.offer(sub, fr)
+
+    def snapshot_frame(self, keys: frozenset) -> str:
+        quotes = self.snapshot.quotes()
+        rows = {k: {f: (quotes.get(self.key_ticker[k]) or {}).get(f) for f in QUOTE_FIELDS} for k in keys}
+        return frame("snapshot", {"version": self.snapshot.version, "as_of": self.snapshot.as_of,
+                                  "markets": self.describe(keys), "quotes": rows})
+
+    async def stream(self, keys: frozenset):
+        with self.subscribe(keys) as sub:
+            # 스냅샷 읽기/프레임 구성은 스레드에서 (이벤트 루프 비차단)
+            yield await asyncio.to_thread(self.snapshot_frame, keys)
+            while True:
+                item = await self.next(sub)
+                if item is None:
+                    # keep-alive + 구독자만 있고 스케줄러가 없을 때도 stale 갱신 트리거
+                    await asyncio.to_thread(self.snapshot.quotes)
+                    yield PING
+                elif item is CLOSE:
+                    yield frame("error", {"message": "slow consumer"})
+                    break
+                elif item is RESYNC:
+                    yield await asyncio.to_thread(self.snapshot_frame, keys)
+                else:
+                    sub.delivered += 1
+                    yield item
+
+    def stats(self) -> dict:
+        return {
+            "clients": self.clients(),
+            "published": self.published,
+            "fanouts": self.fanouts,
+            "frames_built": self.frames_built,
+            "overflows": self.overflows,
+            "slow_closed": self.slow_closed,
+            "queued": self.queued(),
+        }
@@ -0,0 +1,149 @@
+# metrics.py — 경량 Prometheus 메트릭 (외부 의존성 없음)
+# Counter / Histogram(고정 버킷, 라벨 조합별 배열 사전 할당) / 콜백 Gauge·Counter + 텍스트 포맷 출력
+# 사용: from metrics import REGISTRY → REGISTRY.histogram(...).observe(v, stage="tools")
+
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# ===== 기본 버킷 =====
+# 초 단위: 5ms ~ 60s (OpenAI/ECOS 타임아웃 구간까지)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _fmt_labels(names: Iterable[str], values: Iterable, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt_num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+# ===== Counter =====
+# 단조 증가 값 (라벨 조합별)
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_num(v)}" for k, v in items]
+
+# ===== Histogram =====
+# 라벨 조합마다 [버킷 카운트 배열, 합계, 개수]를 한 번만 할당 → observe는 bisect + 정수 증가
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        idx = bisect_left(self.buckets, value)   # value ≤ buckets[idx] 인 첫 버킷 (없으면 +Inf 칸)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][idx] += 1
+            s[1] += value
+            s[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        out = []
+        for key, counts, total, n in items:
+            acc = 0
+            for le, c in zip(self.buckets + (float("inf"),), counts):
+                acc += c
+                le_label = 'le="' + _fmt_num(le) + '"'
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, le_label)} {acc}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_num(total)}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {n}")
+        return out
+
+# ===== 콜백 Gauge =====
+# 수집 시점에 fn() 호출: 숫자 하나 또는 {라벨값 튜플: 값}
+class CallbackGauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Callable, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.fn, self.labelnames = name, help, fn, tuple(labelnames)
+
+    def collect(self) -> List[str]:
+        val = self.fn()
+        if isinstance(val, dict):
+            return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_num(v)}" for k, v in val.items()]
+        return [f"{self.name} {_fmt_num(val)}"]
+
+# ===== 콜백 Counter =====
+# 다른 객체가 이미 세고 있는 누적값을 수집 시점에 읽어 counter 타입으로 노출 (이름은 *_total)
+class CallbackCounter(CallbackGauge):
+    kind = "counter"
+
+# ===== 레지스트리 =====
+# 메트릭 등록/조회 + Prometheus 텍스트 포맷(0.0.4) 렌더링
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def gauge_fn(self, name: str, help: str, fn: Callable, labelnames: Tuple[str, ...] = ()) -> CallbackGauge:
+        return self._register(CallbackGauge(name, help, fn, labelnames))
+
+    def counter_fn(self, name: str, help: str, fn: Callable, labelnames: Tuple[str, ...] = ()) -> CallbackCounter:
+        return self._register(CallbackCounter(name, help, fn, labelnames))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for m in metrics:
+            try:
+                samples = m.collect()
+            except Exception:
+                continue   # 콜백 하나 실패로 전체 스크레이프를 깨지 않음
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
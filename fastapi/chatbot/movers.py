@@ -0,0 +1,78 @@
+# movers.py — 유니버스(지수 구성 종목) 상승/하락/거래량 급증 상위 + 등락 종목 수 (NumPy, 네트워크 없음)
+# 유니버스 파일: CSV(symbol,name — name은 비워도 됨), 기본 data/universe/{KOSPI_LARGE,KOSDAQ_LARGE,US_LARGE}.csv
+# 상위 k개는 partition으로 고른 뒤 k개만 정렬 (유니버스 전체 정렬 없음)
+# 사용: from movers import load_universe, compute → compute(tickers, names, price, prev_close, volume, avg_volume, k=30)
+
+import csv
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+log = logging.getLogger("chatbot")
+
+# ===== 유니버스 =====
+def load_universe(path: str) -> List[Tuple[str, str]]:
+    # [(티커, 이름)] (파일 순서, 중복 제거) — 파일이 없으면 빈 목록
+    rows: Dict[str, str] = {}
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            for r in csv.DictReader(f):
+                sym = (r.get("symbol") or "").strip().upper()
+                if sym:
+                    rows.setdefault(sym, (r.get("name") or "").strip())
+    except FileNotFoundError:
+        log.warning(f"유니버스 파일 없음: {path}")
+    except Exception:
+        log.exception(f"유니버스 파싱 실패: {path}")
+    return list(rows.items())
+
+# ===== 순위 =====
+def top_k(values: np.ndarray, k: int) -> np.ndarray:
+    # 큰 값 순 상위 k개 인덱스 (NaN 제외) — partition O(n) + k개 정렬, 같은 값은 유니버스 순서
+    idx = np.flatnonzero(~np.isnan(values))
+    if not len(idx) or k <= 0:
+        return idx[:0]
+    v = values[idx]
+    if k < len(v):
+        kth = -np.partition(-v, k - 1)[k - 1]             # k번째로 큰 값 — 경계의 동점은 앞 종목부터 채움
+        above = np.flatnonzero(v > kth)
+        part = np.sort(np.concatenate((above, np.flatnonzero(v == kth)[:k - len(above)])))
+    else:
+        part = np.arange(len(v))
+    return idx[part[np.argsort(-v[part], kind="stable")]]
+
+def _round(v, nd: int = 2):
+    return None if v is None or not np.isfinite(v) else round(float(v), nd)
+
+# ===== 계산 =====
+def compute(tickers: List[str], names: List[str], price: np.ndarray, prev_close: np.ndarray,
+            volume: np.ndarray, avg_volume: np.ndarray, k: int = 30) -> Dict[str, object]:
+    # 입력은 유니버스 순서 배열 (없는 값 NaN) → 상승/하락/거래량 급증 상위 k + 등락 종목 수
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(prev_close > 0, (price / prev_close - 1.0) * 100.0, np.nan)
+        ratio = np.where(avg_volume > 0, volume / avg_volume, np.nan)
+    valid = ~np.isnan(pct)
+
+    def rows(idx: np.ndarray) -> List[dict]:
+        return [{"ticker": tickers[i], "name": names[i], "price": _round(price[i]), "changePct": _round(pct[i]),
+                 "volume": None if np.isnan(volume[i]) else int(volume[i]), "volumeRatio": _round(ratio[i])}
+                for i in idx]
+
+    up = np.where(pct > 0, pct, np.nan)       # 상승 상위는 오른 종목만, 하락 상위는 내린 종목만
+    down = np.where(pct < 0, -pct, np.nan)
+    adv, dec = int((pct > 0).sum()), int((pct < 0).sum())
+    return {
+        "universe_size": len(tickers),
+        "priced": int(valid.sum()),
+        "gainers": rows(top_k(up, k)),
+        "losers": rows(top_k(down, k)),
+        "volume": rows(top_k(ratio, k)),
+        "breadth": {
+            "advancers": adv,
+            "decliners": dec,
+            "unchanged": int(valid.sum()) - adv - dec,
+            "ad_ratio": round(adv / dec, 2) if dec else None,
+            "median_pct": _round(np.median(pct[valid])) if valid.any() else None,
+        },
+    }
@@ -0,0 +1,167 @@
+# sessions.py — 인메모리 대화 세션 저장소 (유휴 TTL + LRU 축출 + 전체 메모리 상한 + 롤링 요약 상태)
+# 세션: 최근 메시지(토큰 수 포함) + 창 밖으로 밀려난 대화의 요약 — 프롬프트에는 토큰 예산만큼의 최근 메시지 + 요약만
+# 사용: from sessions import SessionStore → store = SessionStore(20, 3600, 64 << 20, 20000); store.add_turn("sid", "user", "안녕")
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+_MSG_OVERHEAD = 64  # 메시지 dict/리스트 슬롯 대략치(바이트)
+
+def estimate_tokens(text: str) -> int:
+    # 토크나이저 없이 대략치: 비ASCII(한글 등) 1자≈1토큰, ASCII 4자≈1토큰, 메시지당 4토큰
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4 + 4
+
+class SessionStore:
+    # OrderedDict 순서 = 최근 사용 순(앞쪽이 가장 오래됨) → 유휴/LRU 축출 모두 앞에서부터 O(축출 수)
+    def __init__(self, max_turns: int, idle_ttl: int, max_bytes: int, max_sessions: int):
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.evicted_idle = self.evicted_lru = self.resets = 0
+
+    @staticmethod
+    def _msg_bytes(msg: Dict[str, str]) -> int:
+        return len(msg["content"].encode("utf-8")) + _MSG_OVERHEAD
+
+    def _drop(self, session_id: str):
+        sess = self._data.pop(session_id)
+        self.bytes -= sess["bytes"]
+
+    def _sweep_idle(self, now: float) -> int:
+        n = 0
+        while self._data:
+            sid, sess = next(iter(self._data.items()))
+            if now - sess["last"] < self.idle_ttl:
+                break
+            self._drop(sid)
+            n += 1
+        self.evicted_idle += n
+        return n
+
+    def _touch(self, session_id: str, now: float) -> Optional[Dict[str, Any]]:
+        sess = self._data.get(session_id)
+        if sess is None:
+            return None
+        if now - sess["last"] >= self.idle_ttl:
+            self._drop(session_id)
+            self.evicted_idle += 1
+            return None
+        sess["last"] = now
+        self._data.move_to_end(session_id)
+        return sess
+
+    def get(self, session_id: str) -> List[Dict[str, str]]:
+        # 히스토리 사본 반환 (없는 세션은 만들지 않음)
+        with self._lock:
+            sess = self._touch(session_id, time.monotonic())
+            return list(sess["turns"]) if sess else []
+
+    def get_context(self, session_id: str, token_budget: int) -> tuple:
+        # (요약, 예산 안에 드는 최근 메시지들, 창 밖 메시지 수)
+        with self._lock:
+            sess = self._touch(session_id, time.monotonic())
+            if sess is None:
+                return "", [], 0
+            turns, used, start = sess["turns"], 0, len(sess["turns"])
+            while start > 0 and used + turns[start - 1]["tokens"] <= token_budget:
+                start -= 1
+                used += turns[start]["tokens"]
+            return sess["summary"], list(turns[start:]), start
+
+    def begin_summary(self, session_id: str, min_overflow: int, token_budget: int) -> Optional[tuple]:
+        # 창 밖 메시지가 min_overflow 이상이고 요약 진행 중이 아니면 (이전 요약, 대상 메시지, 대상 끝 seq) 반환
+        summary, _, overflow = self.get_context(session_id, token_budget)
+        with self._lock:
+            sess = self._data.get(session_id)
+            if sess is None or sess["summarizing"] or overflow < min_overflow:
+                return None
+            sess["summarizing"] = True
+            return summary, list(sess["turns"][:overflow]), sess["base"] + overflow
+
+    def end_summary(self, session_id: str, upto_seq: Optional[int] = None, summary: Optional[str] = None):
+        # 요약 반영: seq < upto_seq 메시지를 히스토리에서 제거(이미 잘려나간 건 건너뜀)
+        with self._lock:
+            sess = self._data.get(session_id)
+            if sess is None:
+                return
+            sess["summarizing"] = False
+            if summary is None:
+                return
+            removed = 0
+            while sess["turns"] and sess["base"] < upto_seq:
+                removed += self._msg_bytes(sess["turns"].pop(0))
+                sess["base"] += 1
+            added = len(summary.encode("utf-8")) - len(sess["summary"].encode("utf-8")) - removed
+            sess["summary"] = summary
+            sess["bytes"] += added
+            self.bytes += added
+
+    def add_turn(self, session_id: str, role: str, content: str):
+        now = time.monotonic()
+        msg = {"role": role, "content": content, "tokens": estimate_tokens(content)}
+        with self._lock:
+            sess = self._data.get(session_id)
+            if sess is None:
+                sess = self._data[session_id] = {
+                    "turns": [], "base": 0, "summary": "", "summarizing": False,
+                    "bytes": len(session_id.encode("utf-8")), "last": now,
+                }
+                self.bytes += sess["bytes"]
+            sess["turns"].append(msg)
+            added = self._msg_bytes(msg)
+            # 길이 제한(최근 2*max_turns 메시지) — 요약이 밀렸을 때의 안전 상한
+            while len(sess["turns"]) > 2 * self.max_turns:
+                added -= self._msg_bytes(sess["turns"].pop(0))
+                sess["base"] += 1
+            sess["bytes"] += added
+            self.bytes += added
+            sess["last"] = now
+            self._data.move_to_end(session_id)
+
+            # 유휴 세션 정리 → 전체 상한 초과 시 가장 오래 안 쓴 세션부터 축출(현재 세션 제외)
+            self._sweep_idle(now)
+            while (self.bytes > self.max_bytes or len(self._data) > self.max_sessions) and len(self._data) > 1:
+                oldest = next(iter(self._data))
+                if oldest == session_id:
+                    break
+                self._drop(oldest)
+                self.evicted_lru += 1
+
+    def reset(self, session_id: str) -> bool:
+        with self._lock:
+            if session_id not in self._data:
+                return False
+            self._drop(session_id)
+            self.resets += 1
+            return True
+
+    def clear(self) -> int:
+        with self._lock:
+            n = len(self._data)
+            self._data.clear()
+            self.bytes = 0
+            return n
+
+    def sweep(self) -> int:
+        with self._lock:
+            return self._sweep_idle(time.monotonic())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "sessions": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_sessions": self.max_sessions,
+                "idle_ttl_s": self.idle_ttl,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru,
+                "resets": self.resets,
+            }
@@ -0,0 +1,62 @@
+# singleflight.py — 요청 병합: 같은 키로 동시에 들어온 호출은 첫 호출(leader)만 실행하고 나머지는 그 결과를 공유
+# 완료 즉시 키를 지우므로 캐시가 아니다(결과 보관은 TTL 캐시 담당)
+# 사용: from singleflight import SingleFlight → FLIGHT.do(key, fn, *args) / AsyncSingleFlight → await flight.do(key, lambda: coro())
+
+import asyncio
+import threading
+from typing import Any, Dict
+
+class SingleFlight:
+    # 스레드용: 같은 키의 후속 호출은 leader가 끝날 때까지 Event로 대기 후 결과(또는 예외)를 공유
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, Dict[str, Any]] = {}
+        self.leaders = self.shared = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = {"event": threading.Event(), "result": None, "error": None}
+                self.leaders += 1
+            else:
+                self.shared += 1
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+        try:
+            call["result"] = fn(*args, **kwargs)
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call["event"].set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._calls)}
+
+class AsyncSingleFlight:
+    # 코루틴용: leader 작업을 태스크로 띄우고 모두 shield로 대기(한 요청이 끊겨도 나머지는 계속)
+    def __init__(self):
+        self._tasks: Dict[Any, "asyncio.Task"] = {}
+        self.leaders = self.shared = 0
+
+    async def do(self, key, coro_fn):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(coro_fn())
+            task.add_done_callback(lambda _t, k=key: self._tasks.pop(k, None))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "shared": self.shared, "in_flight": len(self._tasks)}
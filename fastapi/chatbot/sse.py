@@ -0,0 +1,103 @@
+# sse.py — SSE(text/event-stream) 구독 허브 공통: 프레임 직렬화, 구독자 상한(503), 구독자별 bounded 큐 + overflow resync, keep-alive
+# 발행은 다른 스레드(스냅샷 갱신/알림 평가)에서 publish() → 이벤트 루프에서 하위 클래스의 _fanout(*args) 실행
+# 구독자 큐가 가득 차면 밀린 항목을 버리고 RESYNC 1건(현재 상태를 다시 보냄), 연속 max_resyncs 초과면 CLOSE(연결 종료, 0이면 안 끊음)
+# 사용: class MyHub(SseHub) → _fanout에서 self.offer(sub, item) / stream()에서 with self.subscribe(group) as sub: item = await self.next(sub)
+
+import json
+import asyncio
+import contextlib
+from typing import Any, Dict, Optional
+
+from fastapi.responses import JSONResponse, StreamingResponse
+
+RESYNC, CLOSE = object(), object()
+PING = ": ping\n\n"
+_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def frame(event: str, data: dict) -> str:
+    # text/event-stream 프레임 1개
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# ===== 구독자 =====
+class Subscriber:
+    __slots__ = ("queue", "resyncs", "max_resyncs", "delivered")
+
+    def __init__(self, queue_size: int, max_resyncs: int = 0):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.resyncs = 0                                  # 연속 overflow 횟수 (따라잡으면 0)
+        self.max_resyncs = max_resyncs
+        self.delivered = 0
+
+    def offer(self, item) -> bool:
+        # 큐가 차 있으면 밀린 항목 폐기 → resync 1건 (메모리 상한 = 큐 길이)
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.resyncs += 1
+            self.queue.put_nowait(CLOSE if self.max_resyncs and self.resyncs > self.max_resyncs else RESYNC)
+            return False
+
+# ===== 허브 =====
+class SseHub:
+    def __init__(self, max_clients: int, queue_size: int, ping_secs: float, max_resyncs: int = 0):
+        self.max_clients, self.queue_size = max_clients, queue_size
+        self.ping_secs, self.max_resyncs = ping_secs, max_resyncs
+        self.subs: Dict[Any, set] = {}                   # 그룹(구독 키 집합/세션 등) → 구독자 집합
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.overflows = self.slow_closed = 0
+
+    def clients(self) -> int:
+        return sum(len(s) for s in list(self.subs.values()))
+
+    def queued(self) -> int:
+        return sum(sub.queue.qsize() for s in list(self.subs.values()) for sub in list(s))
+
+    def publish(self, *args) -> bool:
+        # 발행 스레드 → 이벤트 루프 (첫 구독 전이면 루프가 없으므로 False — 호출측이 기준값만 기록)
+        if self.loop is None:
+            return False
+        self.loop.call_soon_threadsafe(self._fanout, *args)
+        return True
+
+    def _fanout(self, *args):
+        raise NotImplementedError
+
+    def offer(self, sub: Subscriber, item):
+        if not sub.offer(item):
+            self.overflows += 1
+
+    @contextlib.contextmanager
+    def subscribe(self, group):
+        # 스트림 제너레이터 안에서 사용 — 연결이 끊기면(제너레이터 종료) 구독 해제
+        self.loop = asyncio.get_running_loop()
+        sub = Subscriber(self.queue_size, self.max_resyncs)
+        self.subs.setdefault(group, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            subs = self.subs.get(group)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self.subs[group]
+
+    async def next(self, sub: Subscriber):
+        # 다음 항목 (ping 간격 동안 없으면 None → 호출측이 PING 전송) — 큐를 다 비운 상태면 연속 overflow 횟수 초기화
+        if sub.queue.empty():
+            sub.resyncs = 0
+        try:
+            item = await asyncio.wait_for(sub.queue.get(), timeout=self.ping_secs)
+        except asyncio.TimeoutError:
+            return None
+        if item is CLOSE:
+            self.slow_closed += 1
+        return item
+
+    def response(self, stream_fn, *args):
+        # 구독자 상한이면 503(Retry-After), 아니면 스트리밍 응답
+        if self.clients() >= self.max_clients:
+            return JSONResponse({"error": "구독자 수 초과"}, status_code=503, headers={"Retry-After": "30"})
+        return StreamingResponse(stream_fn(*args), media_type="text/event-stream", headers=_HEADERS)
@@ -0,0 +1,69 @@
+# technicals.py — 일봉 기반 기술적 지표 (NumPy/pandas 벡터 연산, 네트워크 없음)
+# 이동평균(누적합) / RSI(Wilder, ewm) / 실현 변동성(로그수익률 표준편차 × √252) / 고점 대비 낙폭 / 52주 범위 / 기간 수익률
+# 사용: from technicals import compute → compute(ts, high, low, close) → dict (값이 부족한 항목은 None)
+
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+SMA_WINDOWS = (5, 20, 60, 120, 200)
+VOL_WINDOWS = (20, 60)
+RETURN_WINDOWS = {"1w": 5, "1m": 21, "3m": 63, "1y": 252}
+RSI_PERIOD = 14
+YEAR = 252   # 거래일
+
+def _f(v) -> Optional[float]:
+    return None if v is None or not np.isfinite(v) else round(float(v), 4)
+
+def sma(close: np.ndarray, windows=SMA_WINDOWS) -> Dict[int, Optional[float]]:
+    # 마지막 시점의 n일 단순이동평균 (누적합 차분 한 번으로 전 구간)
+    cs = np.concatenate(([0.0], np.cumsum(close)))
+    return {n: _f((cs[-1] - cs[-1 - n]) / n) if len(close) >= n else None for n in windows}
+
+def rsi(close: np.ndarray, period: int = RSI_PERIOD) -> Optional[float]:
+    # Wilder 평활(alpha = 1/period) RSI
+    if len(close) <= period:
+        return None
+    diff = np.diff(close)
+    up = pd.Series(np.clip(diff, 0, None)).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
+    down = pd.Series(np.clip(-diff, 0, None)).ewm(alpha=1 / period, adjust=False).mean().iloc[-1]
+    if down == 0:
+        return 100.0
+    return _f(100 - 100 / (1 + up / down))
+
+def realized_vol(close: np.ndarray, windows=VOL_WINDOWS) -> Dict[int, Optional[float]]:
+    # 연율화 실현 변동성(%) — 최근 n개 로그수익률
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.diff(np.log(close))
+    return {n: _f(np.std(r[-n:], ddof=1) * np.sqrt(YEAR) * 100) if len(r) >= n else None for n in windows}
+
+def drawdown(close: np.ndarray) -> Dict[str, Optional[float]]:
+    # 1년 구간 고점 대비 현재 낙폭 / 최대 낙폭(%) — 누적 최대값으로 한 번에
+    c = close[-YEAR:]
+    peak = np.maximum.accumulate(c)
+    dd = c / peak - 1
+    return {"current": _f(dd[-1] * 100), "max_1y": _f(dd.min() * 100)}
+
+def compute(ts: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, object]:
+    # 입력: 시각 오름차순 일봉 (종가 결측 없음) — 고가/저가 결측은 종가로 대체
+    close = np.asarray(close, dtype=float)
+    if not len(close):
+        return {"bars": 0}
+    high = np.where(np.isnan(high), close, high)
+    low = np.where(np.isnan(low), close, low)
+    last = close[-1]
+    hi52, lo52 = float(np.max(high[-YEAR:])), float(np.min(low[-YEAR:]))
+    span = hi52 - lo52
+    returns = {k: _f((last / close[-1 - n] - 1) * 100) if len(close) > n else None for k, n in RETURN_WINDOWS.items()}
+    return {
+        "bars": int(len(close)),
+        "last_ts": int(ts[-1]),
+        "close": _f(last),
+        "sma": sma(close),
+        "rsi": rsi(close),
+        "vol": realized_vol(close),
+        "drawdown": drawdown(close),
+        "range_52w": {"high": _f(hi52), "low": _f(lo52), "position": _f((last - lo52) / span * 100) if span else None},
+        "returns": returns,
+    }
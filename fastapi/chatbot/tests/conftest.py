@@ -0,0 +1,31 @@
+# conftest.py — 테스트 공통: 모듈 경로 + 런타임 데이터 디렉터리를 임시 폴더로 (네트워크 없음)
+# 사용: cd fastapi/chatbot && python -m pytest -q tests
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="chatbot-test-"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+class FakeClock:
+    # time 모듈 대신 주입 — monotonic/time을 테스트가 직접 진행
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, secs: float):
+        self.now += secs
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+
+import pytest
+
+from alerts import AlertBook, AlertError, AlertHub
+
+def _q(price, ts="2026-01-02T10:00:00+09:00"):
+    return {"price": price, "ts_kst": ts}
+
+@pytest.fixture
+def book():
+    return AlertBook()
+
+def _add(book, direction, threshold, sid="s", ticker="T"):
+    return book.add(sid, ticker, ticker, direction, threshold)["id"]
+
+def test_above_fires_at_threshold_not_below(book):
+    a = _add(book, "above", 100)
+    assert book.evaluate({"T": _q(99.99)}) == []
+    fired = book.evaluate({"T": _q(100.0)})
+    assert [e["id"] for e in fired] == [a] and fired[0]["price"] == 100.0
+
+def test_below_fires_at_threshold_not_above(book):
+    a = _add(book, "below", 100)
+    assert book.evaluate({"T": _q(100.01)}) == []
+    assert [e["id"] for e in book.evaluate({"T": _q(100.0)})] == [a]
+
+def test_only_crossed_slice_fires(book):
+    ups = {t: _add(book, "above", t) for t in (90, 100, 110, 120)}
+    downs = {t: _add(book, "below", t) for t in (80, 90, 100, 110)}
+    fired = {e["id"] for e in book.evaluate({"T": _q(100)})}
+    assert fired == {ups[90], ups[100], downs[100], downs[110]}
+    assert {a["id"] for a in book.list("s")} == {ups[110], ups[120], downs[80], downs[90]}
+    # 발동한 알림은 다시 발동하지 않음, 남은 쪽만 이어서
+    fired = {e["id"] for e in book.evaluate({"T": _q(115)})}
+    assert fired == {ups[110]}
+    assert book.evaluate({"T": _q(115)}) == []
+
+def test_same_threshold_alerts_all_fire(book):
+    ids = [_add(book, "above", 100, sid=sid) for sid in ("a", "b", "a")]
+    assert sorted(e["id"] for e in book.evaluate({"T": _q(100)})) == ids
+
+def test_untracked_and_missing_prices_are_skipped(book):
+    _add(book, "above", 100)
+    assert book.evaluate({"OTHER": _q(1000), "T": _q(None)}) == []
+    assert book.evaluate({"T": None}) == []
+    assert book.stats()["last_checked_tickers"] == 1
+
+def test_events_outbox_after_and_session_isolation(book):
+    _add(book, "above", 1, sid="a")
+    _add(book, "above", 2, sid="b")
+    _add(book, "above", 3, sid="a")
+    events = book.evaluate({"T": _q(5)})
+    assert [e["event_id"] for e in events] == [1, 2, 3]
+    assert [e["event_id"] for e in book.events("a")] == [1, 3]
+    assert [e["event_id"] for e in book.events("a", after=1)] == [3]
+    assert book.events("a", after=3) == [] and book.events("c") == []
+
+def test_cancel_and_validation(book):
+    a = _add(book, "above", 100)
+    assert not book.cancel("other", a)
+    assert book.cancel("s", a)
+    assert book.evaluate({"T": _q(1000)}) == [] and book.tickers() == []
+    with pytest.raises(AlertError):
+        book.add("s", "T", "T", "sideways", 1)
+    with pytest.raises(AlertError):
+        book.add("s", "T", "T", "above", 0)
+    small = AlertBook(max_per_session=1)
+    _add(small, "above", 1)
+    with pytest.raises(AlertError):
+        _add(small, "above", 2)
+
+def test_journal_and_compaction_survive_restart(tmp_path):
+    path = str(tmp_path / "alerts.json")
+    book = AlertBook(path)
+    keep = _add(book, "below", 50)
+    gone = _add(book, "above", 150)
+    cancelled = _add(book, "above", 200)
+    book.cancel("s", cancelled)
+    book.evaluate({"T": _q(160)})
+    reloaded = AlertBook(path)                                  # 저널만으로 복원
+    assert [a["id"] for a in reloaded.list("s")] == [keep]
+    assert [e["id"] for e in reloaded.events("s")] == [gone]
+    assert book.compact() and book.stats()["journal_lines"] == 0
+    reloaded = AlertBook(path)                                  # 스냅샷으로 복원
+    assert [a["id"] for a in reloaded.list("s")] == [keep]
+    assert [e["id"] for e in reloaded.events("s")] == [gone]
+    assert _add(reloaded, "above", 1) > cancelled               # id는 재사용하지 않음
+
+def test_hub_streams_backlog_then_live_events(book):
+    _add(book, "above", 100)
+    _add(book, "above", 200)
+    book.evaluate({"T": _q(150)})
+    hub = AlertHub(book, render=lambda e: {"id": e["id"]}, max_clients=10, queue_size=4, ping_secs=5)
+
+    async def main():
+        stream = hub.stream("s", after=0)
+        first = await stream.__anext__()                         # 수신함 백로그
+        nxt = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        threading.Thread(target=book.evaluate, args=({"T": _q(250)},)).start()   # 평가 스레드에서 발동
+        second = await asyncio.wait_for(nxt, 5)
+        clients = hub.clients()
+        await stream.aclose()
+        return first, second, clients
+
+    first, second, clients = asyncio.run(main())
+    assert first == 'event: alert\ndata: {"id": 1}\n\n'
+    assert second == 'event: alert\ndata: {"id": 2}\n\n'
+    assert clients == 1 and hub.clients() == 0 and hub.stats()["delivered"] == 2
@@ -0,0 +1,60 @@
+import pytest
+
+import cache
+from cache import TTLCache, MISS
+
+@pytest.fixture
+def c(monkeypatch, clock):
+    monkeypatch.setattr(cache, "time", clock)
+    return TTLCache(maxsize=3)
+
+def test_get_returns_value_until_expiry(c, clock):
+    c.set("a", 1, ttl=10)
+    clock.advance(9.9)
+    assert c.get("a") == 1
+    clock.advance(0.1)
+    assert c.get("a") is MISS
+    assert c.stats()["expired"] == 1
+
+def test_none_is_cached_and_default_is_returned_on_miss(c):
+    c.set("a", None, ttl=10)
+    assert c.get("a") is None
+    assert c.get("b", "x") == "x"
+
+def test_non_positive_ttl_is_not_stored(c):
+    c.set("a", 1, ttl=0)
+    assert c.get("a") is MISS
+    assert c.stats()["size"] == 0
+
+def test_lru_evicts_least_recently_used(c):
+    for k in "abc":
+        c.set(k, k, ttl=10)
+    c.get("a")                 # a가 가장 최근 → b가 가장 오래됨
+    c.set("d", "d", ttl=10)
+    assert c.get("b") is MISS
+    assert [c.get(k) for k in "acd"] == ["a", "c", "d"]
+    assert c.stats()["evictions"] == 1
+
+def test_set_refreshes_recency_and_ttl(c, clock):
+    c.set("a", 1, ttl=5)
+    c.set("b", 2, ttl=10)
+    c.set("c", 3, ttl=10)
+    c.set("a", 9, ttl=10)      # 덮어쓰기 → 최근 사용 + 새 만료시각
+    c.set("d", 4, ttl=10)
+    assert c.get("b") is MISS
+    clock.advance(6)
+    assert c.get("a") == 9
+
+def test_purge_by_match(c):
+    for k in (("q", 1), ("q", 2), ("n", 1)):
+        c.set(k, 0, ttl=10)
+    assert c.purge(lambda k: k[0] == "q") == 2
+    assert c.stats()["size"] == 1
+    assert c.purge() == 1
+
+def test_hit_ratio(c):
+    c.set("a", 1, ttl=10)
+    for k in "aaxy":
+        c.get(k)
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["hit_ratio"]) == (2, 2, 0.5)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from downsample import lttb, minmax, ohlc
+
+@pytest.fixture
+def walk():
+    rng = np.random.default_rng(7)
+    y = np.cumsum(rng.normal(size=1001))
+    return np.arange(len(y), dtype=float), y
+
+@pytest.mark.parametrize("n", [3, 10, 200, 1000])
+def test_lttb_keeps_endpoints_and_one_point_per_bucket(walk, n):
+    x, y = walk
+    idx = lttb(x, y, n)
+    assert len(idx) == n
+    assert idx[0] == 0 and idx[-1] == len(y) - 1
+    assert np.all(np.diff(idx) > 0)
+    edges = np.linspace(1, len(y) - 1, n - 1).astype(np.int64)
+    assert np.array_equal(np.searchsorted(edges, idx[1:-1], "right") - 1, np.arange(n - 2))
+
+@pytest.mark.parametrize("n", [2, 1001, 5000])
+def test_lttb_returns_everything_when_not_reducing(walk, n):
+    x, y = walk
+    assert np.array_equal(lttb(x, y, n), np.arange(len(y)))
+
+def test_lttb_keeps_spike():
+    y = np.zeros(500)
+    y[321] = 100.0
+    assert 321 in lttb(np.arange(500.0), y, 20)
+
+@pytest.mark.parametrize("n", [2, 11, 100, 600])
+def test_minmax_bucket_count_and_extremes(walk, n):
+    _, y = walk
+    idx = minmax(y, n)
+    assert len(idx) <= 2 * (n // 2)
+    assert np.all(np.diff(idx) > 0)
+    assert np.argmin(y) in idx and np.argmax(y) in idx
+    # 버킷마다 최저·최고점이 모두 들어 있음
+    width = -(-len(y) // (n // 2))
+    for lo in range(0, len(y), width):
+        seg = y[lo:lo + width]
+        assert lo + np.argmin(seg) in idx and lo + np.argmax(seg) in idx
+
+def test_minmax_flat_and_passthrough():
+    assert minmax(np.ones(100), 10).tolist() == [0, 20, 40, 60, 80]   # n/2=5개 버킷, 평평하면 버킷당 1점
+    assert minmax(np.arange(5.0), 1).tolist() == [0, 1, 2, 3, 4]
+    assert minmax(np.arange(5.0), 5).tolist() == [0, 1, 2, 3, 4]
+
+@pytest.mark.parametrize("size,n", [(1000, 100), (1001, 100), (10, 3), (7, 7)])
+def test_ohlc_buckets(size, n):
+    rng = np.random.default_rng(size)
+    c = 100 + np.cumsum(rng.normal(size=size))
+    o, h, l = c - 0.1, c + rng.random(size), c - rng.random(size)
+    t = np.arange(size) * 60
+    out = ohlc(t, o, h, l, c, n)
+    b = len(out["t"])
+    assert b <= n and len(out["close"]) == b
+    assert out["t"][0] == t[0] and out["open"][0] == o[0] and out["close"][-1] == c[-1]
+    assert out["high"].max() == h.max() and out["low"].min() == l.min()
+    assert np.all(out["high"] >= out["low"])
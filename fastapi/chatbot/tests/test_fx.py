@@ -0,0 +1,77 @@
+import pytest
+
+import fx
+
+QUOTES = {
+    "USDKRW=X": {"ticker": "USDKRW=X", "price": 1400.0, "prevClose": 1380.0, "ts_kst": "2026-01-02T10:00:00+09:00"},
+    "USDJPY=X": {"ticker": "USDJPY=X", "price": 150.0, "prevClose": 150.0, "ts_kst": "2026-01-02T09:59:00+09:00"},
+    "EURUSD=X": {"ticker": "EURUSD=X", "price": 1.1, "prevClose": 1.0, "ts_kst": "2026-01-02T10:00:00+09:00"},
+    "GBPUSD=X": {"ticker": "GBPUSD=X", "price": 1.25, "prevClose": 1.25, "ts_kst": "2026-01-02T09:58:00+09:00"},
+}
+
+def test_leg_tickers_pass_through_unchanged():
+    out = fx.derive(QUOTES, [("USD", "KRW"), ("EUR", "USD")])
+    assert out["USDKRW=X"] is QUOTES["USDKRW=X"]
+    assert out["EURUSD=X"] is QUOTES["EURUSD=X"]
+
+def test_inverse_of_leg():
+    q = fx.cross(QUOTES, "KRW", "USD")
+    assert q["price"] == pytest.approx(1 / 1400.0)
+    assert q["prevClose"] == pytest.approx(1 / 1380.0)
+    assert q["derived"] is True
+    q = fx.cross(QUOTES, "USD", "EUR")                  # "1유로 = x달러" 표기 다리의 역수
+    assert q["price"] == pytest.approx(1 / 1.1, rel=1e-6)
+
+@pytest.mark.parametrize("base,quote,price,prev", [
+    ("EUR", "KRW", 1.1 * 1400.0, 1.0 * 1380.0),        # 곱: 역표기 다리 × 정표기 다리
+    ("GBP", "KRW", 1.25 * 1400.0, 1.25 * 1380.0),
+    ("JPY", "KRW", 1400.0 / 150.0, 1380.0 / 150.0),    # 나눗셈: 정표기 다리끼리
+    ("EUR", "GBP", 1.1 / 1.25, 1.0 / 1.25),            # 역표기 다리끼리
+    ("EUR", "JPY", 1.1 * 150.0, 1.0 * 150.0),
+])
+def test_cross_rates(base, quote, price, prev):
+    q = fx.cross(QUOTES, base, quote)
+    assert q["ticker"] == f"{base}{quote}=X"
+    assert q["price"] == pytest.approx(price, rel=1e-6)
+    assert q["prevClose"] == pytest.approx(prev, rel=1e-6)
+    assert q["change"] == pytest.approx(price - prev, rel=1e-5)
+    assert q["changePct"] == round((price - prev) / prev * 100, 2)
+
+def test_cross_and_inverse_multiply_to_one():
+    a, b = fx.cross(QUOTES, "GBP", "JPY"), fx.cross(QUOTES, "JPY", "GBP")
+    assert a["price"] * b["price"] == pytest.approx(1.0, rel=1e-5)
+
+def test_timestamp_is_older_leg():
+    assert fx.cross(QUOTES, "GBP", "JPY")["ts_kst"] == "2026-01-02T09:58:00+09:00"
+    assert fx.cross(QUOTES, "EUR", "KRW")["ts_kst"] == "2026-01-02T10:00:00+09:00"
+
+def test_missing_leg_gives_none():
+    q = fx.cross(QUOTES, "CHF", "KRW")
+    assert q["price"] is None and q["changePct"] is None and q["ts_kst"] == QUOTES["USDKRW=X"]["ts_kst"]
+    q = fx.cross({"USDKRW=X": {"price": 1400.0, "prevClose": None}}, "KRW", "USD")
+    assert q["price"] == pytest.approx(1 / 1400.0) and q["prevClose"] is None and q["changePct"] is None
+
+def test_unchanged_pair_has_zero_not_negative_zero():
+    q = fx.cross(QUOTES, "GBP", "JPY")
+    assert q["changePct"] == 0.0 and str(q["changePct"]) == "0.0"
+
+@pytest.mark.parametrize("text,pair", [
+    ("GBP_KRW", ("GBP", "KRW")),
+    ("krw/usd", ("KRW", "USD")),                        # 코드 표기는 적힌 순서
+    ("GBPKRW=X", ("GBP", "KRW")),
+    ("파운드/원", ("GBP", "KRW")),
+    ("원 엔", ("JPY", "KRW")),                          # 한글 통칭은 관례 순서
+    ("파운드", ("GBP", "KRW")),
+    ("원화", ("USD", "KRW")),
+    ("유로 달러 엔", None),
+    ("USDUSD", None),
+])
+def test_parse_pair(text, pair):
+    assert fx.parse_pair(text) == pair
+
+def test_engine_fetches_only_legs():
+    eng = fx.FxEngine([("USD", "KRW"), ("EUR", "KRW"), ("JPY", "KRW"), ("EUR", "USD")])
+    assert eng.legs == ["USDKRW=X", "EURUSD=X", "USDJPY=X"]
+    out = eng.derive(QUOTES)
+    assert set(out) == {"USDKRW=X", "EURKRW=X", "JPYKRW=X", "EURUSD=X"}
+    assert eng.stats()["derived_only"] == 2
@@ -0,0 +1,83 @@
+# 거래 캘린더: 시장별 세션 상태(open/break/closed)와 시세 TTL — 휴장일은 배포 파일(data/market_holidays.json) 기준
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+import market_calendar
+from market_calendar import MarketCalendar
+
+SEOUL, NY, TOKYO = ZoneInfo("Asia/Seoul"), ZoneInfo("America/New_York"), ZoneInfo("Asia/Tokyo")
+
+@pytest.fixture(scope="module")
+def cal():
+    return MarketCalendar.load(market_calendar.HOLIDAYS_FILE, open_ttl=15, grace_ttl=60, close_grace=600, closed_ttl_max=6 * 3600)
+
+def test_krx_weekday(cal):
+    now = datetime(2025, 11, 26, 10, 0, tzinfo=SEOUL)   # 수요일 장중
+    st = cal.session("^KS11", now)
+    assert (st["market"], st["state"]) == ("KRX", "open")
+    assert st["next_close"] == datetime(2025, 11, 26, 15, 30, tzinfo=SEOUL)
+    assert cal.quote_ttl("005930.KS", now) == 15
+
+    # 마감 직후 grace → 저녁에는 다음 개장까지(상한 6시간) → 개장 1시간 전
+    assert cal.quote_ttl("005930.KS", datetime(2025, 11, 26, 15, 35, tzinfo=SEOUL)) == 60
+    assert cal.quote_ttl("005930.KS", datetime(2025, 11, 26, 20, 0, tzinfo=SEOUL)) == 6 * 3600
+    assert cal.quote_ttl("005930.KS", datetime(2025, 11, 27, 8, 0, tzinfo=SEOUL)) == 3600
+
+def test_krx_weekend(cal):
+    now = datetime(2025, 11, 29, 12, 0, tzinfo=SEOUL)   # 토요일
+    st = cal.session("KRX", now)
+    assert st["state"] == "closed"
+    assert st["last_close"] == datetime(2025, 11, 28, 15, 30, tzinfo=SEOUL)
+    assert st["next_open"] == datetime(2025, 12, 1, 9, 0, tzinfo=SEOUL)
+    wide = MarketCalendar(cal.holidays, closed_ttl_max=7 * 86400)
+    assert wide.quote_ttl("^KS11", now) == (datetime(2025, 12, 1, 9, 0, tzinfo=SEOUL) - now).total_seconds()
+
+def test_us_thanksgiving(cal):
+    now = datetime(2025, 11, 27, 11, 0, tzinfo=NY)      # 추수감사절(목) 정규장 시간
+    st = cal.session("AAPL", now)
+    assert (st["market"], st["state"]) == ("US", "closed")
+    assert st["last_close"] == datetime(2025, 11, 26, 16, 0, tzinfo=NY)
+    assert st["next_open"] == datetime(2025, 11, 28, 9, 30, tzinfo=NY)
+    # 휴장일 파일이 없으면 평일로 취급
+    assert MarketCalendar().session("AAPL", now)["state"] == "open"
+
+def test_fx_weekend(cal):
+    assert cal.session("USDKRW=X", datetime(2025, 11, 28, 16, 59, tzinfo=NY))["state"] == "open"
+    st = cal.session("USDKRW=X", datetime(2025, 11, 29, 12, 0, tzinfo=NY))   # 토요일
+    assert (st["market"], st["state"]) == ("FX", "closed")
+    assert st["last_close"] == datetime(2025, 11, 28, 17, 0, tzinfo=NY)
+    assert st["next_open"] == datetime(2025, 11, 30, 17, 0, tzinfo=NY)
+    # 월~목 자정은 연속 구간 (break 아님)
+    st = cal.session("EURUSD=X", datetime(2025, 11, 25, 0, 0, tzinfo=NY))
+    assert st["state"] == "open" and st["next_close"] == datetime(2025, 11, 28, 17, 0, tzinfo=NY)
+
+def test_futures_friday_close(cal):
+    st = cal.session("CL=F", datetime(2025, 11, 21, 16, 30, tzinfo=NY))
+    assert (st["market"], st["state"]) == ("FUT", "open")
+    assert st["next_close"] == datetime(2025, 11, 21, 17, 0, tzinfo=NY)
+
+    st = cal.session("CL=F", datetime(2025, 11, 21, 17, 30, tzinfo=NY))   # 금요일 마감 후 → 일요일 18:00 재개
+    assert st["state"] == "closed"
+    assert st["next_open"] == datetime(2025, 11, 23, 18, 0, tzinfo=NY)
+
+    # 평일 17:00-18:00은 정산 휴식
+    st = cal.session("CL=F", datetime(2025, 11, 20, 17, 30, tzinfo=NY))
+    assert st["state"] == "break" and st["next_open"] == datetime(2025, 11, 20, 18, 0, tzinfo=NY)
+
+def test_n225_lunch_break(cal):
+    now = datetime(2025, 11, 26, 12, 0, tzinfo=TOKYO)
+    st = cal.session("^N225", now)
+    assert (st["market"], st["state"]) == ("JP", "break")
+    assert st["last_close"] == datetime(2025, 11, 26, 11, 30, tzinfo=TOKYO)
+    assert st["next_open"] == datetime(2025, 11, 26, 12, 30, tzinfo=TOKYO)
+    assert cal.quote_ttl("^N225", now) == 1800
+    assert cal.quote_ttl("7203.T", datetime(2025, 11, 26, 11, 35, tzinfo=TOKYO)) == 60
+    assert cal.session("^N225", datetime(2025, 11, 26, 13, 0, tzinfo=TOKYO))["state"] == "open"
+
+def test_intervals_cached_per_local_day():
+    c = MarketCalendar()
+    c.session("^KS11", datetime(2025, 11, 26, 10, 0, tzinfo=SEOUL))
+    c.session("^KS11", datetime(2025, 11, 26, 14, 0, tzinfo=SEOUL))
+    assert list(c._cache) == [("KRX", date(2025, 11, 26))]
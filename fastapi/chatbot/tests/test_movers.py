@@ -0,0 +1,55 @@
+# 상승/하락 상위: movers.top_k/compute 순위·등락 집계 + get_top_movers 인자 검증
+import numpy as np
+
+import chatbot
+import movers
+
+nan = np.nan
+
+def test_top_k_skips_nan_and_orders_ties_by_position():
+    v = np.array([1, nan, 3, 3, 2])
+    assert movers.top_k(v, 2).tolist() == [2, 3]
+    assert movers.top_k(v, 3).tolist() == [2, 3, 4]
+    assert movers.top_k(v, 10).tolist() == [2, 3, 4, 0]           # k > 값 있는 종목 수
+    assert movers.top_k(np.array([5, 3, 3, 3, 1]), 2).tolist() == [0, 1]   # 경계 동점은 앞 종목
+    assert movers.top_k(v, 0).tolist() == []
+    assert movers.top_k(np.full(3, nan), 2).tolist() == []
+
+def _universe():
+    tickers = list("ABCDEFG")
+    price = np.array([110, 105, 105, 95, nan, 100, 100], dtype=float)
+    prev = np.array([100, 100, 100, 100, 100, nan, 100], dtype=float)
+    volume = np.array([300, nan, 100, 100, 50, 100, 100], dtype=float)
+    avg = np.array([100, 100, 100, 100, 0, 100, 100], dtype=float)
+    return tickers, [f"{t}사" for t in tickers], price, prev, volume, avg
+
+def test_compute_ranks_and_breadth():
+    out = movers.compute(*_universe(), k=2)
+    assert (out["universe_size"], out["priced"]) == (7, 5)        # E(가격 없음)/F(전일 종가 없음) 제외
+    assert [r["ticker"] for r in out["gainers"]] == ["A", "B"]    # B/C 동점 → 유니버스 순서
+    assert out["gainers"][0] == {"ticker": "A", "name": "A사", "price": 110.0, "changePct": 10.0, "volume": 300, "volumeRatio": 3.0}
+    assert [r["ticker"] for r in out["losers"]] == ["D"] and out["losers"][0]["changePct"] == -5.0
+    assert [r["ticker"] for r in out["volume"]] == ["A", "C"]
+    assert out["breadth"] == {"advancers": 3, "decliners": 1, "unchanged": 1, "ad_ratio": 3.0, "median_pct": 5.0}
+
+def test_compute_k_larger_than_priced():
+    out = movers.compute(*_universe(), k=30)
+    assert [r["ticker"] for r in out["gainers"]] == ["A", "B", "C"]   # 오른 종목만
+    assert [r["ticker"] for r in out["volume"]] == ["A", "C", "D", "F", "G"]
+    f = out["volume"][3]
+    assert (f["changePct"], f["volumeRatio"]) == (None, 1.0)            # 전일 종가 없어도 거래량 순위에는 포함
+
+def test_compute_no_decliners_and_nothing_priced():
+    p = np.array([101, 100], dtype=float)
+    out = movers.compute(["A", "B"], ["A", "B"], p, np.array([100, 100], dtype=float), p, p, k=5)
+    assert out["losers"] == []
+    assert out["breadth"] == {"advancers": 1, "decliners": 0, "unchanged": 1, "ad_ratio": None, "median_pct": 0.5}
+    empty = movers.compute(["A"], ["A"], np.array([nan]), np.array([nan]), np.array([nan]), np.array([nan]))
+    assert empty["priced"] == 0 and empty["breadth"]["median_pct"] is None
+
+def test_get_top_movers_rejects_unknown_kind(monkeypatch):
+    monkeypatch.setattr(chatbot.MOVERS, "universes", {"KOSPI_LARGE": [("005930.KS", "삼성전자")]})
+    monkeypatch.setattr(chatbot.MOVERS, "get", lambda u: (_ for _ in ()).throw(AssertionError("조회 전에 거절돼야 함")))
+    out = chatbot.get_top_movers("KOSPI_LARGE", "winners")
+    assert out.startswith("지원하지 않는 구분입니다: winners")
+    assert "gainers" in out and "breadth" in out
@@ -0,0 +1,59 @@
+# 단건 시세 헤지: 어느 요청이 먼저 끝나든 변동(change)은 1분봉 직전 봉 대비 뜻만 가짐
+import threading
+
+import pandas as pd
+import pytest
+
+import chatbot
+
+def _frame(closes, freq):
+    idx = pd.date_range("2026-01-05 01:00", periods=len(closes), freq=freq, tz="UTC")
+    return pd.DataFrame({"Close": closes}, index=idx)
+
+INTRADAY = _frame([100.0, 101.0], "1min")          # 직전 1분봉 대비 +1
+DAILY = _frame([90.0, 95.0, 101.5], "1D")          # 전일 대비 +6.5 (다른 뜻)
+
+@pytest.fixture
+def yf_race(monkeypatch):
+    release = threading.Event()
+    delays = {}
+
+    def fake_sync(tkr, interval, period, tail=None):
+        if delays.get(interval):
+            release.wait(5)
+        return INTRADAY if interval == "1m" else DAILY
+    monkeypatch.setattr(chatbot, "_sync_history", fake_sync)
+    monkeypatch.setattr(chatbot, "YF_HEDGE_DELAY", "0.01")
+    chatbot.QUOTE_CACHE.purge()
+    yield delays, release
+    release.set()
+    chatbot.QUOTE_CACHE.purge()
+
+def test_intraday_wins(yf_race):
+    q = chatbot._fetch_quote_yf_live("TEST")
+    assert (q["price"], q["prevClose"], q["change"]) == (101.0, 100.0, 1.0)
+
+def test_hedge_win_keeps_price_but_not_day_over_day_change(yf_race):
+    delays, release = yf_race
+    delays["1m"] = True
+    q = chatbot._fetch_quote_yf_live("TEST")
+    assert q["price"] == 101.5
+    assert q["prevClose"] is None and q["change"] is None and q["changePct"] is None
+    # 늦게 온 1분봉이 같은 뜻의 변동으로 캐시 갱신
+    release.set()
+    for _ in range(100):
+        hit = chatbot.QUOTE_CACHE.get("TEST")
+        if hit is not chatbot.MISS:
+            break
+        threading.Event().wait(0.02)
+    assert (hit["price"], hit["change"]) == (101.0, 1.0)
+
+def test_change_never_means_day_over_day_across_races(yf_race):
+    delays, release = yf_race
+    changes = set()
+    for slow in (False, True, False, True):
+        delays["1m"] = slow
+        release.clear()
+        changes.add(chatbot._fetch_quote_yf_live("TEST")["change"])
+        release.set()
+    assert changes <= {1.0, None}
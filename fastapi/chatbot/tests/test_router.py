@@ -0,0 +1,80 @@
+# 라우터 규칙 표: 발화 → (규칙, 도구, 인자) / None(모델 경로) — 종목은 data/listings.csv 인덱스 기준, 네트워크 없음
+import pytest
+
+import chatbot
+
+CASES = [
+    # 지수/환율/요약
+    ("코스피 지금 얼마야", ("kospi", "get_market", {"market_type": "KOSPI"})),
+    ("KOSPI 지금", ("kospi", "get_market", {"market_type": "KOSPI"})),
+    ("코스닥 지금", ("kosdaq", "get_market", {"market_type": "KOSDAQ"})),
+    ("환율 지금", ("usd_krw", "get_market", {"market_type": "USD_KRW"})),
+    ("달러 얼마", ("usd_krw", "get_market", {"market_type": "USD_KRW"})),
+    ("엔화 환율", ("jpy_krw", "get_market", {"market_type": "JPY_KRW"})),
+    ("파운드 환율", ("fx_pair", "get_market", {"market_type": "FX", "pair": "GBP_KRW"})),
+    ("호주달러 환율", ("fx_pair", "get_market", {"market_type": "FX", "pair": "AUD_KRW"})),
+    ("시장 요약해줘", ("summary", "get_market", {"market_type": "MARKET_SUMMARY"})),
+    # 경제지표/뉴스
+    ("CPI 알려줘", ("cpi", "get_indicator", {"indicator_type": "CPI"})),
+    ("소비자 물가", ("cpi", "get_indicator", {"indicator_type": "CPI"})),
+    ("GDP 얼마", ("gdp", "get_indicator", {"indicator_type": "GDP"})),
+    ("무역수지", ("trade", "get_indicator", {"indicator_type": "TRADE_BALANCE"})),
+    ("미국 금리", ("fed", "get_indicator", {"indicator_type": "US_FEDFUNDS"})),
+    ("연준 목표 범위", ("fed", "get_indicator", {"indicator_type": "US_FED_TARGET"})),
+    ("한국 기준금리", ("base_rate", "get_indicator", {"indicator_type": "BASE_RATE"})),
+    ("최신 뉴스", ("news", "get_latest_news", {"count": 5})),
+    ("뉴스 top 10", ("news", "get_latest_news", {"count": 10})),
+    # 개별 종목: 심볼은 인덱스 정확 일치만, 종목명은 정확/엄격한 퍼지
+    ("NVDA 주가", ("quote_symbol", "get_market", {"market_type": "QUOTE", "ticker": "NVDA"})),
+    ("TSLA 시세", ("quote_symbol", "get_market", {"market_type": "QUOTE", "ticker": "TSLA"})),
+    ("LG 주가", ("quote_symbol", "get_market", {"market_type": "QUOTE", "ticker": "003550.KS"})),
+    ("005930.KS 주가", ("quote_symbol", "get_market", {"market_type": "QUOTE", "ticker": "005930.KS"})),
+    ("005930 주가", ("quote_name", "get_market", {"market_type": "QUOTE", "ticker": "005930.KS"})),
+    ("오늘 삼성전자 주가", ("quote_name", "get_market", {"market_type": "QUOTE", "ticker": "005930.KS"})),
+    ("삼성잔자 주가", ("quote_name", "get_market", {"market_type": "QUOTE", "ticker": "005930.KS"})),
+    ("엔비디아 지금 얼마야", ("quote_name", "get_market", {"market_type": "QUOTE", "ticker": "NVDA"})),
+    # 상승/하락 상위
+    ("오늘 많이 오른 종목", ("movers", "get_top_movers", {"universe": "KOSPI_LARGE", "kind": "gainers"})),
+    ("코스닥 급락주", ("movers", "get_top_movers", {"universe": "KOSDAQ_LARGE", "kind": "losers"})),
+    ("미국 상승률 상위", ("movers", "get_top_movers", {"universe": "US_LARGE", "kind": "gainers"})),
+    ("거래량 급증", ("movers", "get_top_movers", {"universe": "KOSPI_LARGE", "kind": "volume"})),
+    ("상승 종목 수", ("movers", "get_top_movers", {"universe": "KOSPI_LARGE", "kind": "breadth"})),
+    # 가격 알림
+    ("USD/KRW 1400 넘으면 알려줘",
+     ("price_alert", "price_alert", {"action": "create", "ticker": "USDKRW=X", "price": 1400.0, "direction": "above"})),
+    ("삼성전자 8만원 되면 알려줘",
+     ("price_alert", "price_alert", {"action": "create", "ticker": "005930.KS", "price": 80000.0, "direction": "auto"})),
+    ("달러 1300 아래로 떨어지면 알림",
+     ("price_alert", "price_alert", {"action": "create", "ticker": "USDKRW=X", "price": 1300.0, "direction": "below"})),
+    ("내 알림 목록", ("alert_list", "price_alert", {"action": "list"})),
+    # 기술적 지표 (지수/종목 시세 규칙보다 우선)
+    ("코스피 이동평균", ("technicals", "get_technicals", {"ticker": "^KS11"})),
+    ("삼성전자 RSI", ("technicals", "get_technicals", {"ticker": "005930.KS"})),
+    ("NVDA RSI", ("technicals", "get_technicals", {"ticker": "NVDA"})),
+    # 모델 경로: 약어/모르는 심볼, 모호한 종목명, 분석·비교 질문, 취소 요청
+    ("ETF 시세", None),
+    ("XYZQ 주가", None),
+    ("USD 얼마", None),
+    ("삼성 주가", None),
+    ("금리 얼마", None),
+    ("애플 주가 전망", None),
+    ("코스피랑 코스닥 비교", None),
+    ("알림 취소", None),
+    # 가정/평가/이유 질문은 환율·지수 단어가 있어도 시세 규칙에 걸지 않음
+    ("환율 오르면 수출기업에 좋아?", None),
+    ("환율 떨어지면 뭐 사야 돼", None),
+    ("달러 강세면 수입 물가는", None),
+    ("엔화 약세면 여행 가기 좋아?", None),
+    ("원화 강세 수출에 불리해?", None),
+    ("환율 왜 올라", None),
+    ("환율이 코스피에 미치는 영향", None),
+    ("코스피 떨어지면 사도 돼?", None),
+]
+
+@pytest.mark.parametrize("text,expected", CASES, ids=[t for t, _ in CASES])
+def test_route(text, expected):
+    r = chatbot.ROUTER.route(text)
+    assert (r and (r["rule"], r["tool"], r["arguments"])) == expected
+
+def test_long_text_goes_to_model():
+    assert chatbot.ROUTER.route("코스피 " + "지금 " * 20) is None
@@ -0,0 +1,128 @@
+import pytest
+
+import sessions
+from sessions import SessionStore, _MSG_OVERHEAD
+
+@pytest.fixture
+def make_store(monkeypatch, clock):
+    monkeypatch.setattr(sessions, "time", clock)
+
+    def make(max_turns=20, idle_ttl=100, max_bytes=1 << 20, max_sessions=100):
+        return SessionStore(max_turns, idle_ttl, max_bytes, max_sessions)
+    return make
+
+def test_idle_session_expires_on_access(make_store, clock):
+    s = make_store(idle_ttl=100)
+    s.add_turn("a", "user", "안녕")
+    clock.advance(99)
+    assert len(s.get("a")) == 1          # 조회도 사용 → 유휴 시간 갱신
+    clock.advance(100)
+    assert s.get("a") == []
+    assert s.stats()["evicted_idle"] == 1
+    assert s.stats()["bytes"] == 0
+
+def test_idle_sessions_swept_on_write(make_store, clock):
+    s = make_store(idle_ttl=100)
+    s.add_turn("old", "user", "x")
+    clock.advance(50)
+    s.add_turn("mid", "user", "x")
+    clock.advance(60)
+    s.add_turn("new", "user", "x")
+    assert s.stats()["sessions"] == 2
+    assert s.get("old") == [] and len(s.get("mid")) == 1
+
+def test_sweep(make_store, clock):
+    s = make_store(idle_ttl=100)
+    for sid in "abc":
+        s.add_turn(sid, "user", "x")
+    clock.advance(100)
+    assert s.sweep() == 3
+    assert s.stats()["sessions"] == 0
+
+def test_lru_by_session_count_keeps_recently_used(make_store):
+    s = make_store(max_sessions=2)
+    s.add_turn("a", "user", "x")
+    s.add_turn("b", "user", "x")
+    s.get("a")                            # b가 가장 오래 안 씀
+    s.add_turn("c", "user", "x")
+    assert s.get("b") == []
+    assert len(s.get("a")) == 1 and len(s.get("c")) == 1
+    assert s.stats()["evicted_lru"] == 1
+
+def test_lru_by_bytes_never_evicts_current_session(make_store):
+    body = "가" * 100                      # UTF-8 300바이트
+    s = make_store(max_bytes=2 * (300 + _MSG_OVERHEAD) + 10)
+    s.add_turn("a", "user", body)
+    s.add_turn("b", "user", body)
+    s.add_turn("c", "user", body)
+    assert s.get("a") == [] and s.stats()["sessions"] == 2
+    s.add_turn("c", "user", body * 10)     # 상한보다 큰 현재 세션: 다른 세션만 축출
+    assert s.stats()["sessions"] == 1 and len(s.get("c")) == 2
+
+def test_byte_accounting_matches_contents(make_store):
+    s = make_store(max_turns=2)
+    for i in range(7):
+        s.add_turn("sid", "user" if i % 2 == 0 else "assistant", f"메시지 {i}")
+    turns = s.get("sid")
+    assert [t["content"] for t in turns] == [f"메시지 {i}" for i in range(3, 7)]   # 최근 2*max_turns
+    expected = len(b"sid") + sum(len(t["content"].encode()) + _MSG_OVERHEAD for t in turns)
+    assert s.stats()["bytes"] == expected
+    assert s.reset("sid") and s.stats()["bytes"] == 0
+    assert not s.reset("sid")
+
+# ===== 토큰 예산 창 / 롤링 요약 =====
+def test_estimate_tokens():
+    assert sessions.estimate_tokens("") == 4
+    assert sessions.estimate_tokens("abcd") == 5            # ASCII 4자 ≈ 1토큰 + 메시지당 4
+    assert sessions.estimate_tokens("가나다") == 7           # 비ASCII 1자 ≈ 1토큰
+    assert sessions.estimate_tokens("가a") == 6
+
+def _fill(s, n, text="가" * 6):                               # 메시지당 11토큰
+    for i in range(n):
+        s.add_turn("sid", "user" if i % 2 == 0 else "assistant", f"{text}{i}")
+
+def test_context_window_fits_budget_from_newest(make_store):
+    s = make_store()
+    _fill(s, 6)
+    tokens = [t["tokens"] for t in s.get("sid")]
+    summary, window, overflow = s.get_context("sid", token_budget=sum(tokens[-3:]))
+    assert summary == "" and overflow == 3
+    assert [t["content"] for t in window] == [t["content"] for t in s.get("sid")[3:]]
+    # 예산이 다음 메시지에 1토큰 모자라면 포함하지 않음
+    assert s.get_context("sid", sum(tokens[-3:]) - 1)[2] == 4
+    assert s.get_context("sid", 10 ** 6)[2] == 0
+    assert s.get_context("missing", 100) == ("", [], 0)
+
+def test_summary_folds_overflow_out_of_history(make_store):
+    s = make_store()
+    _fill(s, 6)
+    budget = sum(t["tokens"] for t in s.get("sid")[-2:])
+    assert s.begin_summary("sid", min_overflow=5, token_budget=budget) is None
+    prev, turns, upto = s.begin_summary("sid", min_overflow=4, token_budget=budget)
+    assert prev == "" and len(turns) == 4 and upto == 4
+    assert s.begin_summary("sid", min_overflow=1, token_budget=budget) is None   # 진행 중이면 중복 요약 안 함
+
+    s.add_turn("sid", "user", "요약 중 도착")               # 요약 도중 추가된 메시지는 유지
+    before = s.stats()["bytes"]
+    removed = sum(len(t["content"].encode()) + _MSG_OVERHEAD for t in turns)
+    s.end_summary("sid", upto, "요약")
+    summary, window, overflow = s.get_context("sid", 10 ** 6)
+    assert summary == "요약" and overflow == 0
+    assert [t["content"] for t in window][-1] == "요약 중 도착" and len(window) == 3
+    assert s.stats()["bytes"] == before - removed + len("요약".encode())
+
+def test_failed_summary_keeps_history(make_store):
+    s = make_store()
+    _fill(s, 6)
+    assert s.begin_summary("sid", 1, token_budget=10) is not None
+    s.end_summary("sid")
+    assert len(s.get("sid")) == 6
+    assert s.begin_summary("sid", 1, token_budget=10) is not None   # 다시 시도 가능
+
+def test_summary_skips_turns_already_trimmed_by_max_turns(make_store):
+    s = make_store(max_turns=2)
+    _fill(s, 4)
+    job = s.begin_summary("sid", 1, token_budget=10)
+    _fill(s, 3, text="새")                                     # 길이 제한으로 요약 대상 일부가 먼저 잘림
+    s.end_summary("sid", job[2], "요약")
+    assert [t["content"] for t in s.get("sid")] == ["새0", "새1", "새2"]
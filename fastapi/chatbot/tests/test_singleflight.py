@@ -0,0 +1,117 @@
+# 요청 병합: leader 결과/예외 공유, 완료 후 키 해제, 대기 중인 호출이 끊겨도 leader는 계속
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+def _wait_until(cond, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < deadline, "timeout"
+        time.sleep(0.001)
+
+def _run_threads(flight, fn, n=3):
+    # leader가 fn 안에서 막혀 있는 동안 n-1개 후속 호출을 붙인 뒤 (결과 또는 예외) 목록
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return fn()
+
+    out = [None] * n
+
+    def call(i):
+        try:
+            out[i] = flight.do("k", work)
+        except Exception as e:
+            out[i] = e
+
+    threads = [threading.Thread(target=call, args=(0,))]
+    threads[0].start()
+    started.wait(2)
+    threads += [threading.Thread(target=call, args=(i,)) for i in range(1, n)]
+    for t in threads[1:]:
+        t.start()
+    _wait_until(lambda: flight.stats()["shared"] == n - 1)
+    release.set()
+    for t in threads:
+        t.join(2)
+    return out, len(calls)
+
+def test_thread_followers_share_leader_result():
+    flight = SingleFlight()
+    result = {"v": 1}
+    out, calls = _run_threads(flight, lambda: result)
+    assert calls == 1
+    assert all(r is result for r in out)
+    assert flight.stats() == {"leaders": 1, "shared": 2, "in_flight": 0}
+    # 완료 후 키 해제 → 다음 호출은 새로 실행
+    assert flight.do("k", lambda: 2) == 2
+    assert flight.stats()["leaders"] == 2
+
+def test_thread_followers_share_leader_exception():
+    flight = SingleFlight()
+    err = ValueError("upstream down")
+
+    def fail():
+        raise err
+
+    out, calls = _run_threads(flight, fail)
+    assert calls == 1
+    assert all(r is err for r in out)
+    assert flight.stats()["in_flight"] == 0
+    assert flight.do("k", lambda: "ok") == "ok"      # 실패도 보관하지 않음
+
+def test_async_followers_share_result_and_exception():
+    async def main():
+        flight = AsyncSingleFlight()
+        calls = []
+        gate = asyncio.Event()
+
+        async def work(v):
+            calls.append(v)
+            await gate.wait()
+            if isinstance(v, Exception):
+                raise v
+            return v
+
+        ok = [asyncio.create_task(flight.do("a", lambda: work("A"))) for _ in range(3)]
+        err = ValueError("boom")
+        bad = [asyncio.create_task(flight.do("b", lambda: work(err))) for _ in range(2)]
+        await asyncio.sleep(0)
+        assert flight.stats() == {"leaders": 2, "shared": 3, "in_flight": 2}
+        gate.set()
+        assert await asyncio.gather(*ok) == ["A", "A", "A"]
+        res = await asyncio.gather(*bad, return_exceptions=True)
+        assert res == [err, err]
+        assert calls == ["A", err]
+        assert flight.stats()["in_flight"] == 0
+        assert await flight.do("a", lambda: work("A2")) == "A2"   # 키 해제 후 새 leader
+    asyncio.run(main())
+
+@pytest.mark.parametrize("cancel", ["follower", "leader"])
+def test_async_cancelled_caller_does_not_cancel_shared_task(cancel):
+    async def main():
+        flight = AsyncSingleFlight()
+        gate = asyncio.Event()
+
+        async def work():
+            await gate.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        victim, survivor = (second, first) if cancel == "follower" else (first, second)
+        victim.cancel()
+        await asyncio.sleep(0)
+        assert victim.cancelled()
+        gate.set()
+        assert await asyncio.wait_for(survivor, 1) == "done"
+    asyncio.run(main())
@@ -0,0 +1,46 @@
+# 스트리밍 챗 경로 계측: completion/upstream 시간은 OpenAI 대기만 — 느린 클라이언트가 읽어 가는 시간은 제외
+import asyncio
+import json
+
+import chatbot
+
+def _chunk(text):
+    delta = type("Delta", (), {"content": text, "tool_calls": None})()
+    return type("Chunk", (), {"choices": [type("Choice", (), {"delta": delta})()]})()
+
+class _FakeStream:
+    def __init__(self, texts):
+        self.texts = list(texts)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self.texts:
+            raise StopAsyncIteration
+        return _chunk(self.texts.pop(0))
+
+class _FakeCompletions:
+    async def create(self, model, messages, stream=False, **kw):
+        assert stream
+        return _FakeStream(["안녕", "하세요", "."])
+
+def test_slow_client_is_not_counted_as_upstream_time(monkeypatch):
+    monkeypatch.setattr(chatbot, "_route", lambda payload, text: None)
+    monkeypatch.setattr(chatbot, "schedule_summary", lambda session_id: None)
+    monkeypatch.setattr(chatbot, "aclient", type("Client", (), {"chat": type("Chat", (), {"completions": _FakeCompletions()})()})())
+
+    async def consume():
+        frames = []
+        async for fr in chatbot._chat_stream_events({"debug": True}, "인사해줘", "timing"):
+            frames.append(fr)
+            await asyncio.sleep(0.1)                      # 느린 클라이언트
+        return frames
+
+    frames = asyncio.run(consume())
+    done = json.loads(frames[-1].split("data: ", 1)[1])
+    timings = done["timings"]
+    assert done["answer"] == "안녕하세요."
+    assert timings["path"] == "model_no_tool"
+    assert timings["upstream:openai"] < 0.05
+    assert timings["completion_1"] < 0.05
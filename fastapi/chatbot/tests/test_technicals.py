@@ -0,0 +1,47 @@
+# 기술적 지표: 짧은 고정 종가열로 손계산 값과 비교 (봉 수가 창보다 적으면 None)
+from math import log, sqrt
+
+import numpy as np
+import pytest
+
+import technicals
+
+CLOSE = np.array([10, 11, 12, 11, 13, 14], dtype=float)
+
+def test_sma():
+    assert technicals.sma(CLOSE, (2, 3, 7)) == {2: 13.5, 3: 12.6667, 7: None}
+    assert technicals.sma(CLOSE) == {5: 12.2, 20: None, 60: None, 120: None, 200: None}
+
+def test_rsi_wilder():
+    # diff = [1, 1, -1, 2, 1], alpha = 1/3 → 상승 평균 29/27, 하락 평균 4/27 → RS 7.25
+    assert technicals.rsi(CLOSE, 3) == pytest.approx(100 - 100 / 8.25, abs=1e-4)
+    assert technicals.rsi(CLOSE[:3], 3) is None                 # 봉 수 <= 기간
+    assert technicals.rsi(np.arange(1, 6, dtype=float), 3) == 100.0   # 하락 없음
+
+def test_realized_vol():
+    out = technicals.realized_vol(np.array([100, 110, 99], dtype=float), (2, 3))
+    # 로그수익률 2개의 표본 표준편차 = |r1 - r2| / √2 → × √252 × 100
+    assert out[2] == pytest.approx(abs(log(1.1) - log(0.9)) / sqrt(2) * sqrt(252) * 100, abs=1e-4)
+    assert out[3] is None
+
+def test_drawdown():
+    assert technicals.drawdown(np.array([10, 12, 9, 11], dtype=float)) == {"current": -8.3333, "max_1y": -25.0}
+    assert technicals.drawdown(CLOSE) == {"current": 0.0, "max_1y": -8.3333}
+
+def test_compute():
+    nan = np.nan
+    high = np.array([10.5, nan, 12.5, 11.5, 13.5, 14.5])
+    low = np.array([9.5, 10.5, 11.5, nan, 12.5, 13.5])
+    out = technicals.compute(np.arange(1, 7), high, low, CLOSE)
+    assert (out["bars"], out["last_ts"], out["close"]) == (6, 6, 14.0)
+    assert out["sma"][5] == 12.2 and out["sma"][20] is None
+    assert out["rsi"] is None                                    # 6봉 < RSI 14
+    assert out["vol"] == {20: None, 60: None}
+    assert out["drawdown"] == {"current": 0.0, "max_1y": -8.3333}
+    assert out["range_52w"] == {"high": 14.5, "low": 9.5, "position": 90.0}
+    assert out["returns"] == {"1w": 40.0, "1m": None, "3m": None, "1y": None}
+
+def test_compute_empty_and_flat():
+    assert technicals.compute(np.array([]), np.array([]), np.array([]), np.array([])) == {"bars": 0}
+    flat = np.full(3, 5.0)
+    assert technicals.compute(np.arange(3), flat, flat, flat)["range_52w"]["position"] is None   # 고가 = 저가
@@ -0,0 +1,71 @@
+import pytest
+
+from ticker_index import TickerIndex, is_krx_code, normalize
+
+ROWS = [
+    {"symbol": "005930.KS", "name_ko": "삼성전자", "name_en": "Samsung Electronics", "aliases": "삼전|samsung"},
+    {"symbol": "005935.KS", "name_ko": "삼성전자우", "name_en": "Samsung Electronics Pref", "aliases": "삼전우"},
+    {"symbol": "247540.KQ", "name_ko": "에코프로비엠", "name_en": "EcoPro BM", "aliases": ""},
+    {"symbol": "GS", "name_ko": "골드만삭스", "name_en": "Goldman Sachs", "aliases": ""},
+    {"symbol": "078930.KS", "name_ko": "GS", "name_en": "GS Holdings", "aliases": "GS홀딩스"},
+    {"symbol": "NVDA", "name_ko": "엔비디아", "name_en": "NVIDIA", "aliases": ""},
+]
+
+@pytest.fixture(scope="module")
+def idx():
+    return TickerIndex(ROWS, fuzzy_min_score=0.7)
+
+@pytest.mark.parametrize("query,ticker", [
+    ("삼성전자", "005930.KS"),
+    ("삼전", "005930.KS"),
+    ("Samsung Electronics", "005930.KS"),
+    ("  samsung  ", "005930.KS"),
+    ("005930", "005930.KS"),
+    ("005930.ks", "005930.KS"),
+    ("247540", "247540.KQ"),          # 목록에 있으면 코스닥 접미사 그대로
+    ("nvda", "NVDA"),
+    ("GS", "GS"),                      # 심볼 키가 이름 키보다 우선
+    ("GS홀딩스", "078930.KS"),
+])
+def test_exact(idx, query, ticker):
+    hit = idx.resolve(query)
+    assert (hit["ticker"], hit["match"], hit["score"]) == (ticker, "exact", 1.0)
+
+def test_unlisted_krx_code_is_not_guessed(idx):
+    assert idx.resolve("123456") is None
+    assert idx.resolve(" 123456 ") is None
+
+@pytest.mark.parametrize("query", ["AAPL", "BRK-B", "7203.T", "^GSPC", "USDKRW=X", "CL=F", "123456.KQ"])
+def test_unlisted_symbol_passes_through(idx, query):
+    hit = idx.resolve(query)
+    assert (hit["ticker"], hit["match"]) == (query, "symbol")
+
+def test_prefix_prefers_row_order(idx):
+    hit = idx.resolve("삼성")
+    assert (hit["ticker"], hit["match"]) == ("005930.KS", "prefix")
+    assert hit["score"] == pytest.approx(0.5)
+    assert idx.resolve("삼성", prefix=False, fuzzy=False) is None
+
+def test_fuzzy_tolerates_typos(idx):
+    hit = idx.resolve("삼성잔자", prefix=False)
+    assert (hit["ticker"], hit["match"]) == ("005930.KS", "fuzzy")
+    assert 0.7 <= hit["score"] < 1.0
+    assert idx.resolve("삼성잔자", prefix=False, min_score=0.99) is None
+    assert idx.resolve("삼성잔자", prefix=False, fuzzy=False) is None
+
+def test_no_match(idx):
+    assert idx.resolve("") is None
+    assert idx.resolve("   ") is None
+    assert idx.resolve("없는회사이름") is None
+
+def test_search_orders_exact_prefix_fuzzy(idx):
+    hits = idx.search("삼성전자", limit=5)
+    assert [(h["ticker"], h["match"]) for h in hits][:2] == [("005930.KS", "exact"), ("005935.KS", "prefix")]
+
+def test_is_krx_code():
+    assert is_krx_code("005930") and is_krx_code(" 005930 ")
+    assert not is_krx_code("005930.KS") and not is_krx_code("05930") and not is_krx_code(None)
+
+def test_normalize_drops_corporate_marks_and_punctuation():
+    assert normalize("(주)삼성 전자") == normalize("삼성전자") == "삼성전자"
+    assert normalize("S&P 500") == "s&p500"
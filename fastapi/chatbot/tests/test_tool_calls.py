@@ -0,0 +1,58 @@
+# 도구 실행기: 모델이 보낸 잘못된 인자/예외는 해당 도구 하나의 오류 결과로 (턴 전체를 실패시키지 않음)
+import asyncio
+import json
+
+import pytest
+
+import chatbot
+
+def _calls(*specs):
+    return [{"id": f"call_{i}", "name": name, "arguments": json.dumps(args)} for i, (name, args) in enumerate(specs)]
+
+@pytest.mark.parametrize("count", [None, "five", [1]])
+def test_run_tool_rejects_bad_arguments(count):
+    r = chatbot.run_tool("get_latest_news", {"count": count})
+    assert r["ok"] is False and r["error"].startswith("잘못된 인자")
+
+def test_malformed_argument_fails_only_its_call(monkeypatch):
+    monkeypatch.setattr(chatbot, "fetch_latest_topn_from_mongo", lambda n: [])
+    msgs = asyncio.run(chatbot.run_tool_calls(_calls(
+        ("get_latest_news", {"count": None}),
+        ("get_latest_news", {"count": 3}),
+    ), use_cache=False))
+    results = [json.loads(m["content"]) for m in msgs]
+    assert [m["tool_call_id"] for m in msgs] == ["call_0", "call_1"]
+    assert results[0]["ok"] is False and "잘못된 인자" in results[0]["error"]
+    assert results[1]["ok"] is True
+
+def test_unexpected_exception_becomes_tool_error(monkeypatch):
+    async def boom(*a, **k):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(chatbot, "arun_tool", boom)
+    msgs = asyncio.run(chatbot.run_tool_calls(_calls(("get_market", {"market_type": "KOSPI"}))))
+    assert json.loads(msgs[0]["content"]) == {"ok": False, "error": "boom"}
+
+def test_invalid_json_arguments():
+    calls = [{"id": "c", "name": "get_market", "arguments": "{not json"}]
+    msgs = asyncio.run(chatbot.run_tool_calls(calls))
+    assert json.loads(msgs[0]["content"])["error"].startswith("잘못된 인자")
+
+class _FakeCompletions:
+    def __init__(self):
+        self.messages = None
+
+    async def create(self, model, messages, **kw):
+        self.messages = messages
+        msg = type("Msg", (), {"content": "지연 안내"})()
+        return type("Completion", (), {"choices": [type("Choice", (), {"message": msg})()]})()
+
+def test_router_path_tool_call_is_time_bounded(monkeypatch):
+    async def hang(*a, **k):
+        await asyncio.sleep(30)
+    completions = _FakeCompletions()
+    monkeypatch.setattr(chatbot, "arun_tool", hang)
+    monkeypatch.setattr(chatbot, "TOOL_TIMEOUT_SECS", 0.05)
+    monkeypatch.setattr(chatbot, "aclient", type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})())
+    answer, path = asyncio.run(asyncio.wait_for(chatbot._answer({}, "코스피 지금", []), 5))
+    assert (answer, path) == ("지연 안내", "router_phrase")
+    assert "Timeout" in completions.messages[-1]["content"]
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+import ts_store
+from ts_store import Series, TimeSeriesStore
+
+@pytest.fixture
+def store(tmp_path, monkeypatch, clock):
+    monkeypatch.setattr(ts_store, "time", clock)
+    monkeypatch.setattr(Series, "INITIAL_CAPACITY", 4)
+    return TimeSeriesStore(str(tmp_path), max_rows={"1m": 3})
+
+def _bars(ts, base=0.0):
+    ts = np.asarray(ts, dtype=np.int64)
+    return ts, {"close": ts.astype(float) + base, "volume": np.ones(len(ts))}
+
+def test_append_skips_older_and_overwrites_last(store):
+    ts, cols = _bars([10, 20, 30])
+    assert store.append("AAPL", "1d", ts, **cols) == 3
+    ts, cols = _bars([20, 30, 40], base=0.5)     # 20은 버림, 30은 진행 중 봉 갱신, 40 추가
+    assert store.append("aapl", "1d", ts, **cols) == 1
+    got = store.read("AAPL", "1d")
+    assert got["ts"].tolist() == [10, 20, 30, 40]
+    assert got["close"].tolist() == [10.0, 20.0, 30.5, 40.5]
+    assert np.isnan(got["open"]).all()            # 안 준 컬럼은 NaN
+    assert store.last_ts("AAPL", "1d") == 40
+
+def test_read_range_and_limit(store):
+    store.append("X", "1d", np.array([10, 20, 30, 40, 50]), close=np.arange(5.0))
+    assert store.read("X", "1d", start=20, end=40)["ts"].tolist() == [20, 30, 40]
+    assert store.read("X", "1d", end=40, limit=2)["ts"].tolist() == [30, 40]
+    assert store.tail("X", "1d", 1)["ts"].tolist() == [50]
+    assert store.read("NONE", "1d")["ts"].size == 0
+    assert store.last_ts("NONE", "1d") is None and not store.has("NONE", "1d")
+
+def test_capacity_growth_keeps_data_and_reopens(store, tmp_path):
+    ts, cols = _bars(range(0, 100, 10))
+    store.append("X", "1d", ts, **cols)
+    s = store.series("X", "1d")
+    assert s.capacity == 16 and s.n == 10
+    store.flush()
+    reopened = TimeSeriesStore(str(tmp_path))
+    got = reopened.read("X", "1d")
+    assert got["ts"].tolist() == list(range(0, 100, 10))
+    assert got["close"].tolist() == [float(t) for t in range(0, 100, 10)]
+
+def test_compaction_keeps_latest_max_rows(store, tmp_path):
+    ts, cols = _bars([1, 2, 3, 4, 5, 6])
+    store.append("X", "1m", ts, **cols)
+    assert store.series("X", "1m").n == 6           # 2*max_rows까지는 그대로
+    ts, cols = _bars([7])
+    store.append("X", "1m", ts, **cols)
+    assert store.read("X", "1m")["ts"].tolist() == [5, 6, 7]
+    ts, cols = _bars([8])
+    store.append("X", "1m", ts, **cols)
+    assert store.read("X", "1m")["ts"].tolist() == [5, 6, 7, 8]
+    # 압축은 즉시 meta 기록 → 재시작 후에도 시각 순서 유지
+    got = TimeSeriesStore(str(tmp_path)).read("X", "1m")["ts"].tolist()
+    assert got == sorted(got) and got[:3] == [5, 6, 7]
+
+def test_meta_written_at_most_every_flush_interval(store, clock, tmp_path):
+    s = store.series("X", "1m")
+    for t in range(1, 4):
+        store.append("X", "1m", np.array([t]))
+    assert s.meta_writes == 1 and s._dirty                              # 첫 추가만 기록
+    assert TimeSeriesStore(str(tmp_path)).read("X", "1m")["ts"].tolist() == [1]
+    clock.advance(Series.META_FLUSH_SECS)
+    store.append("X", "1m", np.array([4]))
+    assert s.meta_writes == 2 and not s._dirty
+    store.append("X", "1m", np.array([5]))
+    store.flush()
+    assert s.meta_writes == 3
+    store.flush()                                                       # 변경 없으면 다시 쓰지 않음
+    assert s.meta_writes == 3
+    assert TimeSeriesStore(str(tmp_path)).read("X", "1m")["ts"].tolist() == [1, 2, 3, 4, 5]
+
+def test_replace_and_covered_from(store):
+    store.append("X", "1d", np.array([30, 40]), covered_from=30)
+    store.append("X", "1d", np.array([50]), covered_from=40)          # 더 늦은 시작은 무시
+    assert store.covered_from("X", "1d") == 30
+    store.append("X", "1d", np.array([10, 20]), covered_from=10, replace=True)
+    assert store.read("X", "1d")["ts"].tolist() == [10, 20]
+    assert store.covered_from("X", "1d") == 10
+
+def test_corrupt_meta_starts_empty(store, tmp_path):
+    store.append("X", "1d", np.array([1, 2]))
+    store.flush()
+    (tmp_path / "1d" / "X" / "meta.json").write_text("{")
+    assert TimeSeriesStore(str(tmp_path)).read("X", "1d")["ts"].size == 0
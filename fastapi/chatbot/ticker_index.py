@@ -0,0 +1,186 @@
+# ticker_index.py — 로컬 종목 검색 인덱스 (QUOTE 요청의 종목명/코드 → 야후 티커, 네트워크 없음)
+# 원본: CSV(symbol,name_ko,name_en,aliases — 별칭은 | 구분, 행 순서 = 동률 시 우선순위), TICKER_LISTINGS_FILE로 교체 가능
+# 매칭 순서: 정확(심볼/6자리 코드/한글·영문명/별칭) → 접두(정렬 키 bisect) → 퍼지(자모 분해 bigram Dice)
+# 사용: from ticker_index import TICKERS → TICKERS.resolve("삼성전자") → {"ticker": "005930.KS", "name": "삼성전자", ...}
+
+import os
+import re
+import csv
+import logging
+import unicodedata
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+log = logging.getLogger("chatbot")
+
+# ===== 정규화 =====
+# NFKC + 소문자 + 공백/구두점 제거 ("Samsung Electronics" / "BRK.B" / "(주)카카오" 같은 표기 차이 흡수)
+_DROP = re.compile(r"\(주\)|주식회사|[^0-9a-z&+가-힣]")
+
+def normalize(s: str) -> str:
+    return _DROP.sub("", unicodedata.normalize("NFKC", s or "").lower())
+
+# 한글 음절 → 초/중/종성 (오타 한 글자가 bigram 전체를 깨지 않도록 퍼지 비교는 자모 단위)
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+
+def _jamo(s: str) -> str:
+    out = []
+    for ch in s:
+        c = ord(ch) - 0xAC00
+        if 0 <= c < 11172:
+            out.append(_CHO[c // 588])
+            out.append(_JUNG[(c % 588) // 28])
+            if c % 28:
+                out.append(_JONG[c % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+def _grams(s: str) -> Set[str]:
+    j = _jamo(s)
+    return {j[i:i + 2] for i in range(len(j) - 1)}
+
+# 목록에 없어도 그대로 조회할 만한 야후 심볼 표기 (NVDA, BRK-B, 7203.T, ^GSPC, USDKRW=X, CL=F)
+_SYMBOL_RX = re.compile(r"\^?[A-Z0-9]{1,6}(?:[.\-][A-Z]{1,2})?(?:=[XF])?")
+_KRX_CODE_RX = re.compile(r"\d{6}")
+
+def is_krx_code(s: str) -> bool:
+    # 시장 접미사 없는 6자리 종목코드 ("005930")
+    return bool(_KRX_CODE_RX.fullmatch((s or "").strip()))
+
+# ===== 인덱스 =====
+class TickerIndex:
+    FUZZY_MIN_LEN = 3   # 정규화 기준 이 길이 미만은 퍼지 비교 안 함 (짧은 단어 오매칭 방지)
+
+    def __init__(self, rows: List[dict], fuzzy_min_score: float = 0.7):
+        self.fuzzy_min_score = fuzzy_min_score
+        self.entries: List[dict] = []      # {"ticker", "name", "name_en"} (행 순서 = 우선순위)
+        self._exact: Dict[str, int] = {}   # 정규화 키 → entry id
+        for row in rows:
+            self._add(row)
+        # 접두: 정렬된 키 목록 / 퍼지: 자모 bigram → 키 id 역색인
+        self._keys = sorted(self._exact)
+        self._key_grams = [_grams(k) for k in self._keys]
+        self._postings: Dict[str, List[int]] = {}
+        for i, grams in enumerate(self._key_grams):
+            for g in grams:
+                self._postings.setdefault(g, []).append(i)
+
+    @classmethod
+    def load(cls, path: str, **kw) -> "TickerIndex":
+        rows: List[dict] = []
+        try:
+            with open(path, encoding="utf-8", newline="") as f:
+                rows = [r for r in csv.DictReader(f) if (r.get("symbol") or "").strip()]
+            log.info(f"종목 목록 로드: {path} ({len(rows)}종목)")
+        except FileNotFoundError:
+            log.warning(f"종목 목록 파일 없음: {path} (심볼 그대로 조회)")
+        except Exception:
+            log.exception(f"종목 목록 파싱 실패: {path}")
+        return cls(rows, **kw)
+
+    def _add(self, row: dict):
+        symbol = row["symbol"].strip().upper()
+        name_ko = (row.get("name_ko") or "").strip()
+        name_en = (row.get("name_en") or "").strip()
+        idx = len(self.entries)
+        self.entries.append({"ticker": symbol, "name": name_ko or name_en or symbol, "name_en": name_en})
+        # 심볼/코드 키는 이름 키보다 우선 (예: "GS" = Goldman Sachs 티커, GS홀딩스는 078930.KS로)
+        keys = [symbol]
+        if symbol[:6].isdigit() and symbol[6:] in (".KS", ".KQ"):
+            keys.append(symbol[:6])
+        for k in keys:
+            self._exact[normalize(k)] = idx
+        names = [name_ko, name_en] + (row.get("aliases") or "").split("|")
+        for n in names:
+            k = normalize(n)
+            if k:
+                self._exact.setdefault(k, idx)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _hit(self, idx: int, match: str, score: float) -> dict:
+        return {**self.entries[idx], "match": match, "score": round(score, 3)}
+
+    def _prefix(self, q: str, limit: int) -> List[int]:
+        # q로 시작하는 키들의 entry id (행 순서 우선)
+        ids: Set[int] = set()
+        i = bisect_left(self._keys, q)
+        while i < len(self._keys) and self._keys[i].startswith(q):
+            ids.add(self._exact[self._keys[i]])
+            i += 1
+        return sorted(ids)[:limit]
+
+    def _fuzzy(self, q: str, limit: int, min_score: float) -> List[tuple]:
+        # (Dice 점수, entry id) 내림차순 — 역색인으로 bigram이 하나라도 겹치는 키만 비교
+        qg = _grams(q)
+        if not qg:
+            return []
+        overlap: Dict[int, int] = {}
+        for g in qg:
+            for k in self._postings.get(g, ()):
+                overlap[k] = overlap.get(k, 0) + 1
+        best: Dict[int, float] = {}
+        for k, n in overlap.items():
+            score = 2.0 * n / (len(qg) + len(self._key_grams[k]))
+            idx = self._exact[self._keys[k]]
+            if score >= min_score and score > best.get(idx, 0.0):
+                best[idx] = score
+        return sorted(((s, i) for i, s in best.items()), key=lambda x: (-x[0], x[1]))[:limit]
+
+    def search(self, query: str, limit: int = 5) -> List[dict]:
+        # 후보 목록 (정확 → 접두 → 퍼지 순, 중복 제거)
+        q = normalize(query)
+        if not q:
+            return []
+        out: List[dict] = []
+        seen: Set[int] = set()
+        def push(idx, match, score):
+            if idx not in seen and len(out) < limit:
+                seen.add(idx)
+                out.append(self._hit(idx, match, score))
+        if q in self._exact:
+            push(self._exact[q], "exact", 1.0)
+        for idx in self._prefix(q, limit):
+            push(idx, "prefix", len(q) / max(len(self.entries[idx]["name"]), len(q)))
+        if len(q) >= self.FUZZY_MIN_LEN:
+            for score, idx in self._fuzzy(q, limit, self.fuzzy_min_score):
+                push(idx, "fuzzy", score)
+        return out
+
+    def resolve(self, query: str, prefix: bool = True, fuzzy: bool = True,
+                min_score: Optional[float] = None) -> Optional[dict]:
+        # 종목명/코드/심볼 → {"ticker", "name", "name_en", "match", "score"} | None
+        # match: exact | symbol(목록 밖 심볼 표기) | prefix | fuzzy
+        # 목록에 없는 6자리 코드는 코스피/코스닥을 알 수 없으므로 None (호출 측에서 .KS → .KQ 확인)
+        raw = (query or "").strip()
+        q = normalize(raw)
+        if not q:
+            return None
+        idx = self._exact.get(q)
+        if idx is not None:
+            return self._hit(idx, "exact", 1.0)
+        if _KRX_CODE_RX.fullmatch(raw):
+            return None
+        if _SYMBOL_RX.fullmatch(raw):
+            return {"ticker": raw, "name": raw, "name_en": "", "match": "symbol", "score": 0.5}
+        if prefix and len(q) >= 2:
+            ids = self._prefix(q, 1)
+            if ids:
+                return self._hit(ids[0], "prefix", len(q) / max(len(self.entries[ids[0]]["name"]), len(q)))
+        if fuzzy and len(q) >= self.FUZZY_MIN_LEN:
+            cands = self._fuzzy(q, 1, self.fuzzy_min_score if min_score is None else min_score)
+            if cands:
+                return self._hit(cands[0][1], "fuzzy", cands[0][0])
+        return None
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "keys": len(self._keys), "grams": len(self._postings)}
+
+# ===== 기본 인스턴스 =====
+LISTINGS_FILE = os.getenv("TICKER_LISTINGS_FILE", str(Path(__file__).resolve().parent / "data" / "listings.csv"))
+TICKERS = TickerIndex.load(LISTINGS_FILE, fuzzy_min_score=float(os.getenv("TICKER_FUZZY_MIN", "0.7")))
@@ -0,0 +1,230 @@
+# ts_store.py — 로컬 시계열 저장소 (티커 × 봉 주기별 OHLCV 컬럼 배열, 디스크 memmap, 재시작 후에도 유지)
+# 구조: <root>/<interval>/<티커(URL 인코딩)>/{ts.i8, open.f8, high.f8, low.f8, close.f8, volume.f8, meta.json}
+# 추가 전용: 마지막 시각 이후 봉만 덧붙임(마지막 봉과 같은 시각이면 덮어씀 — 진행 중인 봉 갱신)
+# meta.json(행 수)은 단순 추가 때는 META_FLUSH_SECS마다 한 번만 기록, 구조 변경(교체/압축/용량 증가/기간 변경)과 flush/close 때는 즉시
+# → 비정상 종료 시 마지막 몇 초 분량의 봉만 잃고(다음 증분 조회가 다시 채움) 기록된 행 수는 항상 실제 데이터 이하
+# 사용: from ts_store import TimeSeriesStore → store.append("AAPL", "1m", ts, open=..., close=...) / store.tail("AAPL", "1m", 2)
+
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+log = logging.getLogger("chatbot")
+
+# ===== 컬럼 정의 =====
+# ts: UTC epoch 초(int64), 나머지 float64 (거래량 포함 — NaN 표현)
+COLUMNS = (("ts", np.int64), ("open", np.float64), ("high", np.float64),
+           ("low", np.float64), ("close", np.float64), ("volume", np.float64))
+_EXT = {np.int64: "i8", np.float64: "f8"}
+
+# ===== 단일 시계열 =====
+class Series:
+    INITIAL_CAPACITY = 1024
+    META_FLUSH_SECS = 5.0
+
+    def __init__(self, path: Path, max_rows: int = 0):
+        self.path = path
+        self.max_rows = max_rows   # 0 = 무제한, 초과 시 최근 max_rows만 남기고 앞으로 당김
+        self.lock = threading.Lock()
+        self.n = 0
+        self.capacity = 0
+        self.covered_from: Optional[int] = None   # 이 시각 이후는 빠짐없이 받았음 (전체 조회 기준 시작 시각)
+        self._cols: Dict[str, np.memmap] = {}
+        self._dirty = False        # meta.json에 아직 안 적은 추가분 있음
+        self._meta_at = 0.0        # 마지막 meta 기록 시각(monotonic)
+        self.meta_writes = 0
+        path.mkdir(parents=True, exist_ok=True)
+        meta = path / "meta.json"
+        if meta.exists():
+            try:
+                m = json.loads(meta.read_text())
+                self.n, self.capacity = int(m["n"]), int(m["capacity"])
+                self.covered_from = m.get("covered_from")
+            except Exception:
+                log.exception(f"시계열 메타 손상: {path} (비우고 다시 채움)")
+                self.n = self.capacity = 0
+        self._open(max(self.capacity, self.INITIAL_CAPACITY))
+
+    def _file(self, name: str, dtype) -> Path:
+        return self.path / f"{name}.{_EXT[dtype]}"
+
+    def _open(self, capacity: int):
+        # 파일을 capacity 행 크기로 맞추고 memmap 재생성 (기존 데이터는 그대로)
+        self._cols.clear()
+        for name, dtype in COLUMNS:
+            f = self._file(name, dtype)
+            size = capacity * np.dtype(dtype).itemsize
+            with open(f, "ab") as fh:
+                if fh.tell() < size:
+                    fh.truncate(size)
+            self._cols[name] = np.memmap(f, dtype=dtype, mode="r+", shape=(capacity,))
+        self.capacity = capacity
+
+    def _save_meta(self):
+        # 데이터 flush 후 행 수 기록 (tmp → rename) — 중간에 죽어도 n은 항상 기록된 데이터 이하
+        for col in self._cols.values():
+            col.flush()
+        tmp = self.path / "meta.json.tmp"
+        tmp.write_text(json.dumps({"n": self.n, "capacity": self.capacity, "covered_from": self.covered_from}))
+        os.replace(tmp, self.path / "meta.json")
+        self._dirty = False
+        self._meta_at = time.monotonic()
+        self.meta_writes += 1
+
+    def flush(self):
+        with self.lock:
+            if self._dirty and self._cols:
+                self._save_meta()
+
+    def last_ts(self) -> Optional[int]:
+        return int(self._cols["ts"][self.n - 1]) if self.n else None
+
+    def append(self, ts: np.ndarray, cols: Dict[str, np.ndarray], covered_from: Optional[int] = None,
+               replace: bool = False) -> int:
+        # 시각 오름차순 입력 → 마지막 저장 시각 이후(같은 시각은 덮어쓰기)만 기록, 추가된 행 수 반환
+        # replace: 기존 행을 버리고 입력으로 교체 (더 긴 기간 백필)
+        ts = np.asarray(ts, dtype=np.int64)
+        with self.lock:
+            if replace:
+                self.n = 0
+            if covered_from is not None and (replace or self.covered_from is None or covered_from < self.covered_from):
+                self.covered_from = int(covered_from)
+            start = self.n
+            if self.n:
+                last = int(self._cols["ts"][self.n - 1])
+                keep = ts >= last
+                ts = ts[keep]
+                cols = {k: np.asarray(v)[keep] for k, v in cols.items()}
+                if len(ts) and ts[0] == last:
+                    start = self.n - 1
+            structural = replace or covered_from is not None
+            if not len(ts):
+                if structural:
+                    self._save_meta()
+                return 0
+            end = start + len(ts)
+            if end > self.capacity:
+                cap = self.capacity
+                while cap < end:
+                    cap *= 2
+                self._open(cap)
+                structural = True
+            self._cols["ts"][start:end] = ts
+            for name, dtype in COLUMNS[1:]:
+                v = cols.get(name)
+                self._cols[name][start:end] = np.nan if v is None else np.asarray(v, dtype=dtype)
+            added = end - self.n
+            self.n = end
+            if self.max_rows and self.n > 2 * self.max_rows:
+                self._compact()
+                structural = True   # 앞으로 당긴 뒤 예전 n이 남아 있으면 시각 순서가 깨지므로 즉시 기록
+            self._dirty = True
+            if structural or time.monotonic() - self._meta_at >= self.META_FLUSH_SECS:
+                self._save_meta()
+            return added
+
+    def _compact(self):
+        # 최근 max_rows만 앞으로 복사 (파일 크기는 유지 → 재할당 없음)
+        drop = self.n - self.max_rows
+        for col in self._cols.values():
+            col[:self.max_rows] = col[drop:self.n]
+        self.n = self.max_rows
+
+    def read(self, start: Optional[int] = None, end: Optional[int] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        # [start, end] 시각 구간(초)의 컬럼 복사본 — limit이면 구간 끝쪽 limit행
+        with self.lock:
+            ts = self._cols["ts"][:self.n]
+            lo = int(np.searchsorted(ts, start, "left")) if start is not None else 0
+            hi = int(np.searchsorted(ts, end, "right")) if end is not None else self.n
+            if limit is not None:
+                lo = max(lo, hi - limit)
+            return {name: np.array(self._cols[name][lo:hi]) for name, _ in COLUMNS}
+
+    def close(self):
+        with self.lock:
+            if self._dirty and self._cols:
+                self._save_meta()
+            for col in self._cols.values():
+                col.flush()
+            self._cols.clear()
+
+# ===== 저장소 =====
+class TimeSeriesStore:
+    def __init__(self, root: str, max_rows: Optional[Dict[str, int]] = None):
+        self.root = Path(root)
+        self.max_rows = max_rows or {}   # 주기별 보관 행 수 (예: {"1m": 20000})
+        self._series: Dict[tuple, Series] = {}
+        self._lock = threading.Lock()
+        self.appends = self.rows_appended = 0
+
+    def series(self, ticker: str, interval: str) -> Series:
+        key = (ticker.upper(), interval)
+        s = self._series.get(key)
+        if s is None:
+            with self._lock:
+                s = self._series.get(key)
+                if s is None:
+                    path = self.root / interval / quote(key[0], safe="")
+                    s = self._series[key] = Series(path, self.max_rows.get(interval, 0))
+        return s
+
+    def has(self, ticker: str, interval: str) -> bool:
+        return (self.root / interval / quote(ticker.upper(), safe="") / "meta.json").exists()
+
+    def last_ts(self, ticker: str, interval: str) -> Optional[int]:
+        if (ticker.upper(), interval) not in self._series and not self.has(ticker, interval):
+            return None   # 없는 티커 조회로 빈 디렉터리를 만들지 않음
+        return self.series(ticker, interval).last_ts()
+
+    def covered_from(self, ticker: str, interval: str) -> Optional[int]:
+        if (ticker.upper(), interval) not in self._series and not self.has(ticker, interval):
+            return None
+        return self.series(ticker, interval).covered_from
+
+    def append(self, ticker: str, interval: str, ts: np.ndarray, covered_from: Optional[int] = None,
+               replace: bool = False, **cols: np.ndarray) -> int:
+        added = self.series(ticker, interval).append(ts, cols, covered_from, replace)
+        self.appends += 1
+        self.rows_appended += added
+        return added
+
+    def read(self, ticker: str, interval: str, start: Optional[int] = None, end: Optional[int] = None,
+             limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        if (ticker.upper(), interval) not in self._series and not self.has(ticker, interval):
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS}
+        return self.series(ticker, interval).read(start, end, limit)
+
+    def tail(self, ticker: str, interval: str, rows: int) -> Dict[str, np.ndarray]:
+        return self.read(ticker, interval, limit=rows)
+
+    def flush(self):
+        # 미기록 meta 일괄 기록 (스케줄러 주기 작업/종료 시)
+        with self._lock:
+            series = list(self._series.values())
+        for s in series:
+            s.flush()
+
+    def tickers(self, interval: str) -> List[str]:
+        d = self.root / interval
+        return sorted(unquote(p.name) for p in d.iterdir() if (p / "meta.json").exists()) if d.exists() else []
+
+    def stats(self) -> dict:
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            "root": str(self.root),
+            "open_series": len(series),
+            "rows": sum(s.n for s in series),
+            "bytes": sum(s.capacity for s in series) * sum(np.dtype(d).itemsize for _, d in COLUMNS),
+            "appends": self.appends,
+            "rows_appended": self.rows_appended,
+            "meta_writes": sum(s.meta_writes for s in series),
+            "meta_dirty": sum(s._dirty for s in series),
+        }